@@ -1,24 +1,34 @@
 import streamlit as st
 import requests
 import pandas as pd
-import altair as alt
-from requests.auth import HTTPBasicAuth
 from datetime import datetime, timezone
-import json
+import time
+import os
+import re
+from contextlib import contextmanager
+import tkts_perf as perf # --- NEW --- (Per-stage timings & cache stats)
 # --- 1. NEW IMPORT ---
-from streamlit_autorefresh import st_autorefresh
-from tenacity import retry, wait_fixed, stop_after_attempt, retry_if_exception_type, RetryError
-import re # --- NEW --- (For search)
-
-# --- START OF NEW SECTION (Gmail Imports) ---
-import os.path
-import base64 # <-- NEW: For reading email body
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-# --- END OF NEW SECTION ---
+from tenacity import RetryError
+import tkts_refresh
+import tkts_search
+
+# --- NEW: Loaders & SLA logic live in tkts_data (importable without the UI) ---
+import tkts_data
+from tkts_data import (
+    load_jira_data,
+    load_all_jira_data,
+    load_assignment_events,
+    get_ticket_details,
+    gmail_service,
+    get_priority_ticket_set,
+    build_html_table,
+    compute_sla,
+    match_priority_tickets,
+    enrich_priority_tickets,
+    breach_time_index,
+    assignee_workload,
+    most_urgent,
+)
 
 # --- 2. Page Configuration ---
 st.set_page_config(
@@ -27,28 +37,41 @@ st.set_page_config(
     layout="wide",
 )
 
+# --- 2a. NEW: Render Timing & Debug Mode ---
+# Start the clock as early as possible so the debug footer can report
+# time-to-first-meaningful-paint. Open the app with ?debug=1 to see it.
+SCRIPT_START = time.perf_counter()
+perf.start_run()
+DEBUG_MODE = st.query_params.get("debug") == "1"
+LAZY_NAV = st.query_params.get("nav") == "lazy"
+
 # --- 2b. NEW: Altair Global Theme ---
-def set_altair_theme():
+@st.cache_resource
+def altair_with_theme():
     """
-    Sets a global Altair theme to use 'Manrope' font.
+    Imports Altair and enables the 'Manrope' theme, once per process. Called
+    by the chart builders, so a cold start doesn't pay for the Altair import
+    (~0.5 s) before the first metrics are painted.
     """
+    import altair as alt
+
     font = "Manrope"
-    
+
     # Global theme settings
-    alt.themes.register("my_theme", lambda: {
-        "config": {
-            "font": font,
-            "title": {"font": font, "fontSize": 14}, # Chart titles
-            "header": {"font": font, "labelFont": font}, # Headers
-            "axis": {"font": font, "labelFont": font, "titleFont": font}, # All axis text
-            "legend": {"font": font, "labelFont": font, "titleFont": font}, # Legend text
-            "text": {"font": font}, # For text marks
+    @alt.theme.register("my_theme", enable=True)
+    def my_theme():
+        return {
+            "config": {
+                "font": font,
+                "title": {"font": font, "fontSize": 14}, # Chart titles
+                "header": {"font": font, "labelFont": font}, # Headers
+                "axis": {"font": font, "labelFont": font, "titleFont": font}, # All axis text
+                "legend": {"font": font, "labelFont": font, "titleFont": font}, # Legend text
+                "text": {"font": font}, # For text marks
+            }
         }
-    })
-    alt.themes.enable("my_theme")
 
-# Apply the theme
-set_altair_theme()
+    return alt
 
 
 # --- 3. Authentication ---
@@ -56,450 +79,37 @@ try:
     JIRA_DOMAIN = st.secrets["JIRA_DOMAIN"]
     JIRA_USER_EMAIL = st.secrets["JIRA_USER_EMAIL"]
     JIRA_API_TOKEN = st.secrets["JIRA_API_TOKEN"]
-    JIRA_AUTH = HTTPBasicAuth(JIRA_USER_EMAIL, JIRA_API_TOKEN)
 except Exception:
     st.error("Secrets not configured. Please add JIRA_DOMAIN, JIRA_USER_EMAIL, and JIRA_API_TOKEN to your Streamlit secrets.")
     st.stop()
 
-
-# --- 4. Helper Function for SLA Formatting ---
-def format_time_remaining(time_diff):
-    """Formats a timedelta into a human-readable SLA status."""
-    if pd.isna(time_diff):
-        return "N/A (No SLA)"
-
-    if time_diff.total_seconds() < 0:
-        ago = -time_diff
-        days, rem = divmod(ago.total_seconds(), 86400)
-        hours, rem = divmod(rem, 3600)
-        minutes, _ = divmod(rem, 60)
-        if days > 0:
-            return f"🚨 Breached {int(days)}d {int(hours)}h ago"
-        elif hours > 0:
-            return f"🚨 Breached {int(hours)}h {int(minutes)}m ago"
-        else:
-            return f"🚨 Breached {int(minutes)}m ago"
-    elif time_diff.total_seconds() < 8 * 3600:
-        days, rem = divmod(time_diff.total_seconds(), 86400)
-        hours, rem = divmod(rem, 3600)
-        minutes, _ = divmod(rem, 60)
-        return f"⚠️ {int(hours)}h {int(minutes)}m remaining"
-    else:
-        days, rem = divmod(time_diff.total_seconds(), 86400)
-        hours, rem = divmod(rem, 3600)
-        minutes, _ = divmod(rem, 60)
-        return f"✅ {int(days)}d {int(hours)}h remaining"
-
-
-# --- 5. Load Jira Data (Active Tickets) ---
-@st.cache_data(ttl=300)
-@retry(
-    wait=wait_fixed(2),
-    stop=stop_after_attempt(3),
-    retry=retry_if_exception_type(requests.RequestException)
+# --- NEW: Extra Jira projects/sites to federate, as [[JIRA_SOURCES]] tables:
+#   name = "EMEA", project = "EMEAOPS"          (same site and credentials)
+#   domain / user_email / api_token             (another Jira site)
+#   scope / active_scope = "<JQL>", rate_limit = <requests per second>
+tkts_data.configure(
+    JIRA_DOMAIN,
+    JIRA_USER_EMAIL,
+    JIRA_API_TOKEN,
+    gmail_token=st.secrets.get("GMAIL_TOKEN"),
+    sources=[dict(source) for source in st.secrets.get("JIRA_SOURCES", [])],
+    # --- NEW: Replicas read the snapshot one `tkts_snapshot write` process keeps here
+    snapshot_dir=st.secrets.get("TKTS_SNAPSHOT_DIR") or os.environ.get("TKTS_SNAPSHOT_DIR"),
+    # --- NEW: How long a failing source's last good data may be shown (default 30 min)
+    stale_limit_seconds=st.secrets.get("TKTS_STALE_LIMIT_SECONDS"),
+    # --- NEW: Memory cap of the render cache shared by all sessions (default 64 MB)
+    render_cache_max_mb=st.secrets.get("TKTS_RENDER_CACHE_MAX_MB")
 )
-def load_jira_data():
-    url = f"{JIRA_DOMAIN}/rest/api/3/search/jql"
-    headers = {"Accept": "application/json", "Content-Type": "application/json"}
-
-    jql_query = """
-        project = TKTS AND 
-        issuetype in ("ANZ - Advanced Pixels", "ANZ - Audio Creatives", "ANZ - Bespoke Requests", "ANZ - Brand Lift Study Creatives", "ANZ - CTV and BVOD Creatives", "ANZ - Celtra Creatives", "ANZ - DCO Creatives", "ANZ - DOOH Creatives", "ANZ - Display Creatives", "ANZ - HTML5 Hosted Creatives", "ANZ - Native Creatives", "ANZ - Rejected Creatives", "ANZ - Social Boost Creatives", "ANZ - Standard Pixels", "ANZ - Troubleshooting - Creatives", "ANZ - Troubleshooting - Pixels", "ANZ - Video Creatives", "DE - Audio Creatives", "DE - Bespoke Requests", "DE - CTV Creatives", "DE - Celtra Creatives", "DE - Display Creatives", "DE - Native Creatives", "DE - Troubleshooting Creatives", "DE - Video Creatives", "IN - Audio Creatives", "IN - Bespoke Requests", "IN - Brand Lift Study Creatives", "IN - CTV/OTT Creatives", "IN - DCO Creatives", "IN - Display Creatives", "IN - Native Creatives", "IN - Troubleshooting Requests", "IN - Video Creatives", "Lenovo - Bespoke Request", "Lenovo - Display Creatives", "Lenovo - Trackers", "Lenovo - Troubleshooting", "Lenovo - Video Creatives", "MENA - Bespoke Requests", "MENA - Display Creatives", "MENA - Native Creatives", "MENA - Troubleshooting Creatives", "MENA - Video Creatives", "SEA - Audio Creatives", "SEA - Bespoke Requests", "SEA - Celtra Creatives", "SEA - DOOH Creatives", "SEA - Display Creatives", "SEA - Native Creatives", "SEA - Troubleshooting Creatives", "SEA - Video Creatives", "SEA - OMG/Assembly Creatives", "UK - Ad-Lib Creatives", "UK - Audio Creatives", "UK - Bespoke Requests", "UK - CTV Creatives", "UK - Celtra Creatives", "UK - Customer Match Creatives", "UK - Display Creatives", "UK - Native Creatives", "UK - Skin Creatives", "UK - Stories Creatives", "UK - THG - Creatives and Trackers", "UK - Troubleshooting Creatives", "UK - Video Creatives", "China - Bespoke Request", "China - Inbound", "MENA - Celtra Creatives", "IN - Customer Match Creatives", "ANZ - SeenThis Creatives - Self-serve only", "SEA - SeenThis Creatives - Self-serve only", "IN - SeenThis Creatives - Self-serve only", "UK - SeenThis Creatives - Self-serve only", "MENA - SeenThis Creatives - Self-serve only", "SEA - DCO Creatives", "MENA - CTV Creatives", "SEA - OTT Creatives") AND 
-        status in ("In Progress", Open, Reopened, "Waiting for customer", "Waiting for support")
-    """
-    
-    fields_to_request = ["status", "assignee", "created", "project", "issuetype", "customfield_10704", "customfield_10522", "customfield_16020"]
-
-    payload = json.dumps({
-        "jql": jql_query,
-        "fields": fields_to_request,
-        "maxResults": 1000
-    })
-
-    response = requests.post(url, headers=headers, data=payload, auth=JIRA_AUTH, timeout=10)
-    response.raise_for_status()
-    data = response.json()
-
-    issues_list = []
-    for issue in data.get('issues', []):
-        request_type = "N/A"
-        if issue['fields'].get('issuetype'):
-            try:
-                request_type = issue['fields']['issuetype']['name']
-            except (KeyError, TypeError, AttributeError):
-                request_type = "Other (See Jira)"
-        
-        breach_time = pd.NaT 
-        sla_field = issue['fields'].get('customfield_10704') 
-        
-        if sla_field: 
-            try:
-                breach_time = sla_field['ongoingCycle']['breachTime']['iso8601']
-            except (KeyError, TypeError, AttributeError, TypeError):
-                try:
-                    breach_time = sla_field['completedCycles'][-1]['breachTime']['iso8601']
-                except (KeyError, TypeError, AttributeError, IndexError):
-                    pass 
-        
-        issues_list.append({
-            "key": issue['key'],
-            "status": issue['fields']['status']['name'],
-            "assignee": (issue['fields']['assignee']['displayName']
-                         if issue['fields']['assignee'] else "Unassigned"),
-            "created": issue['fields']['created'],
-            "request_type": request_type, 
-            "breach_time_api": breach_time,
-            "campaign_start_main": issue['fields'].get("customfield_10522"),
-            "campaign_start_china": issue['fields'].get("customfield_16020")
-        })
-
-    st.session_state['last_fetch_time'] = datetime.now()
-
-    if not issues_list:
-        return pd.DataFrame(columns=[
-            "key", "status", "assignee", "created", "request_type", 
-            "breach_time_api", "campaign_start_main", "campaign_start_china"
-        ])
-
-    df = pd.DataFrame(issues_list)
-    df['created'] = pd.to_datetime(df['created'], utc=True)
-    df['breach_time_api'] = pd.to_datetime(df['breach_time_api'], utc=True)
-    df['campaign_start_main'] = pd.to_datetime(df['campaign_start_main'], utc=True, errors='coerce')
-    df['campaign_start_china'] = pd.to_datetime(df['campaign_start_china'], utc=True, errors='coerce')
-    df['campaign_start_date'] = df['campaign_start_china'].fillna(df['campaign_start_main'])
-    
-    return df
-
-
-# --- 5b. Load All-Time Jira Data (UPDATED) ---
-@st.cache_data(ttl=300)
-@retry(
-    wait=wait_fixed(2), 
-    stop=stop_after_attempt(3), 
-    retry=retry_if_exception_type(requests.RequestException)
-)
-def load_all_jira_data():
-    url = f"{JIRA_DOMAIN}/rest/api/3/search/jql"
-    headers = {"Accept": "application/json", "Content-Type": "application/json"}
-
-    # --- UPDATED JQL QUERY ---
-    # Now finds tickets CREATED today OR RESOLVED today.
-    jql_query = """
-        project = TKTS AND (created >= startOfDay() OR resolutiondate >= startOfDay())
-    """
-
-    # --- UPDATED: Added assignee and issuetype ---
-    fields_to_request = ["key", "status", "created", "resolutiondate", "assignee", "issuetype"]
-
-    payload = json.dumps({
-        "jql": jql_query,
-        "fields": fields_to_request,
-        "maxResults": 1000 
-    })
-
-    response = requests.post(url, headers=headers, data=payload, auth=JIRA_AUTH, timeout=15)
-    response.raise_for_status()
-    data = response.json()
-
-    issues = []
-    for issue in data.get("issues", []):
-        fields = issue["fields"]
-        
-        # --- UPDATED: Parse new fields ---
-        assignee_data = fields.get('assignee')
-        assignee = assignee_data['displayName'] if assignee_data else "Unassigned"
-        
-        issuetype_data = fields.get('issuetype')
-        request_type = issuetype_data['name'] if issuetype_data else "N/A"
-        
-        issues.append({
-            "key": issue["key"],
-            "created": fields["created"],
-            "resolutiondate": fields.get("resolutiondate"),
-            "status": fields["status"]["name"],
-            "assignee": assignee,
-            "request_type": request_type
-        })
-    
-    # --- THIS IS THE FIX ---
-    if not issues:
-        # Create an empty DataFrame with the correct dtypes (data types)
-        empty_df = pd.DataFrame(columns=[
-            "key", "created", "resolutiondate", "status", "assignee", "request_type"
-        ])
-        empty_df["created"] = pd.to_datetime(empty_df["created"], utc=True)
-        empty_df["resolutiondate"] = pd.to_datetime(empty_df["resolutiondate"], utc=True)
-        return empty_df
-    # --- END OF FIX ---
-
-    df = pd.DataFrame(issues)
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-    df["resolutiondate"] = pd.to_datetime(df["resolutiondate"], utc=True, errors="coerce")
-    return df
-
-# --- 5c. NEW: Helper Function for Newly Assigned Tickets ---
-@st.cache_data(ttl=300) # Match our refresh
-@retry(
-    wait=wait_fixed(2), 
-    stop=stop_after_attempt(3), 
-    retry=retry_if_exception_type(requests.RequestException)
-)
-def load_newly_assigned_tickets():
-    """
-    Fetches all tickets that had their assignee field CHANGED today.
-    Returns a list of dicts: [{'key': 'TKTS-123', 'assignee': 'John Doe'}, ...]
-    """
-    url = f"{JIRA_DOMAIN}/rest/api/3/search/jql"
-    headers = {"Accept": "application/json", "Content-Type": "application/json"}
-    
-    # This JQL finds tickets where the assignee field was modified today
-    jql_query = """
-        project = TKTS AND assignee CHANGED during (startOfDay(), now())
-    """
-    
-    # --- UPDATED: Also fetch the ticket key ---
-    fields_to_request = ["assignee", "key"] 
-
-    payload = json.dumps({
-        "jql": jql_query,
-        "fields": fields_to_request,
-        "maxResults": 1000
-    })
-
-    response = requests.post(url, headers=headers, data=payload, auth=JIRA_AUTH, timeout=15)
-    response.raise_for_status()
-    data = response.json()
-    
-    # --- UPDATED: Return a list of dictionaries ---
-    assigned_tickets_list = []
-    for issue in data.get("issues", []):
-        fields = issue.get("fields", {})
-        assignee_data = fields.get('assignee')
-        assignee = assignee_data['displayName'] if assignee_data else "Unassigned"
-        
-        assigned_tickets_list.append({
-            "key": issue.get("key"),
-            "assignee": assignee
-        })
-    
-    return assigned_tickets_list
-
-
-# --- 5d. NEW: Helper Function for Ticket Lookup ---
-@st.cache_data(ttl=60) # Short cache for individual ticket lookups
-def get_ticket_details(ticket_key):
-    """
-    Fetches details for a single ticket from Jira.
-    """
-    # Smart logic: if just a number is passed, prefix it.
-    if re.fullmatch(r'\d+', ticket_key):
-        ticket_key = f"TKTS-{ticket_key}"
-    
-    # Check if it's a valid TKTS key format
-    if not re.fullmatch(r'TKTS-\d+', ticket_key, re.IGNORECASE):
-        raise ValueError(f"Invalid ticket format. Please use 'TKTS-1234' or just '1234'.")
-
-    url = f"{JIRA_DOMAIN}/rest/api/3/issue/{ticket_key.upper()}"
-    headers = {"Accept": "application/json"}
-    
-    # Request specific fields
-    params = {
-        "fields": "status,assignee,created,resolutiondate,issuetype"
-    }
-
-    response = requests.get(url, headers=headers, params=params, auth=JIRA_AUTH, timeout=10)
-    
-    # Handle "Not Found" specifically
-    if response.status_code == 404:
-        raise FileNotFoundError(f"Ticket '{ticket_key.upper()}' not found.")
-    
-    # Handle other errors
-    response.raise_for_status()
-    
-    data = response.json()
-    fields = data.get("fields", {})
-    
-    # --- Parse the data ---
-    # Assignee
-    assignee_data = fields.get('assignee')
-    assignee = assignee_data['displayName'] if assignee_data else "Unassigned"
-    
-    # Status
-    status_data = fields.get('status')
-    status = status_data['name'] if status_data else "N/A"
-    
-    # Request Type
-    issuetype_data = fields.get('issuetype')
-    request_type = issuetype_data['name'] if issuetype_data else "N/A"
-    
-    # Dates
-    created_date = pd.to_datetime(fields.get('created')).strftime('%d-%b-%Y %H:%M')
-    resolved_date_raw = fields.get('resolutiondate')
-    resolved_date = pd.to_datetime(resolved_date_raw).strftime('%d-%b-%Y %H:%M') if resolved_date_raw else "Not yet resolved"
-
-    return {
-        "Ticket ID": data['key'],
-        "Link": f"{JIRA_DOMAIN}/browse/{data['key']}",
-        "Status": status,
-        "Assignee": assignee,
-        "Request Type": request_type,
-        "Created": created_date,
-        "Resolved": resolved_date
-    }
-
-# --- START OF NEW/UPDATED GMAIL SECTION ---
-# --- 5e. GMAIL - Authentication ---
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-
-@st.cache_resource
-def get_gmail_service():
-    """Builds and returns a Gmail API service object.
-       Uses @st.cache_resource to only do this once.
-    """
-    creds = None
-    # Check if the token is in Streamlit's secrets
-    if 'GMAIL_TOKEN' in st.secrets:
-        # Load credentials from the Streamlit secret
-        creds_json = st.secrets['GMAIL_TOKEN']
-        creds = Credentials.from_authorized_user_info(json.loads(creds_json), SCOPES)
-
-    if not creds:
-        # Don't stop the app, just return None. We'll handle this gracefully.
-        print("Gmail token not found in Streamlit Secrets.")
-        return None
-    
-    try:
-        service = build('gmail', 'v1', credentials=creds)
-        return service
-    except HttpError as error:
-        print(f"An error occurred building the Gmail service: {error}")
-        return None
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return None
-
-# --- 5f. GMAIL - Helper function to parse email body ---
-def get_email_body(payload):
-    """
-    Recursively searches a Gmail message payload for the 'text/plain' part
-    and decodes it from base64.
-    """
-    body = ""
-    if 'parts' in payload:
-        for part in payload['parts']:
-            body += get_email_body(part) # Recursive call
-    elif payload.get('mimeType') == 'text/plain':
-        data = payload.get('body', {}).get('data')
-        if data:
-            # Decode from base64 and ignore errors
-            body += base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-    return body
-
-# --- 5g. GMAIL - Priority Ticket Counter (UPDATED) ---
-@st.cache_data(ttl=300) # Refresh every 5 minutes
-def get_priority_ticket_set(_service, today_str): # <-- CHANGED: Renamed function
-    """
-    Searches Gmail for priority tickets for the given day and returns a *set* of unique ticket IDs.
-    """
-    if not _service: 
-        return set() # Return an empty set
-
-    query = f'("adops-ea@miqdigital.com" OR "adops-emea@miqdigital.com") ("priority" OR "prioritise" OR "prioritize" OR "Urgent") after:{today_str}'
-    
-    try:
-        # Search for messages
-        results = _service.users().messages().list(userId='me', q=query).execute()
-        messages = results.get('messages', [])
-        
-        if not messages:
-            return set() # No priority emails today
-
-        unique_ticket_ids = set()
-        ticket_regex = re.compile(r'TKTS-\d+', re.IGNORECASE)
-        batch = _service.new_batch_http_request()
-        
-        def add_tickets_to_set(request_id, response, exception):
-            if exception is None:
-                subject = ""
-                snippet = response.get('snippet', '')
-                headers = response.get('payload', {}).get('headers', [])
-                for h in headers:
-                    if h['name'].lower() == 'subject':
-                        subject = h['value']
-                        break
-                
-                payload = response.get('payload', {})
-                body = get_email_body(payload)
-                search_text = subject + " " + (body if body else snippet)
-                
-                found_tickets = ticket_regex.findall(search_text)
-                if found_tickets:
-                    for ticket in found_tickets:
-                        unique_ticket_ids.add(ticket.upper())
-            else:
-                print(f"Warning: Failed to get email part: {exception}")
-
-        for message in messages[:50]: 
-            batch.add(_service.users().messages().get(userId='me', id=message['id'], format='full'), callback=add_tickets_to_set)
-        
-        batch.execute()
-        
-        return unique_ticket_ids # <-- CHANGED: Return the full set
-
-    except HttpError as error:
-        print(f"An error occurred searching Gmail: {error}")
-        return set()
-    except Exception as e:
-        print(f"An error occurred parsing Gmail messages: {e}")
-        return set()
-# --- END OF NEW/UPDATED GMAIL SECTION ---
-
-
-# --- 5h. NEW: Helper Function to build HTML table ---
-def build_html_table(df, columns, link_column_key=None, link_text_col_key=None):
-    """
-    Builds a scrollable HTML table from a DataFrame, with Manrope font
-    and an optional clickable link column.
-    
-    Args:
-        df (pd.DataFrame): The data to display.
-        columns (dict): A dictionary of {data_column_name: display_column_name}
-        link_column_key (str): The name of the column in `df` that contains the URL.
-        link_text_col_key (str): The name of the column in `df` that contains the text for the link.
-    """
-    
-    # Start building the HTML string
-    html = """
-    <div class="table-container">
-        <table class="custom-table">
-            <thead>
-                <tr>
-    """
-    
-    # Column headers
-    for col_name in columns.values():
-        html += f"<th>{col_name}</th>"
-    html += "</tr></thead><tbody>"
-    
-    # Table rows
-    for index, row in df.iterrows():
-        html += "<tr>"
-        for col_key, col_name in columns.items():
-            if col_key == link_column_key:
-                # Create a clickable link
-                url = row[col_key]
-                text = row[link_text_col_key] # Get the text from the link_text col
-                html += f'<td><a href="{url}" target="_blank">{text}</a></td>'
-            else:
-                html += f"<td>{row[col_key]}</td>"
-        html += "</tr>"
-        
-    html += "</tbody></table></div>"
-    return html
 
 
 # --- 6. CSS (UPDATED FOR MANROPE & HTML TABLE) ---
-st.markdown("""
+# The <style> block has to be sent on every full run: a full rerun removes
+# every element the script doesn't emit again, so skipping it would unstyle
+# the page. What runs once per process is building the minified string.
+@st.cache_resource
+def page_css():
+    """The page stylesheet, with comments and indentation stripped."""
+    css = """
 <style>
 /* --- NEW: Import Manrope from Google Fonts --- */
 @import url('https://fonts.googleapis.com/css2?family=Manrope:wght@200;400;500;600&display=swap');
@@ -649,7 +259,12 @@ table th {
 }
 
 </style>
-""", unsafe_allow_html=True)
+"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    return re.sub(r"\s*\n\s*", "\n", css).strip()
+
+with perf.stage("startup.css"):
+    st.markdown(page_css(), unsafe_allow_html=True)
 
 # --- 7. Header (Unchanged) ---
 st.markdown(
@@ -662,22 +277,165 @@ st.markdown(
 )
 
 
-# --- 8. Load Data (UPDATED FOR GMAIL) ---
+# --- 7b. NEW: Page Skeleton (Progressive Rendering) ---
+# Lay out every placeholder BEFORE any loader runs. Each section below is
+# filled in as soon as its own data is ready, so the browser paints the
+# metric header first instead of waiting for every loader to return.
+def render_metric(slot, value, label, color):
+    """Renders one of the 6 header metrics into an st.empty() slot."""
+    if slot is None:
+        return
+    slot.markdown(f"""
+    <div style='text-align:center;'>
+        <h3 style='color:{color}; margin-bottom:0px; padding-bottom:0px;'>{value}</h3>
+        <p style='margin-top:0px; padding-top:0px;'>{label}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+def mark_first_paint():
+    """Records the time of the first metric paint (once per script run)."""
+    if 'first_paint' not in render_timings:
+        render_timings['first_paint'] = time.perf_counter() - SCRIPT_START
+
+def show_fragment_timing(name, fragment_start):
+    """In debug mode, shows how long a fragment took to (re)render."""
+    if DEBUG_MODE:
+        st.caption(f"⏱️ {name} rendered in {(time.perf_counter() - fragment_start) * 1000:.0f} ms")
+
+render_timings = {}
+
+# Errors/warnings from the loaders land here, above the tabs
+alerts_area = st.container()
+
+# --- 10. Tabs Layout (UPDATED with new tab & lazy navigation) ---
+# st.tabs executes the body of every tab on every rerun. With ?nav=lazy the
+# tabs are replaced by a segmented control and only the active view runs,
+# e.g. ?nav=lazy&view=summary for a wall display. The snapshot (section 8)
+# is still loaded once and shared by whichever view is shown.
+VIEWS = ["SUMMARY", "EXPLORE", "TKTS LOOKUP"]
+
+if LAZY_NAV:
+    default_view = st.query_params.get("view", "SUMMARY").upper().replace("_", " ")
+    active_view = st.segmented_control(
+        "View",
+        VIEWS,
+        default=default_view if default_view in VIEWS else "SUMMARY",
+        key="active_view",
+        label_visibility="collapsed"
+    ) or "SUMMARY"
+    tab_dashboard = tab_explorer = tab_lookup = st.container()
+else:
+    active_view = None
+    tab_dashboard, tab_explorer, tab_lookup = st.tabs(VIEWS)
+
+def view_is_active(view):
+    """True if `view` should execute on this rerun (always, in tab mode)."""
+    return active_view is None or active_view == view
+
+@contextmanager
+def view_cpu_timer(view):
+    """Adds the CPU time spent inside the block to view_cpu_times[view]."""
+    start = time.thread_time()
+    try:
+        yield
+    finally:
+        view_cpu_times[view] = view_cpu_times.get(view, 0) + time.thread_time() - start
+
+view_cpu_times = {}
+
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), tab_dashboard:
+        # --- UPDATED: Metrics Section with centered content ---
+        with st.container(border=True):
+            # --- UPDATED: Create 8 columns for 6 metrics ---
+            _, col1, col2, col3, col4, col5, col6, _ = st.columns([1, 2, 2, 2, 2, 2, 2, 1])
+            slot_active = col1.empty()
+            slot_within = col2.empty()
+            slot_breached = col3.empty()
+            slot_created = col4.empty()
+            slot_closed = col5.empty()
+            slot_priority = col6.empty()
+
+            render_metric(slot_active, "…", "TKTS Active", "orange")
+            render_metric(slot_within, "…", "TKTS Within SLA", "green")
+            render_metric(slot_breached, "…", "TKTS Breached", "red")
+            render_metric(slot_created, "…", "TKTS Created Today", "blue")
+            render_metric(slot_closed, "…", "TKTS Closed Today", "purple")
+            render_metric(slot_priority, "…", "Priority TKTS Today", "#FFC300")
+
+        # --- NEW: Add caption for the asterisk ---
+        st.caption("*Priority TKTS Today — count may vary.")
+
+        st.markdown("### Real-Time TKTS Summary")
+        summary_area = st.empty()
+        summary_area.caption("Loading active tickets…")
+
+        st.divider()
+        highlights_header = st.empty()
+
+        # --- NEW: Add a custom class wrapper ---
+        st.markdown('<div class="highlights-container">', unsafe_allow_html=True)
+        with st.container(border=True):
+            col_created, col_resolved = st.columns(2)
+            with col_created:
+                st.subheader(f"Top 5 Requests types")
+                top_requests_area = st.empty()
+                top_requests_area.caption("Loading…")
+            with col_resolved:
+                st.subheader(f"Top 3 Assignees")
+                top_assignees_area = st.empty()
+                top_assignees_area.caption("Loading…")
+        # --- NEW: Close the custom class wrapper ---
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        st.divider()
+
+        # --- Ticket Breakdown Charts (Now after Snapshot) ---
+        st.header("TKTS Overview")
+        with st.container(border=True):
+            charts_area = st.empty()
+            charts_area.caption("Loading charts…")
+
+        # --- NEW: Upcoming SLA breaches (from the breach-time index) ---
+        st.header("SLA Breach Forecast")
+        with st.container(border=True):
+            forecast_area = st.empty()
+            forecast_area.caption("Loading forecast…")
+
+        # --- NEW: Most urgent tickets (tkts_data.UrgencyQueue), also for the wall display ---
+        st.header("Most Urgent TKTS")
+        with st.container(border=True):
+            urgency_area = st.empty()
+            urgency_area.caption("Loading…")
+else:
+    # Lazy navigation on another view: the metric slots are never drawn
+    slot_active = slot_within = slot_breached = None
+    slot_created = slot_closed = slot_priority = None
+
+
+# --- 8. Load Data (UPDATED FOR GMAIL & PROGRESSIVE RENDERING) ---
 # Define default empty DataFrames
 df = pd.DataFrame(columns=[
-    "key", "status", "assignee", "created", "request_type", 
+    "key", "source", "summary", "status", "assignee", "created", "request_type",
     "breach_time_api", "campaign_start_main", "campaign_start_china",
-    "campaign_start_date" 
+    "campaign_start_date"
 ])
 # --- UPDATED: Default df_all with new columns ---
-df_all = pd.DataFrame(columns=["key", "created", "resolutiondate", "status", "assignee", "request_type"])
+df_all = pd.DataFrame(columns=["key", "source", "summary", "created", "resolutiondate", "status", "assignee", "request_type"])
+df_all["created"] = pd.to_datetime(df_all["created"], utc=True)
+df_all["resolutiondate"] = pd.to_datetime(df_all["resolutiondate"], utc=True)
 
-# --- Block 1: Load Active Tickets ---
-try:
-    df = load_jira_data()
-    if df.empty:
-        st.info("Data loaded. No active tickets found.")
+today = pd.Timestamp.now(tz='UTC').date()
+if view_is_active("SUMMARY"):
+    highlights_header.header(f"Today’s Highlights ({today.strftime('%d-%b-%Y')})")
+
+# --- NEW: The refresh timer fired before the loaders' TTL was up (section 11):
+# expire their entries so this run refetches ---
+tkts_refresh.expire_early(st.session_state.get("refresh_plan"), st.session_state.get("adaptive_refresh"))
 
+# --- Block 1: Load Today's Metrics (cheapest query, painted first) ---
+try:
+    df_all = load_all_jira_data()
 except RetryError as e:
     last_exception = e.last_attempt.exception()
     error_details = f"Error: {last_exception}"
@@ -685,16 +443,69 @@ except RetryError as e:
         response = last_exception.response
         error_details = (
             f"HTTP Error {response.status_code} ({response.reason}). "
-            f"Check Secrets/Permissions. Response: {response.text[:200]}..."
+            f"Response: {response.text[:200]}..."
         )
-    st.error(f"Failed to fetch ACTIVE tickets: {error_details}", icon="🚨")
+    alerts_area.error(f"Failed to fetch DAILY metrics: {error_details}", icon="📉")
 except Exception as e:
-    st.error(f"Error loading ACTIVE tickets: {e}", icon="🚨")
+    alerts_area.error(f"Error loading DAILY metrics: {e}", icon="📉")
+
+# --- NEW: Daily Metrics ---
+df_all["created_date"] = df_all["created"].dt.date
+df_all["resolved_date"] = df_all["resolutiondate"].dt.date
+
+# --- UPDATED: Filtered counts for "Created Today" / "Closed Today" ---
+# (tkts_data.daily_counts, so the headless export reports the same numbers)
+todays_counts = tkts_data.daily_counts(df_all, today)
+created_today_count = todays_counts["created_today"]
+closed_today_count = todays_counts["closed_today"]
+# --- End of New Metrics ---
+
+render_metric(slot_created, created_today_count, "TKTS Created Today", "blue")
+render_metric(slot_closed, closed_today_count, "TKTS Closed Today", "purple")
+mark_first_paint()
+
+# --- Column 1: Top 5 Created Request Types ---
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), top_requests_area.container():
+        # Filter df_all for tickets created today
+        created_today_df = df_all[df_all["created_date"] == today]
+
+        if created_today_df.empty:
+            st.info("No tickets created so far today.")
+        else:
+            # --- NEW LOGIC ---
+            # 1. Get ALL request type counts
+            all_request_counts = created_today_df['request_type'].value_counts()
+
+            # 2. Define the request type(s) to exclude
+            exclude_request_types = ["China - Outbound"]
+
+            # 3. Drop the excluded types. 'errors=ignore' prevents errors if it's not in the list
+            filtered_request_counts = all_request_counts.drop(
+                labels=exclude_request_types, errors='ignore'
+            )
+
+            # 4. NOW get the top 5 from the filtered list
+            top_5_requests = filtered_request_counts.head(5)
+            # --- END NEW LOGIC ---
+
+            # Check if the list is empty *after* filtering
+            if top_5_requests.empty:
+                st.info("No tickets created today (after exclusions).")
+            else:
+                # Build one string for a tight list (no change here)
+                request_list_items = []
+                for request, count in top_5_requests.items():
+                    request_list_items.append(f"- **{request}:** {count} ticket(s)")
+                st.markdown("\n".join(request_list_items))
 
 
-# --- Block 2: Load All-Time Metrics ---
+# --- Block 2: Load Active Tickets ---
 try:
-    df_all = load_all_jira_data()
+    df = load_jira_data()
+    if df.empty:
+        alerts_area.info("Data loaded. No active tickets found.")
+
 except RetryError as e:
     last_exception = e.last_attempt.exception()
     error_details = f"Error: {last_exception}"
@@ -702,178 +513,75 @@ except RetryError as e:
         response = last_exception.response
         error_details = (
             f"HTTP Error {response.status_code} ({response.reason}). "
-            f"Response: {response.text[:200]}..."
+            f"Check Secrets/Permissions. Response: {response.text[:200]}..."
         )
-    st.error(f"Failed to fetch DAILY metrics: {error_details}", icon="📉")
+    alerts_area.error(f"Failed to fetch ACTIVE tickets: {error_details}", icon="🚨")
 except Exception as e:
-    st.error(f"Error loading DAILY metrics: {e}", icon="📉")
-
-# --- START OF NEW SECTION (Gmail) ---
-# --- Block 3: Load Priority Tickets ---
-priority_ticket_set = set() # Default value
-gmail_service = get_gmail_service()
-if gmail_service is None:
-    # Show a visible warning on the app if the service failed to build
-    st.warning("Could not connect to Gmail API. 'Priority TKTS' count will be 0. Check GMAIL_TOKEN secret.", icon="📧")
-else:
-    try:
-        # Use UTC for a consistent "today"
-        today_str = datetime.now(timezone.utc).strftime('%Y/%m/%d')
-        priority_ticket_set = get_priority_ticket_set(gmail_service, today_str)
-    except Exception as e:
-        # Catch-all to ensure the app never crashes from Gmail
-        st.warning(f"Could not fetch priority ticket count: {e}", icon="📧")
-
-priority_count = len(priority_ticket_set) # Get the count from the set
-# --- END OF NEW SECTION ---
-
+    alerts_area.error(f"Error loading ACTIVE tickets: {e}", icon="🚨")
+
+
+# --- NEW: Federated sources that failed (the other sources still show) ---
+failed_sources = {**df_all.attrs.get('source_errors', {}), **df.attrs.get('source_errors', {})}
+for source_name, error in failed_sources.items():
+    alerts_area.warning(f"Jira source '{source_name}' could not be loaded ({error}); showing the other sources.", icon="🔌")
+
+# --- NEW: Sources served from their last good data while Jira is retried in
+# the background (tkts_data.stale_while_revalidate), with an age badge
+stale_sources = {}
+for loaded_df in (df_all, df):
+    for source_name, stale in loaded_df.attrs.get('stale_sources', {}).items():
+        if source_name not in stale_sources or stale["since"] < stale_sources[source_name]["since"]:
+            stale_sources[source_name] = stale
+for source_name, stale in stale_sources.items():
+    age_minutes = int((datetime.now() - datetime.fromisoformat(stale["since"])).total_seconds() // 60)
+    age = f"{age_minutes // 60}h {age_minutes % 60}m" if age_minutes >= 60 else f"{age_minutes}m"
+    alerts_area.warning(f":orange-badge[⏳ {age} old] Jira source '{source_name}' is unreachable ({stale['error']}); "
+                        f"showing its last good data while it is retried.", icon="🔌")
 
 # --- Stop only if BOTH fail and we have no data at all ---
 if df.empty and df_all.empty:
-    st.error("All data sources failed to load. Please check secrets and JIRA connection.")
+    alerts_area.error("All data sources failed to load. Please check secrets and JIRA connection.")
     st.stop()
 
 
-# --- 9. Compute SLA & Daily Metrics ---
+# --- 9. Compute SLA Metrics ---
 now = pd.Timestamp.now(tz='UTC')
-
-df['breach_time'] = df['breach_time_api'] 
-df['time_diff'] = df['breach_time'] - now
-
-df['SLA Timer'] = df['time_diff'].apply(format_time_remaining)
-
-def assign_sla_status(time_diff):
-    if pd.isna(time_diff):
-        return "⚪ N/A"
-    if time_diff.total_seconds() < 0:
-        return "🚨 Breached"
-    return "✅ Within SLA"
-
-df['SLA_Status'] = df['time_diff'].apply(assign_sla_status)
-
-df['Ticket'] = df['key'] # Column for display
-df['Ticket Link'] = df['key'].apply(lambda key: f"{JIRA_DOMAIN}/browse/{key}") # Column for URL
+df = compute_sla(df, now)
+df.attrs['sla_clock'] = now.floor('min')
 
 total_tickets = len(df)
-breached_df = df[df['SLA_Status'] == '🚨 Breached']
-within_sla_df = df[df['SLA_Status'] == '✅ Within SLA']
-breached_count = len(breached_df)
-within_sla_count = len(within_sla_df)
-
-# --- NEW: Daily Metrics ---
-today = pd.Timestamp.now(tz='UTC').date()
-
-df_all["created_date"] = df_all["created"].dt.date
-df_all["resolved_date"] = df_all["resolutiondate"].dt.date
-
-# --- UPDATED: Filtered count for "Created Today" ---
-all_created_today_df = df_all[df_all["created_date"] == today]
-filtered_created_today_df = all_created_today_df[all_created_today_df['request_type'] != "China - Outbound"]
-created_today_count = len(filtered_created_today_df)
-
-# --- UPDATED: Filtered count for "Closed Today" ---
-all_closed_today_df = df_all[df_all["resolved_date"] == today]
-filtered_closed_today_df = all_closed_today_df[all_closed_today_df['request_type'] != "China - Outbound"]
-closed_today_count = len(filtered_closed_today_df)
-# --- End of New Metrics ---
-
-
-# --- 10. Tabs Layout (UPDATED with new tab) ---
-tab_dashboard, tab_explorer, tab_lookup = st.tabs(["SUMMARY", "EXPLORE", "TKTS LOOKUP"])
-
-# --- THIS IS THE CORRECTED, FULL TAB_DASHBOARD BLOCK ---
-with tab_dashboard:
-    # --- UPDATED: Metrics Section with centered content ---
-    with st.container(border=True):
-        # --- UPDATED: Create 8 columns for 6 metrics ---
-        _, col1, col2, col3, col4, col5, col6, _ = st.columns([1, 2, 2, 2, 2, 2, 2, 1])
-        
-        # --- UPDATED MARKDOWN: Wrapped in a single centered div ---
-        col1.markdown(f"""
-        <div style='text-align:center;'>
-            <h3 style='color:orange; margin-bottom:0px; padding-bottom:0px;'>{total_tickets}</h3>
-            <p style='margin-top:0px; padding-top:0px;'>TKTS Active</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col2.markdown(f"""
-        <div style='text-align:center;'>
-            <h3 style='color:green; margin-bottom:0px; padding-bottom:0px;'>{within_sla_count}</h3>
-            <p style='margin-top:0px; padding-top:0px;'>TKTS Within SLA</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        col3.markdown(f"""
-        <div style='text-align:center;'>
-            <h3 style='color:red; margin-bottom:0px; padding-bottom:0px;'>{breached_count}</h3>
-            <p style='margin-top:0px; padding-top:0px;'>TKTS Breached</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        col4.markdown(f"""
-        <div style='text-align:center;'>
-            <h3 style='color:blue; margin-bottom:0px; padding-bottom:0px;'>{created_today_count}</h3>
-            <p style='margin-top:0px; padding-top:0px;'>TKTS Created Today</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        col5.markdown(f"""
-        <div style='text-align:center;'>
-            <h3 style='color:purple; margin-bottom:0px; padding-bottom:0px;'>{closed_today_count}</h3>
-            <p style='margin-top:0px; padding-top:0px;'>TKTS Closed Today</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # --- NEW: Priority Ticket Metric ---
-        col6.markdown(f"""
-        <div style='text-align:center;'>
-            <h3 style='color:#FFC300; margin-bottom:0px; padding-bottom:0px;'>{priority_count}*</h3>
-            <p style='margin-top:0px; padding-top:0px;'>Priority TKTS Today</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-    # --- NEW: Add caption for the asterisk ---
-    st.caption("*Priority TKTS Today — count may vary.")
-
-
-    # --- Filter Buttons (Unchanged) ---
-    st.markdown("### Real-Time TKTS Summary")
-    col_b1, col_b2, col_b3, _ = st.columns([1, 1, 1, 3])
-
-    all_type = "primary" if st.session_state.get('filter', 'All') == 'All' else "secondary"
-    sla_type = "primary" if st.session_state.get('filter', 'All') == '✅ Within SLA' else "secondary"
-    breached_type = "primary" if st.session_state.get('filter', 'All') == '🚨 Breached' else "secondary"
-
-    if col_b1.button(f"All ({total_tickets})", use_container_width=True, type=all_type):
-        st.session_state.filter = 'All'
-        st.rerun()
-    if col_b2.button(f"✅ Within SLA ({within_sla_count})", use_container_width=True, type=sla_type):
-        st.session_state.filter = '✅ Within SLA'
-        st.rerun()
-    if col_b3.button(f"🚨 Breached ({breached_count})", use_container_width=True, type=breached_type):
-        st.session_state.filter = '🚨 Breached'
-        st.rerun()
-
-    # Filter display
-    if st.session_state.get('filter', 'All') == 'All':
-        display_df = df
-    elif st.session_state.get('filter', 'All') == '✅ Within SLA':
-        display_df = within_sla_df
-    else:
-        display_df = breached_df
-
+render_metric(slot_active, total_tickets, "TKTS Active", "orange")
+
+
+# --- Filter Buttons & Ticket Table ---
+# --- NEW: Runs as a fragment, so a filter click only re-renders this table
+# against the snapshot already computed above (no loaders, CSS or charts).
+# --- NEW: Local SLA clock. The fragment also reruns on its own every
+# SLA_CLOCK_SECONDS and re-derives the SLA labels/status from the cached
+# breach_time (tkts_data.update_sla_clock), so "⚠️ 2h 13m remaining" keeps
+# counting down and tickets move from Within SLA to Breached between Jira
+# refreshes, without refetching anything.
+SLA_CLOCK_SECONDS = 60
+
+def set_table_filter(value):
+    # Runs as an on_click callback, i.e. before the fragment reruns, so the
+    # buttons pick up the new state without an extra st.rerun().
+    st.session_state.filter = value
+
+def ticket_table_html(display_df):
+    """HTML of the filtered ticket table (None when no ticket matches the filter)."""
     # --- REPLACED st.dataframe with custom HTML table ---
-    
+
     # Create a copy for manipulation
     table_df = display_df.copy()
-    
+
     # Format dates
     table_df['created'] = table_df['created'].dt.strftime('%d%b%Y %H:%M')
     table_df['campaign_start_date'] = table_df['campaign_start_date'].dt.strftime('%d%b%Y')
-    
+
     # Create the link text and link URL
     table_df["Link_Text"] = "Open ↗" # The text to display
-    
+
     # Create a new DataFrame with just the columns we want, in the order we want
     final_table_df = pd.DataFrame()
     final_table_df['TKTS'] = table_df['Ticket']
@@ -898,387 +606,682 @@ with tab_dashboard:
         'Start Date': 'Start Date'
     }
 
+    # --- NEW: With federated sources, show where each ticket lives ---
+    if len(tkts_data.JIRA_SOURCES) > 1:
+        final_table_df['Source'] = table_df['source']
+        html_cols['Source'] = 'Source'
+
     if final_table_df.empty:
-        st.info("No tickets found for this filter.")
-    else:
-        html = build_html_table(
-            final_table_df, 
-            html_cols, 
-            link_column_key="Link", 
-            link_text_col_key="Link Text"
-        )
-        st.markdown(html, unsafe_allow_html=True)
+        return None
+    return build_html_table(
+        final_table_df,
+        html_cols,
+        link_column_key="Link",
+        link_text_col_key="Link Text"
+    )
 
+@st.fragment(run_every=SLA_CLOCK_SECONDS)
+def ticket_table_fragment(df):
+    fragment_start = time.perf_counter()
+    clock = pd.Timestamp.now(tz='UTC').floor('min')
+    if df.attrs.get('sla_clock') != clock:
+        # Same snapshot, new minute: relabel locally
+        tkts_data.update_sla_clock(df, clock)
+        df.attrs['sla_clock'] = clock
+
+    breached_df = df[df['SLA_Status'] == '🚨 Breached']
+    within_sla_df = df[df['SLA_Status'] == '✅ Within SLA']
+    total_tickets = len(df)
+    within_sla_count = len(within_sla_df)
+    breached_count = len(breached_df)
+
+    # The header slots live outside the fragment; writing to them from here
+    # keeps the counters in step with the table on every clock tick
+    render_metric(slot_within, within_sla_count, "TKTS Within SLA", "green")
+    render_metric(slot_breached, breached_count, "TKTS Breached", "red")
 
-    # --- LAYOUT CHANGE: Today's Snapshot moved here ---
-    st.divider()
-    st.header(f"Today’s Highlights ({today.strftime('%d-%b-%Y')})")
+    col_b1, col_b2, col_b3, _ = st.columns([1, 1, 1, 3])
 
-    # --- NEW: Add a custom class wrapper ---
-    st.markdown('<div class="highlights-container">', unsafe_allow_html=True)
-    
-    # --- THIS IS THE CORRECTED LAYOUT BLOCK ---
-    with st.container(border=True):
-        col_created, col_resolved = st.columns(2)
+    all_type = "primary" if st.session_state.get('filter', 'All') == 'All' else "secondary"
+    sla_type = "primary" if st.session_state.get('filter', 'All') == '✅ Within SLA' else "secondary"
+    breached_type = "primary" if st.session_state.get('filter', 'All') == '🚨 Breached' else "secondary"
 
-        # --- Column 1: Top 5 Created Request Types (NOW INDENTED) ---
-        with col_created:
-            st.subheader(f"Top 5 Requests types")
-            
-            # Filter df_all for tickets created today
-            created_today_df = df_all[df_all["created_date"] == today]
-            
-            if created_today_df.empty:
-                st.info("No tickets created so far today.")
-            else:
-                # --- NEW LOGIC ---
-                # 1. Get ALL request type counts
-                all_request_counts = created_today_df['request_type'].value_counts()
-                
-                # 2. Define the request type(s) to exclude
-                exclude_request_types = ["China - Outbound"]
-                
-                # 3. Drop the excluded types. 'errors=ignore' prevents errors if it's not in the list
-                filtered_request_counts = all_request_counts.drop(
-                    labels=exclude_request_types, errors='ignore'
-                )
-                
-                # 4. NOW get the top 5 from the filtered list
-                top_5_requests = filtered_request_counts.head(5)
-                # --- END NEW LOGIC ---
-
-                # Check if the list is empty *after* filtering
-                if top_5_requests.empty:
-                    st.info("No tickets created today (after exclusions).")
-                else:
-                    # Build one string for a tight list (no change here)
-                    request_list_items = []
-                    for request, count in top_5_requests.items():
-                        request_list_items.append(f"- **{request}:** {count} ticket(s)")
-                    st.markdown("\n".join(request_list_items))
+    col_b1.button(f"All ({total_tickets})", width='stretch', type=all_type,
+                  on_click=set_table_filter, args=('All',))
+    col_b2.button(f"✅ Within SLA ({within_sla_count})", width='stretch', type=sla_type,
+                  on_click=set_table_filter, args=('✅ Within SLA',))
+    col_b3.button(f"🚨 Breached ({breached_count})", width='stretch', type=breached_type,
+                  on_click=set_table_filter, args=('🚨 Breached',))
 
+    # Filter display
+    table_filter = st.session_state.get('filter', 'All')
+    if table_filter == 'All':
+        display_df = df
+    elif table_filter == '✅ Within SLA':
+        display_df = within_sla_df
+    else:
+        display_df = breached_df
 
-        # --- Column 2: Top 3 Assignees (REVERTED TO SIMPLE LIST) ---
-        with col_resolved:
-            st.subheader(f"Top 3 Assignees")
-            
-            try:
-                # 1. Call the new function to get the list of dicts
-                newly_assigned_list = load_newly_assigned_tickets()
-                
-                if not newly_assigned_list:
-                    st.info("No tickets have been assigned so far today.")
-                else:
-                    # 2. Convert to DataFrame for easy counting
-                    assigned_df = pd.DataFrame(newly_assigned_list)
-                    
-                    if assigned_df.empty:
-                        # This check is good practice
-                        st.info("No tickets have been assigned so far today.")
-                    else:
-                        new_ticket_counts = assigned_df['assignee'].value_counts()
+    # --- NEW: Built once per snapshot, SLA minute and filter, for every session
+    html = tkts_data.shared_render("summary.table", (df.attrs.get('snapshot_version', 0), df.attrs['sla_clock']),
+                                   (table_filter, len(tkts_data.JIRA_SOURCES) > 1),
+                                   lambda: ticket_table_html(display_df))
+    if html is None:
+        st.info("No tickets found for this filter.")
+    else:
+        st.markdown(html, unsafe_allow_html=True)
 
-                        # 3. Exclude the assignees
-                        exclude_assignees = ["Adops-EA Group", "Ganesh Balasaheb Zaware"]
-                        new_ticket_counts = new_ticket_counts.drop(labels=exclude_assignees, errors='ignore')
-                        
-                        if new_ticket_counts.empty:
-                            st.info("No tickets assigned today (after exclusions).")
-                        else:
-                            # Sort by count and get the top 3
-                            top_3_assignees = new_ticket_counts.sort_values(ascending=False).head(3)
-
-                            # --- Simplified Display (Name and Count only) ---
-                            assignee_list_items = []
-                            for assignee, total_count in top_3_assignees.items():
-                                assignee_list_items.append(f"- **{assignee}:** {int(total_count)} ticket(s)")
-                            
-                            st.markdown("\n".join(assignee_list_items))
-
-            except Exception as e:
-                st.error(f"Could not load assignee data: {e}")
-
-    # --- NEW: Close the custom class wrapper ---
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    st.divider()
-    
-    # --- Ticket Breakdown Charts (Now after Snapshot) ---
-    st.header("TKTS Overview")
-    # --- UPDATED: New 3-column layout ---
-    with st.container(border=True):
-        
+    show_fragment_timing("Ticket table", fragment_start)
+
+
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), summary_area.container():
+        ticket_table_fragment(df)
+
+
+# --- Ticket Breakdown Charts ---
+# --- NEW: Chart specs are built once per snapshot and shared by every session.
+# Each spec references its counts as a named dataset (no inline JSON rows), so a
+# rerun only hands the finished dict to st.vega_lite_chart: no Altair building,
+# no validation and no per-row serialization.
+ASSIGNEE_CHART_TOP_N = 15
+
+@perf.track_cache
+@st.cache_resource(max_entries=12, ttl=900) # 3 charts x a few snapshot versions
+@perf.count_miss
+def bar_chart_spec(snapshot_version, column, top_n=None, _df=None):
+    """Vega-Lite spec for one 'TKTS/...' bar chart (counts per `column`)."""
+    counts = _df[column].value_counts()
+    if top_n and len(counts) > top_n:
+        # Keep the chart readable: the long tail is folded into one bar
+        others = counts.iloc[top_n:]
+        counts = counts.iloc[:top_n]
+        counts[f"Others ({len(others)})"] = others.sum()
+    source = counts.rename_axis(column).reset_index(name='Count')
+
+    alt = altair_with_theme()
+    dataset_name = f"tkts_{column}_v{snapshot_version}"
+    spec = alt.Chart(alt.NamedData(name=dataset_name)).mark_bar(size=15).encode( # Added size=15
+        y=alt.Y(f'{column}:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)), # Added labelLimit
+        x=alt.X('Count:Q', title='Count', axis=alt.Axis(format='d')), # Format X-axis as integer
+        tooltip=[alt.Tooltip(f'{column}:N'), alt.Tooltip('Count:Q')]
+    ).interactive().to_dict()
+    # Streamlit ships named datasets to the browser as Arrow, not JSON
+    spec["datasets"] = {dataset_name: source}
+    return spec
+
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), charts_area.container():
         # Only show charts if there are active tickets to plot
         if not df.empty:
-            col_status, col_assignee, col_request = st.columns(3) 
+            col_status, col_assignee, col_request = st.columns(3)
+            snapshot_version = df.attrs.get('snapshot_version', 0)
 
             # --- UPDATED: Bar Chart for Status ---
-            with col_status:
+            with col_status, perf.stage("chart.status"):
                 st.subheader("TKTS/Status")
-                source_status = df['status'].value_counts().reset_index()
-                source_status.columns = ['status', 'Count']
-                
-                chart_status = alt.Chart(source_status).mark_bar(size=15).encode( # Added size=15
-                    y=alt.Y('status:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)), # Added labelLimit
-                    x=alt.X('Count:Q', title='Count', axis=alt.Axis(format='d')), # Format X-axis as integer
-                    tooltip=['status', 'Count']
-                ).interactive()
-                st.altair_chart(chart_status, use_container_width=True)
-
-            # --- UPDATED: Bar Chart for Assignee ---
-            with col_assignee:
+                st.vega_lite_chart(bar_chart_spec(snapshot_version, 'status', _df=df), width='stretch')
+
+            # --- UPDATED: Bar Chart for Assignee (top N + "Others") ---
+            with col_assignee, perf.stage("chart.assignee"):
                 st.subheader("TKTS/Assignee")
-                source = df['assignee'].value_counts().reset_index()
-                source.columns = ['assignee', 'Count']
-                
-                chart = alt.Chart(source).mark_bar(size=15).encode( # Added size=15
-                    y=alt.Y('assignee:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)), # Added labelLimit
-                    x=alt.X('Count:Q', title='Count', axis=alt.Axis(format='d')), # Format X-axis as integer
-                    tooltip=['assignee', 'Count']
-                ).interactive()
-                st.altair_chart(chart, use_container_width=True)
+                st.vega_lite_chart(
+                    bar_chart_spec(snapshot_version, 'assignee', top_n=ASSIGNEE_CHART_TOP_N, _df=df),
+                    width='stretch'
+                )
 
             # --- UPDATED: Bar Chart for Request Type ---
-            with col_request:
+            with col_request, perf.stage("chart.request"):
                 st.subheader("TKTS/Request type")
-                source_request_type = df['request_type'].value_counts().reset_index()
-                source_request_type.columns = ['request_type', 'Count']
-                
-                chart_request_type = alt.Chart(source_request_type).mark_bar(size=15).encode( # Added size=15
-                    y=alt.Y('request_type:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)), # Added labelLimit
-                    x=alt.X('Count:Q', title='Count', axis=alt.Axis(format='d')), # Format X-axis as integer
-                    tooltip=['request_type', 'Count']
-                ).interactive()
-                
-                st.altair_chart(chart_request_type, use_container_width=True)
+                st.vega_lite_chart(bar_chart_spec(snapshot_version, 'request_type', _df=df), width='stretch')
         else:
             st.info("No active tickets to display in charts.")
 
+
+# --- NEW: SLA Breach Forecast ---
+# Counts come from binary searches over the snapshot's sorted breach times
+# (tkts_data.BreachTimeIndex), built once per snapshot, not from the
+# per-row 'SLA Timer' strings.
+FORECAST_HORIZONS_H = [1, 4, 8, 24]
+FORECAST_WINDOWS = [f"{lo}-{hi}h" for lo, hi in zip([0] + FORECAST_HORIZONS_H, FORECAST_HORIZONS_H)]
+
+@st.cache_resource
+def forecast_chart_template():
+    """The forecast chart minus its data; each run only attaches the dataset."""
+    alt = altair_with_theme()
+    return alt.Chart(alt.NamedData(name="tkts_breach_forecast")).mark_bar(size=15).encode(
+        y=alt.Y('assignee:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)),
+        x=alt.X('sum(Count):Q', title='Tickets breaching', axis=alt.Axis(format='d')),
+        color=alt.Color('window:N', title='Breaches in', sort=FORECAST_WINDOWS,
+                        scale=alt.Scale(domain=FORECAST_WINDOWS, range=['#d62728', '#ff7f0e', '#ffbb78', '#c7c7c7'])),
+        order=alt.Order('window_order:Q'),
+        tooltip=[alt.Tooltip('assignee:N'), alt.Tooltip('window:N'), alt.Tooltip('Count:Q')]
+    ).transform_calculate(
+        window_order=f"indexof({FORECAST_WINDOWS}, datum.window)"
+    ).to_dict()
+
+@st.fragment(run_every=SLA_CLOCK_SECONDS)
+def breach_forecast_fragment(index):
+    """Breaching-in-1h/4h/8h/24h metrics plus a per-assignee forecast chart."""
+    # Ticks with the SLA clock; the index itself only changes per snapshot
+    now = pd.Timestamp.now(tz='UTC')
+    with perf.stage("breach_forecast", indexed=len(index)):
+        upcoming = index.breaching_within(now, FORECAST_HORIZONS_H)
+        metric_cols = st.columns(len(FORECAST_HORIZONS_H))
+        for col, hours in zip(metric_cols, FORECAST_HORIZONS_H):
+            render_metric(col, upcoming[hours], f"Breaching in next {hours}h", "red" if hours <= 4 else "orange")
+
+        forecast_df = index.forecast_by_assignee(now, FORECAST_HORIZONS_H)
+        if forecast_df.empty:
+            st.info(f"No tickets breach SLA in the next {FORECAST_HORIZONS_H[-1]}h.")
+            return
+        # Same top-N rule as the TKTS/Assignee chart
+        top_assignees = forecast_df.groupby('assignee')['Count'].sum().nlargest(ASSIGNEE_CHART_TOP_N).index
+        forecast_df = forecast_df[forecast_df['assignee'].isin(top_assignees)]
+        st.vega_lite_chart(
+            {**forecast_chart_template(), "datasets": {"tkts_breach_forecast": forecast_df}},
+            width='stretch'
+        )
+
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), forecast_area.container():
+        breach_forecast_fragment(breach_time_index(df.attrs.get('snapshot_version', 0), df))
+
+
+# --- START OF NEW SECTION (Gmail) ---
+# --- Block 3: Load Priority Tickets (slowest source, painted last) ---
+priority_ticket_set = set() # Default value
+try:
+    # Use UTC for a consistent "today"
+    today_str = datetime.now(timezone.utc).strftime('%Y/%m/%d')
+    if tkts_data.SHARED_SNAPSHOT is not None:
+        # --- NEW: From the shared snapshot; the writer process holds the Gmail token
+        priority_ticket_set = get_priority_ticket_set(None, today_str)
+    else:
+        # --- UPDATED: A pooled service with proactively refreshed credentials
+        # (tkts_data.gmail_service), checked out only for this block
+        with gmail_service() as service:
+            if service is None:
+                # Show a visible warning on the app if there is no token
+                alerts_area.warning("Could not connect to Gmail API. 'Priority TKTS' count will be 0. Check GMAIL_TOKEN secret.", icon="📧")
+            else:
+                priority_ticket_set = get_priority_ticket_set(service, today_str)
+except Exception as e:
+    # Catch-all to ensure the app never crashes from Gmail (incl. a rejected token refresh)
+    alerts_area.warning(f"Could not fetch priority ticket count: {e}", icon="📧")
+
+priority_count = len(priority_ticket_set) # Get the count from the set
+render_metric(slot_priority, f"{priority_count}*", "Priority TKTS Today", "#FFC300")
+# --- END OF NEW SECTION ---
+
+
+# --- NEW: Most Urgent TKTS (needs the Gmail priority set, so after Block 3) ---
+@st.fragment(run_every=SLA_CLOCK_SECONDS)
+def urgency_fragment(df, priority_keys):
+    """Top of the urgency queue: SLA breach, campaign start and Gmail priority combined."""
+    # The queue only re-sorts on a new snapshot; the clock tick just relabels "Due"
+    urgent_df = most_urgent(df, priority_keys)
+    if urgent_df.empty:
+        st.info("No active tickets.")
+        return
+    now = pd.Timestamp.now(tz='UTC')
+    table = pd.DataFrame({
+        "Link": urgent_df['link'],
+        "Link Text": urgent_df['key'],
+        "Due": [tkts_data.format_due(deadline - now) for deadline in urgent_df['deadline']],
+        "Driver": urgent_df['driver'],
+        "Assignee": urgent_df['assignee'],
+        "Status": urgent_df['status'],
+        "Request Type": urgent_df['request_type'],
+    })
+    html_cols = {'Link': 'TKTS', 'Due': 'Due', 'Driver': 'Driver', 'Assignee': 'Assignee',
+                 'Status': 'Status', 'Request Type': 'Request Type'}
+    st.markdown(build_html_table(table, html_cols, link_column_key="Link", link_text_col_key="Link Text"),
+                unsafe_allow_html=True)
+
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), urgency_area.container():
+        urgency_fragment(df, priority_ticket_set)
+
+
+# --- Column 2: Top 3 Assignees (REVERTED TO SIMPLE LIST) ---
+if view_is_active("SUMMARY"):
+    with view_cpu_timer("SUMMARY"), top_assignees_area.container():
+        try:
+            # 1. Every assignment made today, from the changelog (a ticket
+            #    reassigned three times counts for each of its assignees)
+            assignment_events = load_assignment_events()
+
+            if not assignment_events:
+                st.info("No tickets have been assigned so far today.")
+            else:
+                # 2. Convert to DataFrame for easy counting
+                assigned_df = pd.DataFrame(assignment_events)
+
+                if assigned_df.empty:
+                    # This check is good practice
+                    st.info("No tickets have been assigned so far today.")
+                else:
+                    new_ticket_counts = assigned_df['assignee'].value_counts()
+
+                    # 3. Exclude the assignees
+                    new_ticket_counts = new_ticket_counts.drop(labels=tkts_data.EXCLUDED_ASSIGNEES, errors='ignore')
+
+                    if new_ticket_counts.empty:
+                        st.info("No tickets assigned today (after exclusions).")
+                    else:
+                        # Sort by count and get the top 3
+                        top_3_assignees = new_ticket_counts.sort_values(ascending=False).head(3)
+
+                        # --- Simplified Display (Name and Count only) ---
+                        assignee_list_items = []
+                        for assignee, total_count in top_3_assignees.items():
+                            assignee_list_items.append(f"- **{assignee}:** {int(total_count)} ticket(s)")
+
+                        st.markdown("\n".join(assignee_list_items))
+
+        except Exception as e:
+            st.error(f"Could not load assignee data: {e}")
+
 # --- END OF TAB_DASHBOARD BLOCK ---
 
 
-# --- === MODIFIED tab_explorer (Using HTML Tables) === ---
-with tab_explorer:
+# --- 10b. NEW: Explorer Fragments ---
+# Changing an explorer selectbox reruns only its own fragment, which
+# re-filters the snapshot that was already loaded for this script run.
+def assignee_table_html(df, assignee):
+    """HTML table of one assignee's active tickets, oldest first."""
+    assignee_df = df[df['assignee'] == assignee].sort_values(by='created')
     
-    # --- Section 1: Existing Active Ticket Explorer ---
-    st.header("Filter Open TKTS by Assignee")
-    with st.container(border=True):
-        # Check if df is empty before trying to access 'assignee'
-        if not df.empty:
-            assignee_list = sorted(df['assignee'].unique())
+    # --- REPLACED st.dataframe with custom HTML table ---
+    table_df_assignee = assignee_df.copy()
+    table_df_assignee['created'] = table_df_assignee['created'].dt.strftime('%d%b%Y %H:%M')
+    table_df_assignee['campaign_start_date'] = table_df_assignee['campaign_start_date'].dt.strftime('%d%b%Y')
+    
+    # Create a new DataFrame with just the columns we want
+    final_table_df_active = pd.DataFrame()
+    final_table_df_active['TKTS'] = table_df_assignee['Ticket']
+    final_table_df_active['Link'] = table_df_assignee['Ticket Link'] # The URL
+    final_table_df_active['Link Text'] = "Open ↗" # The display text
+    final_table_df_active['SLA Status'] = table_df_assignee['SLA Timer']
+    final_table_df_active['Status'] = table_df_assignee['status']
+    final_table_df_active['Request Type'] = table_df_assignee['request_type']
+    final_table_df_active['Created (UTC)'] = table_df_assignee['created']
+    final_table_df_active['Start Date'] = table_df_assignee['campaign_start_date']
+    
+    html_cols_active = {
+        'TKTS': 'TKTS-No',
+        'Link': '', # This is the link_column_key
+        'SLA Status': 'SLA',
+        'Status': 'Status',
+        'Request Type': 'Request Type',
+        'Created (UTC)': 'Created (UTC)',
+        'Start Date': 'Start Date'
+    }
+
+    return build_html_table(
+        final_table_df_active,
+        html_cols_active,
+        link_column_key="Link",
+        link_text_col_key="Link Text"
+    )
+
+@st.fragment
+def assignee_explorer_fragment(df):
+    fragment_start = time.perf_counter()
+    # Check if df is empty before trying to access 'assignee'
+    if not df.empty:
+        assignee_list = sorted(df['assignee'].unique())
+        
+        selected_assignee = st.selectbox(
+            "Select an assignee to view their ACTIVE tickets:", 
+            assignee_list, 
+            key="assignee_select",
+            label_visibility="collapsed"
+        )
+        
+        if selected_assignee:
+            # --- NEW: Shared by every session viewing this assignee (section 9d of tkts_data)
+            html = tkts_data.shared_render("explorer.assignee",
+                                           (df.attrs.get('snapshot_version', 0), df.attrs['sla_clock']),
+                                           (selected_assignee,),
+                                           lambda: assignee_table_html(df, selected_assignee))
+            st.markdown(html, unsafe_allow_html=True)
+    else:
+        st.info("No active tickets to explore.")
+
+    show_fragment_timing("Assignee explorer", fragment_start)
+
+
+def closed_table_html(closed_df, assignee):
+    """(count, HTML table) of the tickets `assignee` closed, from the day's filtered closed tickets."""
+    # 6. Filter for the selected assignee
+    report_df = closed_df[closed_df['assignee'] == assignee].copy()
+    
+    # 7. Display their tickets in a dataframe
+    report_df['Ticket Link URL'] = tkts_data.ticket_links(report_df['key'], report_df['source'])
+    
+    # --- REPLACED st.dataframe with custom HTML table ---
+    final_table_df_closed = pd.DataFrame()
+    final_table_df_closed['Ticket ID'] = report_df['key']
+    final_table_df_closed['Request Type'] = report_df['request_type']
+    final_table_df_closed['Link'] = report_df['Ticket Link URL']
+    final_table_df_closed['Link Text'] = "Open ↗"
+    
+    html_cols_closed = {
+        'Ticket ID': 'TKTS-No',
+        'Request Type': 'Request Type',
+        'Link': ''
+    }
+
+    return len(report_df), build_html_table(
+        final_table_df_closed,
+        html_cols_closed,
+        link_column_key="Link",
+        link_text_col_key="Link Text"
+    )
+
+@st.fragment
+def closed_report_fragment(df_all, today):
+    fragment_start = time.perf_counter()
+    if df_all.empty:
+        st.info("No ticket data available to build a report.")
+    else:
+        # 1. Filter df_all for today's date
+        daily_closed_df = df_all[df_all["resolved_date"] == today]
+        
+        # 2. Exclude assignees
+        filtered_by_assignee_df = daily_closed_df[~daily_closed_df['assignee'].isin(tkts_data.EXCLUDED_ASSIGNEES)]
+
+        # 3. NEW: Exclude request type
+        filtered_df = filtered_by_assignee_df[filtered_by_assignee_df['request_type'] != "China - Outbound"]
+
+        if filtered_df.empty:
+            st.info(f"No tickets were closed today (after exclusions).")
+        else:
+            # 4. Get the list of assignees who closed tickets
+            assignee_list = sorted(filtered_df['assignee'].unique())
             
-            selected_assignee = st.selectbox(
-                "Select an assignee to view their ACTIVE tickets:", 
-                assignee_list, 
-                key="assignee_select",
+            # 5. Create the selectbox
+            selected_assignee_report = st.selectbox(
+                "Select an assignee to view their closed tickets:",
+                assignee_list,
+                key="closed_assignee_select",
                 label_visibility="collapsed"
             )
             
-            if selected_assignee:
-                assignee_df = df[df['assignee'] == selected_assignee].sort_values(by='created')
-                
-                # --- REPLACED st.dataframe with custom HTML table ---
-                table_df_assignee = assignee_df.copy()
-                table_df_assignee['created'] = table_df_assignee['created'].dt.strftime('%d%b%Y %H:%M')
-                table_df_assignee['campaign_start_date'] = table_df_assignee['campaign_start_date'].dt.strftime('%d%b%Y')
-                
-                # Create a new DataFrame with just the columns we want
-                final_table_df_active = pd.DataFrame()
-                final_table_df_active['TKTS'] = table_df_assignee['Ticket']
-                final_table_df_active['Link'] = table_df_assignee['Ticket Link'] # The URL
-                final_table_df_active['Link Text'] = "Open ↗" # The display text
-                final_table_df_active['SLA Status'] = table_df_assignee['SLA Timer']
-                final_table_df_active['Status'] = table_df_assignee['status']
-                final_table_df_active['Request Type'] = table_df_assignee['request_type']
-                final_table_df_active['Created (UTC)'] = table_df_assignee['created']
-                final_table_df_active['Start Date'] = table_df_assignee['campaign_start_date']
-                
-                html_cols_active = {
-                    'TKTS': 'TKTS-No',
-                    'Link': '', # This is the link_column_key
-                    'SLA Status': 'SLA',
-                    'Status': 'Status',
-                    'Request Type': 'Request Type',
-                    'Created (UTC)': 'Created (UTC)',
-                    'Start Date': 'Start Date'
-                }
-
-                html = build_html_table(
-                    final_table_df_active,
-                    html_cols_active,
-                    link_column_key="Link",
-                    link_text_col_key="Link Text"
+            if selected_assignee_report:
+                # --- NEW: Shared by every session viewing this assignee (section 9d of tkts_data)
+                closed_count, html = tkts_data.shared_render(
+                    "explorer.closed", (df_all.attrs.get('snapshot_version', 0), today), (selected_assignee_report,),
+                    lambda: closed_table_html(filtered_df, selected_assignee_report)
+                )
+
+                st.metric(
+                    label=f"Tickets Closed by {selected_assignee_report}",
+                    value=closed_count
                 )
                 st.markdown(html, unsafe_allow_html=True)
-        else:
-            st.info("No active tickets to explore.")
-            
-    st.divider()
 
-    # --- Section 2: NEW Daily Closed Ticket Report (Using User's Idea) ---
-    st.header(f"Closed TKTS by Assignee on ({today.strftime('%d-%b-%Y')})")
+    show_fragment_timing("Closed report", fragment_start)
 
-    with st.container(border=True):
-        if df_all.empty:
-            st.info("No ticket data available to build a report.")
-        else:
-            # 1. Filter df_all for today's date
-            daily_closed_df = df_all[df_all["resolved_date"] == today]
-            
-            # 2. Exclude assignees
-            exclude_assignees = ["Adops-EA Group", "Ganesh Balasaheb Zaware"]
-            filtered_by_assignee_df = daily_closed_df[~daily_closed_df['assignee'].isin(exclude_assignees)]
 
-            # 3. NEW: Exclude request type
-            filtered_df = filtered_by_assignee_df[filtered_by_assignee_df['request_type'] != "China - Outbound"]
+def priority_table_html(df, df_all, priority_ticket_set, enrich=True):
+    """
+    (HTML table or None if no priority ticket is known, keys not found in
+    JIRA) of today's Gmail priority tickets.
+    """
+    priority_details_df = match_priority_tickets(df, df_all, priority_ticket_set)
+
+    # --- NEW: Older tickets (not active, not touched today) are
+    # looked up in one batched JQL query instead of being dropped
+    unresolved_keys = []
+    if enrich:
+        priority_details_df, unresolved_keys = enrich_priority_tickets(priority_details_df, priority_ticket_set)
+    if priority_details_df.empty:
+        return None, unresolved_keys
+
+    # --- Build HTML Table for Priority Tickets ---
+    final_table_df_priority = pd.DataFrame()
+    final_table_df_priority['Ticket ID'] = priority_details_df['key']
+    final_table_df_priority['Link'] = priority_details_df['Ticket Link'] # The URL
+    final_table_df_priority['Link Text'] = "Open ↗" # The display text
+    final_table_df_priority['Assignee'] = priority_details_df['assignee']
+    final_table_df_priority['Request Type'] = priority_details_df['request_type']
+    final_table_df_priority['Status'] = priority_details_df['status']
+
+    html_cols_priority = {
+        'Ticket ID': 'TKTS-No',
+        'Link': '',
+        'Assignee': 'Assignee',
+        'Request Type': 'Request Type',
+        'Status': 'Status'
+    }
 
-            if filtered_df.empty:
-                st.info(f"No tickets were closed today (after exclusions).")
+    html = build_html_table(
+        final_table_df_priority,
+        html_cols_priority,
+        link_column_key="Link",
+        link_text_col_key="Link Text"
+    )
+    return html, unresolved_keys
+
+
+# --- === MODIFIED tab_explorer (Using HTML Tables) === ---
+if view_is_active("EXPLORE"):
+    with view_cpu_timer("EXPLORE"), tab_explorer:
+
+        # --- Section 0: NEW Assignee Workload leaderboard (one pass, cached per snapshot) ---
+        st.header("Assignee Workload")
+        with st.container(border=True):
+            workload_df = assignee_workload(df.attrs.get('snapshot_version', 0), df.attrs['sla_clock'], df)
+            if workload_df.empty:
+                st.info("No active tickets to rank.")
             else:
-                # 4. Get the list of assignees who closed tickets
-                assignee_list = sorted(filtered_df['assignee'].unique())
-                
-                # 5. Create the selectbox
-                selected_assignee_report = st.selectbox(
-                    "Select an assignee to view their closed tickets:",
-                    assignee_list,
-                    key="closed_assignee_select",
-                    label_visibility="collapsed"
+                st.caption("Click a column header to sort. Ages are days since creation; campaign days count from today (UTC).")
+                st.dataframe(
+                    workload_df,
+                    hide_index=True,
+                    width='stretch',
+                    column_config={
+                        col: st.column_config.NumberColumn(format="%.1f")
+                        for col in workload_df.columns if col.startswith(("Age", "Oldest"))
+                    } | {"Next campaign (d)": st.column_config.NumberColumn(format="%d")}
                 )
-                
-                if selected_assignee_report:
-                    # 6. Filter for the selected assignee
-                    report_df = filtered_df[filtered_df['assignee'] == selected_assignee_report].copy()
-                    
-                    st.metric(
-                        label=f"Tickets Closed by {selected_assignee_report}",
-                        value=len(report_df)
-                    )
-                    
-                    # 7. Display their tickets in a dataframe
-                    report_df['Ticket Link URL'] = report_df['key'].apply(lambda key: f"{JIRA_DOMAIN}/browse/{key}")
-                    
-                    # --- REPLACED st.dataframe with custom HTML table ---
-                    final_table_df_closed = pd.DataFrame()
-                    final_table_df_closed['Ticket ID'] = report_df['key']
-                    final_table_df_closed['Request Type'] = report_df['request_type']
-                    final_table_df_closed['Link'] = report_df['Ticket Link URL']
-                    final_table_df_closed['Link Text'] = "Open ↗"
-                    
-                    html_cols_closed = {
-                        'Ticket ID': 'TKTS-No',
-                        'Request Type': 'Request Type',
-                        'Link': ''
-                    }
-
-                    html = build_html_table(
-                        final_table_df_closed,
-                        html_cols_closed,
-                        link_column_key="Link",
-                        link_text_col_key="Link Text"
-                    )
-                    st.markdown(html, unsafe_allow_html=True)
-    
-    st.divider() 
-    
-    # --- Section 3: NEW Priority Ticket Details ---
-    st.header(f"Priority TKTS Details ({today.strftime('%d-%b-%Y')})")
-    
-    with st.container(border=True):
-        if not priority_ticket_set:
-            st.info("No priority tickets found in emails today.")
-        else:
-            # Create a master list of all tickets we know about
-            all_known_tickets_df = pd.concat([
-                df[['key', 'assignee', 'request_type', 'status', 'Ticket Link']], 
-                df_all[['key', 'assignee', 'request_type', 'status']]
-            ]).drop_duplicates(subset=['key'])
-            
-            # Add Ticket Link for any tickets that only came from df_all
-            all_known_tickets_df['Ticket Link'] = all_known_tickets_df['key'].apply(lambda key: f"{JIRA_DOMAIN}/browse/{key}")
 
-            # Filter this master list for our priority tickets
-            priority_list = list(priority_ticket_set)
-            priority_details_df = all_known_tickets_df[all_known_tickets_df['key'].isin(priority_list)].copy()
-            
-            if priority_details_df.empty:
-                st.warning("Found priority ticket emails, but could not match them to active or recently closed JIRA tickets.")
-                st.write(priority_list) # Show the raw list of IDs it found
+        st.divider()
+
+        # --- Section 1: Existing Active Ticket Explorer ---
+        st.header("Filter Open TKTS by Assignee")
+        with st.container(border=True):
+            assignee_explorer_fragment(df)
+
+        st.divider()
+
+        # --- Section 2: NEW Daily Closed Ticket Report (Using User's Idea) ---
+        st.header(f"Closed TKTS by Assignee on ({today.strftime('%d-%b-%Y')})")
+
+        with st.container(border=True):
+            closed_report_fragment(df_all, today)
+
+        st.divider() 
+        
+        # --- Section 3: NEW Priority Ticket Details ---
+        st.header(f"Priority TKTS Details ({today.strftime('%d-%b-%Y')})")
+        
+        with st.container(border=True):
+            if not priority_ticket_set:
+                st.info("No priority tickets found in emails today.")
             else:
-                # --- Build HTML Table for Priority Tickets ---
-                final_table_df_priority = pd.DataFrame()
-                final_table_df_priority['Ticket ID'] = priority_details_df['key']
-                final_table_df_priority['Link'] = priority_details_df['Ticket Link'] # The URL
-                final_table_df_priority['Link Text'] = "Open ↗" # The display text
-                final_table_df_priority['Assignee'] = priority_details_df['assignee']
-                final_table_df_priority['Request Type'] = priority_details_df['request_type']
-                final_table_df_priority['Status'] = priority_details_df['status']
-                
-                html_cols_priority = {
-                    'Ticket ID': 'TKTS-No',
-                    'Link': '',
-                    'Assignee': 'Assignee',
-                    'Request Type': 'Request Type',
-                    'Status': 'Status'
-                }
-
-                html = build_html_table(
-                    final_table_df_priority,
-                    html_cols_priority,
-                    link_column_key="Link",
-                    link_text_col_key="Link Text"
-                )
-                st.markdown(html, unsafe_allow_html=True)
+                # --- NEW: Shared by every session, per snapshot pair and Gmail set (section 9d of tkts_data)
+                try:
+                    priority_html, unresolved_keys = tkts_data.shared_render(
+                        "explorer.priority",
+                        (df.attrs.get('snapshot_version', 0), df_all.attrs.get('snapshot_version', 0)),
+                        frozenset(priority_ticket_set),
+                        lambda: priority_table_html(df, df_all, priority_ticket_set)
+                    )
+                except requests.RequestException as e:
+                    # Not cached: the next rerun tries Jira again
+                    st.warning(f"Could not look up older priority tickets in JIRA: {e}")
+                    priority_html, unresolved_keys = priority_table_html(df, df_all, priority_ticket_set, enrich=False)
+
+                if priority_html is None:
+                    st.warning("Found priority ticket emails, but could not match them to active or recently closed JIRA tickets.")
+                    st.write(sorted(priority_ticket_set)) # Show the raw list of IDs it found
+                else:
+                    if unresolved_keys:
+                        st.caption(f"Not found in JIRA: {', '.join(unresolved_keys)}")
+                    st.markdown(priority_html, unsafe_allow_html=True)
+
+
+# --- NEW: Full-text search over the local index (tkts_search) ---
+def fulltext_search_section(df, df_all):
+    """Search mode of the lookup tab: FTS5 over every ticket seen, no Jira round-trip."""
+    tkts_search.sync(df, df_all)
+    search_text = st.text_input(
+        "Search summary, request type, assignee or status (prefixes work: 'leno blac fri')",
+        key="fulltext_query"
+    )
+    include_closed = st.checkbox("Include closed tickets", key="fulltext_include_closed")
+    facets = tkts_search.facets(include_closed)
+    filter_cols = st.columns(3)
+    statuses = filter_cols[0].multiselect("Status", facets['status'], key="fulltext_status")
+    request_types = filter_cols[1].multiselect("Request Type", facets['request_type'], key="fulltext_request_type")
+    assignees = filter_cols[2].multiselect("Assignee", facets['assignee'], key="fulltext_assignee")
+    if not (search_text.strip() or statuses or request_types or assignees):
+        st.caption("Type to search, or pick a filter.")
+        return
+
+    search_start = time.perf_counter()
+    results = tkts_search.search(search_text, statuses=statuses, request_types=request_types,
+                                 assignees=assignees, include_closed=include_closed)
+    search_ms = (time.perf_counter() - search_start) * 1000
+    limit_note = f" (first {tkts_search.SEARCH_LIMIT})" if len(results) == tkts_search.SEARCH_LIMIT else ""
+    st.caption(f"{len(results)} result(s){limit_note} in {search_ms:.0f} ms")
+    if results.empty:
+        st.info("No tickets match.")
+        return
+
+    table = pd.DataFrame({
+        "Link": results['link'],
+        "Link Text": results['key'],
+        "Summary": results['summary'],
+        "Status": results['status'].where(results['active'], results['status'] + " (closed)"),
+        "Assignee": results['assignee'],
+        "Request Type": results['request_type'],
+        "Created (UTC)": results['created'].dt.strftime('%d%b%Y %H:%M'),
+    })
+    html_cols = {'Link': 'TKTS', 'Summary': 'Summary', 'Status': 'Status', 'Assignee': 'Assignee',
+                 'Request Type': 'Request Type', 'Created (UTC)': 'Created (UTC)'}
+    if len(tkts_data.JIRA_SOURCES) > 1:
+        table['Source'] = results['source']
+        html_cols['Source'] = 'Source'
+    st.markdown(build_html_table(table, html_cols, link_column_key="Link", link_text_col_key="Link Text"),
+                unsafe_allow_html=True)
 
 
 # --- NEW: Ticket Lookup Tab ---
-with tab_lookup:
-    search_query = st.text_input(
-        "Enter TKTS-ID (e.g., 'TKTS-1234' or just '1234')", 
-        key="ticket_search_input"
-    )
-    
-    if st.button("Search", key="search_button", type="primary", use_container_width=True):
-        if not search_query.strip():
-            st.warning("Please enter a ticket ID to search.")
+if view_is_active("TKTS LOOKUP"):
+    with view_cpu_timer("TKTS LOOKUP"), tab_lookup:
+        lookup_mode = st.radio("Lookup", ["Ticket ID", "Search"], horizontal=True, key="lookup_mode",
+                               label_visibility="collapsed")
+        if lookup_mode == "Search":
+            fulltext_search_section(df, df_all)
         else:
-            with st.spinner(f"Searching for '{search_query}'..."):
-                try:
-                    # Call the new helper function
-                    ticket_data = get_ticket_details(search_query.strip())
-                    
-                    st.success(f"Found ticket: **{ticket_data['Ticket ID']}**")
-                    
-                    # --- UPDATED: Display results with st.markdown ---
-                    st.markdown(f"""
-                    - **Status:** `{ticket_data['Status']}`
-                    - **Assignee:** {ticket_data['Assignee']}
-                    - **Request Type:** {ticket_data['Request Type']}
-                    - **Created:** {ticket_data['Created']}
-                    - **Resolved:** {ticket_data['Resolved']}
-                    - **Link:** [Open in Jira ↗]({ticket_data['Link']})
-                    """)
-
-                except FileNotFoundError as e:
-                    st.error(f"Not Found: {e}", icon="🚫")
-                except ValueError as e:
-                    st.error(f"Invalid Input: {e}", icon="⚠️")
-                except requests.HTTPError as e:
-                    if e.response.status_code == 401:
-                        st.error("Authentication Error. Check your API token.", icon="🔒")
-                    else:
-                        st.error(f"HTTP Error: {e}", icon="🔥")
-                except Exception as e:
-                    st.error(f"An unexpected error occurred: {e}", icon="🔥")
+            search_query = st.text_input(
+                "Enter TKTS-ID (e.g., 'TKTS-1234' or just '1234')", 
+                key="ticket_search_input"
+            )
+        
+            if st.button("Search", key="search_button", type="primary", width='stretch'):
+                if not search_query.strip():
+                    st.warning("Please enter a ticket ID to search.")
+                else:
+                    with st.spinner(f"Searching for '{search_query}'..."):
+                        try:
+                            # Call the new helper function
+                            ticket_data = get_ticket_details(search_query.strip())
+                        
+                            st.success(f"Found ticket: **{ticket_data['Ticket ID']}**")
+                        
+                            # --- UPDATED: Display results with st.markdown ---
+                            st.markdown(f"""
+                            - **Status:** `{ticket_data['Status']}`
+                            - **Assignee:** {ticket_data['Assignee']}
+                            - **Request Type:** {ticket_data['Request Type']}
+                            - **Created:** {ticket_data['Created']}
+                            - **Resolved:** {ticket_data['Resolved']}
+                            - **Link:** [Open in Jira ↗]({ticket_data['Link']})
+                            """)
+
+                        except FileNotFoundError as e:
+                            st.error(f"Not Found: {e}", icon="🚫")
+                        except ValueError as e:
+                            st.error(f"Invalid Input: {e}", icon="⚠️")
+                        except requests.HTTPError as e:
+                            if e.response.status_code == 401:
+                                st.error("Authentication Error. Check your API token.", icon="🔒")
+                            else:
+                                st.error(f"HTTP Error: {e}", icon="🔥")
+                        except Exception as e:
+                            st.error(f"An unexpected error occurred: {e}", icon="🔥")
 
 
 # --- 11. Footer w/ Auto-Refresh ---
+# --- UPDATED: Adaptive schedule (tkts_refresh) instead of a fixed 5 minutes:
+# faster while tickets are close to breach or the last fetch changed a lot,
+# slower in quiet hours, weekends and quiet streaks, paused while the tab is
+# hidden. The SLA timers keep ticking locally in between (section 9).
 st.divider()
-auto_refresh = st.toggle("Auto-refresh (every 5 minutes)", value=True)
-
-if auto_refresh:
-    # Interval is in milliseconds. 300 * 1000 = 5 minutes (matches cache ttl)
-    st_autorefresh(interval=300 * 1000, key="data_refresher") # <-- ⭐️ FIX: Removed 'st.'
+auto_refresh = st.toggle("Auto-refresh (adaptive)", value=True)
+
+upcoming = breach_time_index(df.attrs.get('snapshot_version', 0), df).breaching_within(now, [1, 4])
+refresh_plan = tkts_refresh.plan_refresh(
+    df.attrs.get('fetched_at'),
+    breaching_1h=upcoming[1],
+    breaching_4h=upcoming[4],
+    delta=df.attrs.get('delta'),
+    snapshot_version=df.attrs.get('snapshot_version', 0)
+)
+st.session_state["refresh_plan"] = refresh_plan
+tkts_refresh.refresh_timer(refresh_plan, enabled=auto_refresh)
+
+if 'fetched_at' in df.attrs:
+    st.caption(f"Data last refreshed: {df.attrs['fetched_at'].strftime('%Y-%m-%d %H:%M:%S')}")
+
+upstream = perf.upstream_calls_last_hour()
+upstream_by_source = ", ".join(f"{source} {count}" for source, count in upstream.items() if source != "total")
+refresh_status = (f"Next refresh in ~{refresh_plan['delay_s'] / 60:.0f} min ({refresh_plan['reason']})"
+                  if auto_refresh else "Auto-refresh off")
+st.caption(f"{refresh_status} · Upstream calls in the last hour: {upstream['total']}"
+           + (f" ({upstream_by_source})" if upstream_by_source else ""))
+
+# --- 11b. NEW: Debug Footer (open the app with ?debug=1) ---
+run_summary = perf.finish_run(
+    view=active_view or "tabs",
+    tickets=len(df),
+    refresh_interval_s=refresh_plan['interval_s'],
+    first_paint_ms=round(render_timings.get('first_paint', 0) * 1000, 2),
+    view_cpu_ms={view: round(cpu * 1000, 2) for view, cpu in view_cpu_times.items()},
+    render_cache=tkts_data.render_cache.stats()
+)
 
-if 'last_fetch_time' in st.session_state:
-    st.caption(f"Data last refreshed: {st.session_state['last_fetch_time'].strftime('%Y-%m-%d %H:%M:%S')}")
+if DEBUG_MODE:
+    full_run_ms = (time.perf_counter() - SCRIPT_START) * 1000
+    first_paint_ms = render_timings.get('first_paint', 0) * 1000
+    st.caption(f"⏱️ First meaningful paint: {first_paint_ms:.0f} ms · Full script run: {full_run_ms:.0f} ms")
+    view_cpu_summary = " · ".join(f"{view} {cpu * 1000:.0f} ms" for view, cpu in view_cpu_times.items())
+    st.caption(f"🧮 CPU per view ({'lazy' if LAZY_NAV else 'tabs'}): {view_cpu_summary}")
+
+    # --- NEW: Collapsible per-stage timings & cache stats ---
+    with st.expander("⏱️ Performance details"):
+        st.caption(f"Script run: {run_summary['total_ms']:.0f} ms (stages in start order; cached loaders show hit/miss)")
+        st.dataframe(pd.DataFrame(run_summary['stages']), hide_index=True)
+        st.caption("Cache hit rates (this process, all sessions)")
+        st.dataframe(pd.DataFrame.from_dict(run_summary['cache'], orient='index'))
+        render_stats = run_summary['render_cache']
+        st.caption(f"Shared render cache: {render_stats['entries']} views, "
+                   f"{render_stats['bytes'] / 2**20:.1f} of {render_stats['max_bytes'] / 2**20:.0f} MB, "
+                   f"hit ratio {render_stats['hit_ratio'] if render_stats['hit_ratio'] is not None else '-'}, "
+                   f"{render_stats['evictions']} evicted (render.* rows above are per view)")
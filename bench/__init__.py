@@ -0,0 +1,13 @@
+"""
+Offline benchmarks for the TKTS Dashboard.
+
+Everything here runs against a local fake Jira/Gmail server fed by seeded
+synthetic data, so refresh cost can be measured without touching the real
+Atlassian or Google APIs. Start with:
+
+    python -m bench.run_bench --sizes 1000 10000
+
+bench.import_time and bench.timestamps measure single costs (cold imports,
+timestamp parsing) without a server. bench.load_test drives many concurrent
+browser sessions against a real `streamlit run` of the page.
+"""
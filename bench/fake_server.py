@@ -0,0 +1,370 @@
+"""
+A local stand-in for the Jira Cloud and Gmail REST APIs.
+
+Serves just the endpoints the dashboard uses:
+
+    POST /rest/api/3/search/jql          (nextPageToken pagination, field projection)
+    GET  /rest/api/3/issue/{key}         (field projection, 404 for unknown keys)
+    GET  /rest/api/3/issue/{key}/changelog  (startAt/maxResults pagination)
+    POST /rest/api/3/changelog/bulkfetch (fieldIds filter, nextPageToken pagination)
+    GET  /gmail/v1/users/me/messages     (list)
+    GET  /gmail/v1/users/me/messages/{id}
+    POST /batch                          (Gmail multipart/mixed batch)
+    POST /token                          (OAuth refresh_token grant)
+
+The JQL is not parsed; the server picks the dataset from the shape of the
+query the loaders send (active / created-or-resolved today / assignee
+CHANGED / key in (...)). Run it standalone to point a real `streamlit run`
+at it:
+
+    python -m bench.fake_server --issues 5000 --port 8765
+"""
+import argparse
+import bisect
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bench import generators
+
+
+class FakeBackend:
+    """The synthetic Jira project + mailbox behind one fake server."""
+
+    def __init__(self, issues=1000, daily=None, emails=50, seed=0, page_size=1000, latency_ms=0, now=None,
+                 strict_jql=False, bulk_changelog=True):
+        self.issues = issues
+        self.daily = daily if daily is not None else max(issues // 10, 10)
+        self.emails = emails
+        self.seed = seed
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        # Like real Jira: `key in (...)` with an unknown key fails with a 400
+        self.strict_jql = strict_jql
+        # False: 404 on /changelog/bulkfetch, like sites without it
+        self.bulk_changelog = bulk_changelog
+        # Frozen clock: every page of a pagination walk sees the same data
+        self.now = now or generators.utc_now()
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.token_refreshes = 0
+        self.changelog_requests = 0
+        # key -> changelog entries added after startup by reassign()
+        self.reassignments = {}
+        self._updated_order = None # (updated, index) of the active issues, built on first use
+        self._lock = threading.Lock()
+
+        # Mostly active tickets, plus a few older keys Jira knows about but
+        # the snapshot doesn't (they exercise the "could not match" path).
+        rng = generators.random.Random(seed)
+        active_keys = [f"TKTS-{generators.KEY_BASE + i}" for i in range(issues)]
+        old_keys = [f"TKTS-{generators.KEY_BASE - 1 - i}" for i in range(20)]
+        self.priority_keys = rng.sample(active_keys, k=min(len(active_keys), 25)) + old_keys[:5]
+
+    # --- Datasets ---
+    def active(self, index):
+        return generators.active_issue(self.seed, index, self.now)
+
+    def daily_issue(self, index):
+        return generators.daily_issue(self.seed, index, self.issues, self.now)
+
+    def old_issue(self, number):
+        """A resolved ticket from before today (keys below KEY_BASE)."""
+        issue = generators.daily_issue(self.seed, 3 * number + 1, self.issues, self.now)
+        issue["key"] = f"TKTS-{generators.KEY_BASE - 1 - number}"
+        issue["fields"]["resolutiondate"] = generators.jira_datetime(self.now.replace(year=self.now.year - 1))
+        return issue
+
+    def with_reassignments(self, issue):
+        """Applies reassign() calls to a generated issue (assignee, updated)."""
+        extra = self.reassignments.get(issue["key"])
+        if extra:
+            issue["fields"]["assignee"] = generators._user(extra[-1]["items"][0]["toString"])
+            issue["fields"]["updated"] = extra[-1]["created"]
+        return issue
+
+    def reassign(self, key, assignee):
+        """Reassigns an issue now: one more changelog entry, and a newer `updated`."""
+        history = self.changelog(key)
+        current = self.issue_by_key(key)["fields"]["assignee"]
+        entry = generators.changelog_entry(int(history[-1]["id"]) + 1, generators.utc_now(),
+                                           [generators.assignee_item(current and current["displayName"], assignee)])
+        with self._lock:
+            self.reassignments.setdefault(key, []).append(entry)
+
+    def changelog(self, key):
+        """Generated history of an issue (ending at its generated assignee) plus reassign() entries."""
+        issue = self.generated_issue(key)
+        if issue is None:
+            return None
+        assignee = issue["fields"]["assignee"]
+        history = generators.changelog(self.seed, int(key.split("-")[1]), assignee and assignee["displayName"], self.now)
+        return history + self.reassignments.get(key, [])
+
+    def issue_by_key(self, key):
+        issue = self.generated_issue(key)
+        return self.with_reassignments(issue) if issue else None
+
+    def generated_issue(self, key):
+        match = re.fullmatch(r"TKTS-(\d+)", key.upper())
+        if not match:
+            return None
+        number = int(match.group(1))
+        if generators.KEY_BASE <= number < generators.KEY_BASE + self.issues:
+            return self.active(number - generators.KEY_BASE)
+        if number >= generators.KEY_BASE + self.issues:
+            index = number - generators.KEY_BASE - self.issues
+            return self.daily_issue(index) if index < self.daily else None
+        if generators.KEY_BASE - number <= 20:
+            return self.old_issue(generators.KEY_BASE - 1 - number)
+        return None
+
+    def search(self, jql):
+        """
+        Returns (count, issue_at(index)) for the dataset a JQL query asks for,
+        or (None, None) when strict_jql rejects the query.
+        """
+        key_list = re.search(r"key\s+in\s*\(([^)]*)\)", jql, re.IGNORECASE)
+        if key_list:
+            keys = [k.strip().strip('"\'') for k in key_list.group(1).split(",") if k.strip()]
+            found = [issue for issue in map(self.issue_by_key, keys) if issue]
+            if self.strict_jql and len(found) < len(keys):
+                return None, None
+            return len(found), found.__getitem__
+        updated_window = re.search(r'updated\s*>=\s*"-(\d+)m"', jql)
+        if updated_window:
+            # The narrow SLA pass of load_jira_data: active issues updated in the window
+            matching = self.updated_since(self.now - timedelta(minutes=int(updated_window.group(1))))
+            return len(matching), lambda i: self.active(matching[i])
+        if "assignee CHANGED" in jql:
+            count = max(self.issues // 20, 5)
+            return count, lambda i: self.with_reassignments(self.active((i * 7) % self.issues))
+        if "resolutiondate" in jql:
+            return self.daily, self.daily_issue
+        return self.issues, self.active
+
+    def updated_since(self, cutoff):
+        """Indices of the active issues with `updated` >= cutoff (sorted once, then bisected)."""
+        with self._lock:
+            if self._updated_order is None:
+                self._updated_order = sorted(
+                    (datetime.strptime(self.active(i)["fields"]["updated"], "%Y-%m-%dT%H:%M:%S.%f%z"), i)
+                    for i in range(self.issues))
+        position = bisect.bisect_left(self._updated_order, (cutoff, -1))
+        return [index for _, index in self._updated_order[position:]]
+
+    def message(self, index):
+        return generators.priority_email(self.seed, index, self.priority_keys, self.now)
+
+
+def project_fields(issue, fields):
+    """Mimics Jira's `fields` projection (only requested fields come back)."""
+    if not fields or "*all" in fields:
+        return issue
+    wanted = set(fields)
+    projected = {k: v for k, v in issue.items() if k != "fields"}
+    projected["fields"] = {k: v for k, v in issue["fields"].items() if k in wanted}
+    return projected
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    backend = None # set by serve()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        if self.backend.latency_ms:
+            time.sleep(self.backend.latency_ms / 1000)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        with self.backend._lock:
+            self.backend.request_count += 1
+            self.backend.bytes_sent += len(payload)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    # --- Jira ---
+    def _search_jql(self):
+        request = json.loads(self._body() or b"{}")
+        count, issue_at = self.backend.search(request.get("jql", ""))
+        if count is None:
+            self._send(400, {"errorMessages": ["An issue with key does not exist for field 'key'."], "errors": {}})
+            return
+        page_size = min(int(request.get("maxResults", 50)), self.backend.page_size)
+        start = int(request.get("nextPageToken") or 0)
+        end = min(start + page_size, count)
+        fields = request.get("fields")
+        page = {"issues": [project_fields(issue_at(i), fields) for i in range(start, end)], "isLast": end >= count}
+        if end < count:
+            page["nextPageToken"] = str(end)
+        self._send(200, page)
+
+    def _get_changelog(self, key, query):
+        history = self.backend.changelog(key)
+        if history is None:
+            self._send(404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}})
+            return
+        start = int(query.get("startAt", ["0"])[0])
+        page_size = min(int(query.get("maxResults", ["100"])[0]), 100)
+        values = history[start:start + page_size]
+        with self.backend._lock:
+            self.backend.changelog_requests += 1
+        self._send(200, {"startAt": start, "maxResults": page_size, "total": len(history),
+                         "isLast": start + page_size >= len(history), "values": values})
+
+    def _bulk_changelog(self):
+        request = json.loads(self._body() or b"{}")
+        if not self.backend.bulk_changelog:
+            self._send(404, {"errorMessages": ["No route for POST /rest/api/3/changelog/bulkfetch"]})
+            return
+        wanted = set(request.get("fieldIds") or [])
+        # Issue ids are 200000 + (key number - KEY_BASE), see generators
+        entries = []
+        for id_or_key in request.get("issueIdsOrKeys", []):
+            issue_id = str(id_or_key)
+            key = issue_id if "-" in issue_id else f"TKTS-{int(issue_id) - 200000 + generators.KEY_BASE}"
+            for entry in self.backend.changelog(key) or []:
+                items = [item for item in entry["items"] if not wanted or item["fieldId"] in wanted]
+                if items:
+                    entries.append((issue_id, {**entry, "items": items}))
+        start = int(request.get("nextPageToken") or 0)
+        end = min(start + int(request.get("maxResults", 1000)), len(entries))
+        logs = {}
+        for issue_id, entry in entries[start:end]:
+            logs.setdefault(issue_id, []).append(entry)
+        with self.backend._lock:
+            self.backend.changelog_requests += 1
+        page = {"issueChangeLogs": [{"issueId": issue_id, "changeHistories": history} for issue_id, history in logs.items()]}
+        if end < len(entries):
+            page["nextPageToken"] = str(end)
+        self._send(200, page)
+
+    def _get_issue(self, key, query):
+        issue = self.backend.issue_by_key(key)
+        if issue is None:
+            self._send(404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}})
+            return
+        fields = query.get("fields", [""])[0].split(",") if "fields" in query else None
+        self._send(200, project_fields(issue, [f for f in fields if f] if fields else None))
+
+    # --- Gmail ---
+    def _gmail_get(self, path):
+        message_id = path.rsplit("/", 1)[-1]
+        if message_id == "messages":
+            messages = [{"id": f"18c{i:013x}", "threadId": f"18c{i:013x}"} for i in range(self.backend.emails)]
+            return 200, {"messages": messages, "resultSizeEstimate": len(messages)}
+        # Message ids encode their index (see generators.priority_email)
+        index = int(message_id[3:], 16) if re.fullmatch(r"18c[0-9a-f]{13}", message_id) else -1
+        if 0 <= index < self.backend.emails:
+            return 200, self.backend.message(index)
+        return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+
+    def _gmail_batch(self):
+        body = self._body()
+        content_type = self.headers["Content-Type"]
+        multipart = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        out = []
+        for part in multipart.get_payload():
+            content_id = part["Content-ID"].strip("<>")
+            request_line = part.get_payload().splitlines()[0]
+            path = urlparse(request_line.split(" ")[1]).path
+            status, response = self._gmail_get(path)
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(response)}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        self._send(200, "".join(out).encode(), content_type=f"multipart/mixed; boundary={boundary}")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == "/rest/api/3/search/jql":
+            self._search_jql()
+        elif path == "/rest/api/3/changelog/bulkfetch":
+            self._bulk_changelog()
+        elif path.startswith("/batch"):
+            self._gmail_batch()
+        elif path == "/token":
+            self._body()
+            with self.backend._lock:
+                self.backend.token_refreshes += 1
+            self._send(200, {"access_token": f"fake-access-{uuid.uuid4().hex}", "expires_in": 3599,
+                             "token_type": "Bearer", "scope": "https://www.googleapis.com/auth/gmail.readonly"})
+        else:
+            self._send(404, {"errorMessages": [f"No route for POST {path}"]})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        issue_route = re.fullmatch(r"/rest/api/3/issue/([^/]+)", url.path)
+        changelog_route = re.fullmatch(r"/rest/api/3/issue/([^/]+)/changelog", url.path)
+        if changelog_route:
+            self._get_changelog(changelog_route.group(1), query)
+        elif issue_route:
+            self._get_issue(issue_route.group(1), query)
+        elif url.path.startswith("/gmail/v1/users/me/messages"):
+            self._send(*self._gmail_get(url.path))
+        else:
+            self._send(404, {"errorMessages": [f"No route for GET {url.path}"]})
+
+
+def serve(backend, host="127.0.0.1", port=0):
+    """Starts the fake server in a daemon thread. Returns (server, base_url)."""
+    handler = type("BoundFakeHandler", (FakeHandler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def gmail_service(base_url):
+    """
+    A real googleapiclient Gmail service pointed at the fake server. The
+    static discovery document is patched so batch calls hit it too.
+    """
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = json.loads(get_static_doc("gmail", "v1"))
+    document["rootUrl"] = base_url + "/"
+    document["baseUrl"] = base_url + "/"
+    return build_from_document(document, http=httplib2.Http())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake Jira/Gmail server.")
+    parser.add_argument("--issues", type=int, default=1000)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    backend = FakeBackend(issues=args.issues, emails=args.emails, seed=args.seed, latency_ms=args.latency_ms)
+    server, base_url = serve(backend, port=args.port)
+    print(f"Fake Jira/Gmail serving {args.issues} active issues at {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
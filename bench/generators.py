@@ -0,0 +1,294 @@
+"""
+Seeded synthetic data for the offline benchmarks.
+
+Issues are generated on demand from (seed, index), so the fake server can
+page through 100k tickets without ever holding them all in memory, and
+the same seed always produces byte-identical responses.
+"""
+import base64
+import random
+import zlib
+from datetime import datetime, timedelta, timezone
+
+REQUEST_TYPES = [
+    "ANZ - Display Creatives", "ANZ - Video Creatives", "ANZ - Standard Pixels",
+    "DE - Display Creatives", "DE - Video Creatives", "IN - Display Creatives",
+    "IN - Native Creatives", "IN - Troubleshooting Requests", "Lenovo - Trackers",
+    "MENA - Display Creatives", "MENA - Bespoke Requests", "SEA - Display Creatives",
+    "SEA - Celtra Creatives", "SEA - Troubleshooting Creatives", "UK - Display Creatives",
+    "UK - CTV Creatives", "UK - Bespoke Requests", "UK - Video Creatives",
+    "China - Inbound", "China - Bespoke Request",
+]
+ACTIVE_STATUSES = ["Open", "In Progress", "Reopened", "Waiting for customer", "Waiting for support"]
+CLOSED_STATUSES = ["Closed", "Resolved", "Done"]
+FIRST_NAMES = ["Aarav", "Chloe", "Daniel", "Fatima", "Hiro", "Isla", "Jonas", "Kavya",
+               "Liam", "Mei", "Noah", "Omar", "Priya", "Ravi", "Sofia", "Tariq"]
+LAST_NAMES = ["Shah", "Nguyen", "Muller", "Khan", "Tanaka", "Brown", "Fischer", "Iyer"]
+ASSIGNEES = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES][:60]
+BRANDS = ["Lenovo", "Nestle", "Unilever", "Samsung", "Emirates", "Qantas", "Adidas", "Heineken",
+          "Toyota", "Visa", "Spotify", "L'Oreal", "Grab", "Flipkart", "Tesco", "Vodafone"]
+CAMPAIGNS = ["Black Friday", "Diwali", "Ramadan", "Summer Sale", "Back to School", "Singles Day",
+             "Brand Awareness", "Product Launch", "Holiday", "Retargeting"]
+ASKS = ["new tags", "resize 300x250 and 728x90", "swap end card", "update click trackers",
+        "fix broken impression pixel", "QA before launch", "add VAST wrapper", "localise copy"]
+
+# Keys of the active snapshot start here; today's created/resolved tickets
+# are numbered after the active range so the two sets overlap only partly.
+KEY_BASE = 100000
+SLA_GOAL_HOURS = [4, 8, 24, 48, 72]
+
+
+def _rng(seed, index, stream):
+    return random.Random(f"{seed}:{stream}:{index}")
+
+
+def jira_datetime(dt):
+    """Jira's field format, e.g. 2026-10-19T09:12:33.123+0000."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}" + dt.strftime("%z")
+
+
+def _sla_timestamp(dt):
+    return {
+        "iso8601": dt.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "jira": jira_datetime(dt),
+        "friendly": dt.strftime("%d/%b/%y %I:%M %p"),
+        "epochMillis": int(dt.timestamp() * 1000),
+    }
+
+
+def _duration(millis):
+    hours, rem = divmod(abs(millis) // 1000, 3600)
+    return {"millis": millis, "friendly": f"{hours}h {rem // 60}m"}
+
+
+def _sla_cycle(start, goal_hours, now, ongoing):
+    breach = start + timedelta(hours=goal_hours)
+    goal_ms = goal_hours * 3600 * 1000
+    end = now if ongoing else start + timedelta(hours=goal_hours * 0.6)
+    elapsed_ms = int((end - start).total_seconds() * 1000)
+    cycle = {
+        "startTime": _sla_timestamp(start),
+        "breachTime": _sla_timestamp(breach),
+        "breached": breach < end,
+        "goalDuration": _duration(goal_ms),
+        "elapsedTime": _duration(elapsed_ms),
+        "remainingTime": _duration(goal_ms - elapsed_ms),
+    }
+    if ongoing:
+        cycle.update({"paused": False, "withinCalendarHours": True})
+    else:
+        cycle["stopTime"] = _sla_timestamp(end)
+    return cycle
+
+
+def sla_field(rng, created, now, key):
+    """
+    A Jira Service Management SLA payload (customfield_10704), shaped like
+    the real 'Time to resolution' field: an ongoing cycle most of the time,
+    sometimes only completed cycles, and occasionally no SLA at all.
+    """
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    goal = rng.choice(SLA_GOAL_HOURS)
+    field = {
+        "id": "3",
+        "name": "Time to resolution",
+        "_links": {"self": f"https://example.atlassian.net/rest/servicedeskapi/request/{key}/sla/3"},
+        "completedCycles": [],
+        "slaDisplayFormat": "NEW_SLA_FORMAT",
+    }
+    for _ in range(rng.choice([0, 0, 0, 1, 2])):
+        field["completedCycles"].append(_sla_cycle(created, goal, now, ongoing=False))
+    if roll < 0.90 or not field["completedCycles"]:
+        # Ongoing cycle restarted somewhere between creation and now
+        restart = created + (now - created) * rng.random() * 0.5
+        field["ongoingCycle"] = _sla_cycle(restart, goal, now, ongoing=True)
+    return field
+
+
+def _user(name):
+    slug = name.lower().replace(" ", ".")
+    account_id = f"712020:{zlib.crc32(slug.encode()) % 10**12:012d}"
+    return {
+        "self": f"https://example.atlassian.net/rest/api/3/user?accountId={account_id}",
+        "accountId": account_id,
+        "emailAddress": f"{slug}@example.com",
+        "avatarUrls": {size: f"https://avatar.example.com/{slug}/{size}.png"
+                       for size in ["48x48", "24x24", "16x16", "32x32"]},
+        "displayName": name,
+        "active": True,
+        "timeZone": "Asia/Kolkata",
+        "accountType": "atlassian",
+    }
+
+
+def _status(name):
+    category = "done" if name in CLOSED_STATUSES else "indeterminate"
+    return {
+        "self": "https://example.atlassian.net/rest/api/3/status/3",
+        "description": "",
+        "name": name,
+        "id": str(zlib.crc32(name.encode()) % 10000),
+        "statusCategory": {"id": 4, "key": category, "colorName": "yellow", "name": category.title()},
+    }
+
+
+def _issuetype(name):
+    return {
+        "self": "https://example.atlassian.net/rest/api/3/issuetype/10300",
+        "id": str(zlib.crc32(name.encode()) % 100000),
+        "description": "",
+        "name": name,
+        "subtask": False,
+        "hierarchyLevel": 0,
+    }
+
+
+PROJECT = {
+    "self": "https://example.atlassian.net/rest/api/3/project/10100",
+    "id": "10100",
+    "key": "TKTS",
+    "name": "AdOps Tickets",
+    "projectTypeKey": "service_desk",
+    "simplified": False,
+}
+
+
+def _summary(seed, index, request_type):
+    # Own stream, so adding summaries didn't change any other generated field
+    rng = _rng(seed, index, "summary")
+    market = request_type.split(" - ")[0]
+    return f"{rng.choice(BRANDS)} {rng.choice(CAMPAIGNS)} {market} - {rng.choice(ASKS)}"
+
+
+def active_issue(seed, index, now):
+    """Issue #index of the active snapshot (status in the active set)."""
+    rng = _rng(seed, index, "active")
+    key = f"TKTS-{KEY_BASE + index}"
+    created = now - timedelta(hours=rng.uniform(0.1, 24 * 21))
+    request_type = rng.choice(REQUEST_TYPES)
+    campaign = (now + timedelta(days=rng.randint(-5, 30))).strftime("%Y-%m-%d")
+    fields = {
+        "summary": _summary(seed, index, request_type),
+        "status": _status(rng.choice(ACTIVE_STATUSES)),
+        "assignee": _user(rng.choice(ASSIGNEES)) if rng.random() > 0.1 else None,
+        "created": jira_datetime(created),
+        "updated": jira_datetime(created + (now - created) * rng.random()),
+        "project": PROJECT,
+        "issuetype": _issuetype(request_type),
+        "customfield_10704": sla_field(rng, created, now, key),
+        "customfield_10522": campaign if rng.random() < 0.7 else None,
+        "customfield_16020": campaign if request_type.startswith("China") and rng.random() < 0.8 else None,
+        "resolutiondate": None,
+    }
+    return {"id": str(200000 + index), "key": key, "self": f"https://example.atlassian.net/rest/api/3/issue/{200000 + index}", "fields": fields}
+
+
+def daily_issue(seed, index, active_count, now):
+    """
+    Issue #index of the created/resolved-today set. A third of them are
+    also in the active snapshot (created today, still open).
+    """
+    rng = _rng(seed, index, "daily")
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    since_midnight = max((now - start_of_day).total_seconds(), 60)
+    if index % 3 == 0 and active_count:
+        issue = active_issue(seed, rng.randrange(active_count), now)
+        issue["fields"]["created"] = jira_datetime(start_of_day + timedelta(seconds=rng.uniform(0, since_midnight)))
+        return issue
+    key_number = KEY_BASE + active_count + index
+    created = start_of_day + timedelta(seconds=rng.uniform(-86400 * 3, since_midnight))
+    resolved = start_of_day + timedelta(seconds=rng.uniform(0, since_midnight))
+    fields = {
+        "status": _status(rng.choice(CLOSED_STATUSES)),
+        "assignee": _user(rng.choice(ASSIGNEES)) if rng.random() > 0.05 else None,
+        "created": jira_datetime(created),
+        "updated": jira_datetime(resolved),
+        "resolutiondate": jira_datetime(max(resolved, created)),
+        "project": PROJECT,
+        "issuetype": _issuetype(rng.choice(REQUEST_TYPES)),
+    }
+    fields["summary"] = _summary(seed, key_number, fields["issuetype"]["name"])
+    return {"id": str(200000 + key_number - KEY_BASE), "key": f"TKTS-{key_number}", "fields": fields}
+
+
+def changelog_entry(entry_id, at, items, author=None):
+    return {"id": str(entry_id), "author": _user(author or ASSIGNEES[0]), "created": jira_datetime(at), "items": items}
+
+
+def assignee_item(previous, current):
+    account = lambda name: _user(name)["accountId"] if name else None
+    return {"field": "assignee", "fieldtype": "jira", "fieldId": "assignee",
+            "from": account(previous), "fromString": previous, "to": account(current), "toString": current}
+
+
+def changelog(seed, number, current_assignee, now):
+    """
+    The changelog of TKTS-<number>, oldest first: some status/assignee
+    changes before today, then 1-3 reassignments today (with the odd status
+    change in between), the last one to the issue's current assignee.
+    Entry ids are increasing, like Jira's.
+    """
+    rng = _rng(seed, number, "changelog")
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    since_midnight = max((now - start_of_day).total_seconds(), 60)
+    older = sorted(start_of_day - timedelta(hours=rng.uniform(1, 24 * 14)) for _ in range(rng.randint(1, 5)))
+    today = sorted(start_of_day + timedelta(seconds=rng.uniform(0, since_midnight)) for _ in range(rng.randint(1, 3)))
+
+    entries, assignee = [], None
+    for at in older:
+        if rng.random() < 0.5:
+            to = rng.choice(ASSIGNEES)
+            items = [assignee_item(assignee, to)]
+            assignee = to
+        else:
+            items = [{"field": "status", "fieldtype": "jira", "fieldId": "status",
+                      "fromString": rng.choice(ACTIVE_STATUSES), "toString": rng.choice(ACTIVE_STATUSES)}]
+        entries.append(changelog_entry(number * 100 + len(entries), at, items, rng.choice(ASSIGNEES)))
+    for i, at in enumerate(today):
+        to = current_assignee if i == len(today) - 1 else rng.choice(ASSIGNEES)
+        items = [assignee_item(assignee, to)]
+        if rng.random() < 0.3:
+            items.append({"field": "status", "fieldtype": "jira", "fieldId": "status",
+                          "fromString": "Open", "toString": "In Progress"})
+        entries.append(changelog_entry(number * 100 + len(entries), at, items, rng.choice(ASSIGNEES)))
+        assignee = to
+    return entries
+
+
+def priority_email(seed, index, ticket_keys, now):
+    """
+    A Gmail message in format='full' mentioning 1-3 ticket keys, with the
+    body split into text/plain and text/html parts like a real client sends.
+    """
+    rng = _rng(seed, index, "gmail")
+    mentioned = rng.sample(ticket_keys, k=min(len(ticket_keys), rng.randint(1, 3)))
+    subject = f"URGENT: please prioritise {mentioned[0]}"
+    text = "Hi team,\n\nPlease prioritize the following tickets today:\n" + \
+        "\n".join(f"- {key}" for key in mentioned) + "\n\nThanks,\nAccount team\n"
+    encode = lambda value: base64.urlsafe_b64encode(value.encode()).decode()
+    return {
+        "id": f"18c{index:013x}",
+        "threadId": f"18c{index:013x}",
+        "labelIds": ["INBOX", "IMPORTANT"],
+        "snippet": text[:100],
+        "internalDate": str(int(now.timestamp() * 1000)),
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "From", "value": "Account Team <accounts@example.com>"},
+                {"name": "To", "value": "adops-ea@miqdigital.com"},
+                {"name": "Subject", "value": subject},
+                {"name": "Date", "value": now.strftime("%a, %d %b %Y %H:%M:%S +0000")},
+            ],
+            "parts": [
+                {"partId": "0", "mimeType": "text/plain", "body": {"size": len(text), "data": encode(text)}},
+                {"partId": "1", "mimeType": "text/html", "body": {"size": len(text), "data": encode(f"<p>{text}</p>")}},
+            ],
+        },
+    }
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
@@ -0,0 +1,60 @@
+"""
+Cold-process import cost of the dashboard, from `python -X importtime`.
+
+Each module set is imported in a fresh interpreter, so nothing is already
+in sys.modules:
+
+    app        what app.py imports before the first metrics are painted
+    deferred   what is only imported on demand (Gmail client, Altair)
+    eager      both, i.e. what every cold start paid before they were deferred
+
+    python -m bench.import_time
+    python -m bench.import_time --top 15
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULE_SETS = {
+    "app": ["streamlit", "requests", "pandas", "tenacity", "tkts_perf", "tkts_data", "tkts_refresh", "tkts_search"],
+    "deferred": ["googleapiclient.discovery", "google.oauth2.credentials", "altair"],
+}
+MODULE_SETS["eager"] = MODULE_SETS["app"] + MODULE_SETS["deferred"]
+
+
+def import_times(modules):
+    """Returns ({module: cumulative us} for top-level imports, total us) of one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue # header line
+        # Nested imports are indented under their parent; keep top-level ones
+        if not parts[2].startswith("  "):
+            cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative, sum(cumulative.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of the dashboard modules.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    for label, modules in MODULE_SETS.items():
+        runs = [import_times(modules) for _ in range(args.repeat)]
+        total_ms = statistics.median(total for _, total in runs) / 1000
+        print(f"\n== {label}: {total_ms:.0f} ms (median of {args.repeat} cold imports)")
+        slowest = sorted(runs[-1][0].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, us in slowest:
+            print(f"  {name:<40} {us / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
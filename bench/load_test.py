@@ -0,0 +1,398 @@
+"""
+Load/soak test: many concurrent dashboard sessions against one app server.
+
+Starts the fake Jira/Gmail server and a real `streamlit run app.py` pointed
+at it, then drives simulated viewers over Streamlit's own websocket
+protocol (the BackMsg/ForwardMsg protobufs a browser tab sends), so their
+reruns queue in the server exactly as real tabs' would. Each viewer opens
+the page, then loops: think (exponential, --think-seconds on average),
+then one action, picked with the --mix weights:
+
+    refresh    the adaptive auto-refresh timer firing (full rerun)
+    clock      an SLA clock fragment ticking (run_every fragment rerun)
+    filter     an All / Within SLA / Breached click (fragment rerun)
+    explorer   another assignee in the active-ticket explorer (fragment rerun)
+    lookup     a ticket-ID lookup on the TKTS LOOKUP tab (full rerun)
+
+Viewers are added in steps (--sessions 1 10 50 100 200); earlier ones stay
+connected. Each step reports the rerun latency (request sent to
+script_finished received) at p50/p95/p99, overall and per action, and the
+server process's CPU and RSS (read from /proc, so Linux only):
+
+    python -m bench.load_test
+    python -m bench.load_test --issues 10000 --sessions 1 25 50 100 200 --step-seconds 120 \\
+        --save bench/results/load.json
+    python -m bench.load_test --url http://localhost:8501 --pid 12345   # an app started by hand
+
+The viewers run on the same machine as the server and parse every message
+they are sent; the load generator's own CPU is reported too, so check it
+isn't the bottleneck at high session counts.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+import websockets
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from bench import generators
+from bench.fake_server import FakeBackend, gmail_service, serve
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+ACTIONS = ["refresh", "clock", "filter", "explorer", "lookup"]
+DEFAULT_MIX = [2, 3, 2, 2, 1] # same order as ACTIONS
+FILTER_LABELS = ("All (", "✅ Within SLA (", "🚨 Breached (")
+PERCENTILES = [50, 95, 99]
+
+
+# --- 1. Servers ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_secrets(directory, fake_url):
+    """secrets.toml pointing the app's Jira and Gmail settings at the fake server."""
+    # google-auth always refreshes against Google's token endpoint, so the
+    # access token is made not to expire during the run
+    gmail_token = json.dumps({"token": "fake-access", "refresh_token": "fake-refresh", "client_id": "load-test",
+                              "client_secret": "load-test", "expiry": "2099-01-01T00:00:00Z"})
+    path = os.path.join(directory, "secrets.toml")
+    with open(path, "w") as f:
+        f.write(f'JIRA_DOMAIN = "{fake_url}"\n'
+                f'JIRA_USER_EMAIL = "load@example.com"\n'
+                f'JIRA_API_TOKEN = "load-token"\n'
+                f'GMAIL_TOKEN = {json.dumps(gmail_token)}\n')
+    return path
+
+
+def start_app(fake_url, port, directory):
+    """Starts `streamlit run app.py` (see serve_app) and waits for its health check. Returns the Popen."""
+    log = open(os.path.join(directory, "app.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "bench.load_test", "serve-app", "--fake-url", fake_url, "--",
+         "--server.port", str(port), "--server.headless", "true", "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false", "--secrets.files", write_secrets(directory, fake_url)],
+        cwd=os.path.dirname(APP_PATH), stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"the app exited with {process.returncode}; see {log.name}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"the app did not come up within 60 s; see {log.name}")
+
+
+def serve_app(fake_url, streamlit_args):
+    """
+    Runs app.py under `streamlit run` in this process, with its Gmail client
+    built against the fake server (the app builds it for googleapis.com).
+    """
+    import tkts_data
+    from streamlit.web import cli
+
+    tkts_data.build_gmail_service = lambda creds: gmail_service(fake_url)
+    sys.argv = ["streamlit", "run", APP_PATH, *streamlit_args]
+    cli.main()
+
+
+def process_usage(pid):
+    """(CPU seconds, RSS bytes) of process `pid`, from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split() # the command name may contain spaces
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK") # utime + stime
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return cpu, rss
+
+
+# --- 2. Simulated Viewer ---
+class Viewer:
+    """One browser tab: a websocket session that reruns the app like the frontend does."""
+
+    def __init__(self, url, rng, ticket_keys, query_string="", timeout=120):
+        self.stream_url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+        self.rng = rng
+        self.ticket_keys = ticket_keys
+        self.query_string = query_string
+        self.timeout = timeout
+        self.ws = None
+        self.page_script_hash = ""
+        self.elements = {}     # widget key (label if unkeyed) -> (element type, proto, fragment id)
+        self.values = {}       # widget id -> WidgetState sent with every rerun, like the frontend
+        self.clock_fragments = set() # fragment ids with run_every
+
+    async def open(self):
+        """Connects and loads the page. Returns (ms, errors)."""
+        # No keepalive pings (the frontend has none either): a busy server
+        # would otherwise drop viewers for answering them late
+        self.ws = await websockets.connect(self.stream_url, subprotocols=["streamlit"], max_size=None,
+                                           ping_interval=None, open_timeout=self.timeout)
+        return await self.rerun()
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, triggers=(), fragment_id="", auto=False):
+        """Sends one rerun request and reads the run to its script_finished. Returns (ms, errors)."""
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = self.query_string
+        state.page_script_hash = self.page_script_hash
+        state.fragment_id = fragment_id
+        state.is_auto_rerun = auto
+        for widget in [*self.values.values(), *triggers]:
+            state.widget_states.widgets.add().CopyFrom(widget)
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        errors = 0
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "auto_rerun":
+                self.clock_fragments.add(forward.auto_rerun.fragment_id)
+            elif kind == "delta":
+                errors += self._register(forward.delta)
+            elif kind == "script_finished":
+                if forward.script_finished not in (ForwardMsg.FINISHED_SUCCESSFULLY,
+                                                   ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+                    errors += 1
+                return (time.perf_counter() - start) * 1000, errors
+
+    def _register(self, delta):
+        """Remembers the widgets a run rendered; returns 1 for an exception element."""
+        if delta.WhichOneof("type") != "new_element":
+            return 0
+        element_type = delta.new_element.WhichOneof("type")
+        if element_type == "exception":
+            return 1
+        element = getattr(delta.new_element, element_type)
+        widget_id = getattr(element, "id", "")
+        if widget_id.startswith("$$ID-"):
+            key = widget_id.rsplit("-", 1)[1]
+            self.elements[getattr(element, "label", key) if key == "None" else key] = (
+                element_type, element, delta.fragment_id)
+        return 0
+
+    async def act(self, action):
+        """Performs `action` (one of ACTIONS). Falls back to a refresh if its widget isn't on the page."""
+        if action == "clock" and self.clock_fragments:
+            return await self.rerun(fragment_id=self.rng.choice(sorted(self.clock_fragments)), auto=True)
+        if action == "filter":
+            buttons = [(element, fragment) for label, (_, element, fragment) in self.elements.items()
+                       if label.startswith(FILTER_LABELS)]
+            if buttons:
+                button, fragment = self.rng.choice(buttons)
+                return await self.rerun([WidgetState(id=button.id, trigger_value=True)], fragment_id=fragment)
+        if action == "explorer" and "assignee_select" in self.elements:
+            _, select, fragment = self.elements["assignee_select"]
+            if select.options:
+                self.values[select.id] = WidgetState(id=select.id, string_value=self.rng.choice(select.options))
+                return await self.rerun(fragment_id=fragment)
+        if action == "lookup" and {"ticket_search_input", "search_button"} <= self.elements.keys():
+            text_input = self.elements["ticket_search_input"][1]
+            self.values[text_input.id] = WidgetState(id=text_input.id, string_value=self.rng.choice(self.ticket_keys))
+            return await self.rerun([WidgetState(id=self.elements["search_button"][1].id, trigger_value=True)])
+        # refresh: what the refresh component sends when its timer fires
+        if "adaptive_refresh" in self.elements:
+            timer = self.elements["adaptive_refresh"][1]
+            token = json.loads(timer.json_args or "{}").get("token")
+            self.values[timer.id] = WidgetState(id=timer.id, json_value=json.dumps(
+                {"token": token, "fired_at": int(time.time() * 1000)}))
+        return await self.rerun()
+
+
+# --- 3. Load Steps ---
+class Recorder:
+    """(action, ms, errors) samples of the current step."""
+
+    def __init__(self):
+        self.samples = []
+
+    def add(self, action, ms, errors):
+        self.samples.append((action, ms, errors))
+
+
+async def viewer_loop(viewer, recorder, args, start_delay):
+    """Opens the page after `start_delay`, then acts until cancelled (or the connection fails)."""
+    rng = viewer.rng
+    await asyncio.sleep(start_delay)
+    try:
+        recorder.add("load", *await viewer.open())
+        while True:
+            await asyncio.sleep(rng.expovariate(1 / args.think_seconds) if args.think_seconds else 0)
+            action = rng.choices(ACTIONS, weights=args.mix)[0]
+            recorder.add(action, *await viewer.act(action))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Timed out or disconnected: counts as a failed rerun, and the viewer is gone
+        recorder.add("failed", float("nan"), 1)
+        print(f"viewer lost: {type(e).__name__}: {e}", file=sys.stderr)
+    finally:
+        await viewer.close()
+
+
+def summarize(samples, seconds):
+    """Latency percentiles overall and per action, from (action, ms, errors) samples."""
+    def percentiles(values):
+        values = [v for v in values if v == v] # drop failed (NaN) samples
+        return {f"p{p}": round(float(np.percentile(values, p)), 1) for p in PERCENTILES} if values else {}
+
+    by_action = {}
+    for action, ms, _ in samples:
+        by_action.setdefault(action, []).append(ms)
+    reruns = [ms for action, ms, _ in samples if action != "load"]
+    return {
+        "reruns": len(reruns),
+        "reruns_per_s": round(len(reruns) / seconds, 2),
+        "errors": sum(errors for _, _, errors in samples),
+        "latency_ms": percentiles(reruns),
+        "by_action": {action: {"count": len(values), **percentiles(values)}
+                      for action, values in sorted(by_action.items())},
+    }
+
+
+async def run_steps(url, pid, ticket_keys, args):
+    recorder = Recorder()
+    tasks, steps = [], []
+    rng = random.Random(args.seed)
+    try:
+        for sessions in args.sessions:
+            recorder.samples = []
+            # New viewers arrive spread over the first quarter of the step
+            for _ in range(len(tasks), sessions):
+                viewer = Viewer(url, random.Random(rng.random()), ticket_keys, args.query, args.timeout)
+                tasks.append(asyncio.create_task(viewer_loop(viewer, recorder, args, rng.uniform(0, args.step_seconds / 4))))
+
+            started = time.monotonic()
+            client_cpu = time.process_time()
+            server_cpu, rss = process_usage(pid) if pid else (None, None)
+            peak_rss = rss
+            while time.monotonic() - started < args.step_seconds:
+                await asyncio.sleep(1)
+                if pid:
+                    peak_rss = max(peak_rss, process_usage(pid)[1])
+            seconds = time.monotonic() - started
+
+            step = {"sessions": sessions, "connected": sum(not task.done() for task in tasks),
+                    **summarize(recorder.samples, seconds),
+                    "client_cpu_pct": round((time.process_time() - client_cpu) / seconds * 100, 1)}
+            if pid:
+                cpu, rss = process_usage(pid)
+                step.update(server_cpu_pct=round((cpu - server_cpu) / seconds * 100, 1),
+                            rss_mb=round(rss / 2**20, 1), peak_rss_mb=round(peak_rss / 2**20, 1))
+            steps.append(step)
+            print_step(step)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return steps
+
+
+def print_step(step):
+    latency = step["latency_ms"]
+    print(f"\n== {step['sessions']} sessions ({step['connected']} connected): {step['reruns']} reruns "
+          f"({step['reruns_per_s']}/s), {step['errors']} errors")
+    if latency:
+        print(f"  rerun latency    p50 {latency['p50']:>8.0f} ms   p95 {latency['p95']:>8.0f} ms   "
+              f"p99 {latency['p99']:>8.0f} ms")
+    if "server_cpu_pct" in step:
+        print(f"  server           CPU {step['server_cpu_pct']:.0f}% of a core, RSS {step['rss_mb']:.0f} MB "
+              f"(peak {step['peak_rss_mb']:.0f} MB)")
+    print(f"  load generator   CPU {step['client_cpu_pct']:.0f}% of a core")
+    for action, stats in step["by_action"].items():
+        if "p50" in stats:
+            print(f"  {action:<16} {stats['count']:>5} x   p50 {stats['p50']:>8.0f} ms   p95 {stats['p95']:>8.0f} ms")
+
+
+# --- 4. CLI ---
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "serve-app":
+        # Internal: the app process started by start_app()
+        parser = argparse.ArgumentParser(prog="bench.load_test serve-app")
+        parser.add_argument("--fake-url", required=True)
+        parser.add_argument("streamlit_args", nargs=argparse.REMAINDER)
+        args = parser.parse_args(sys.argv[2:])
+        serve_app(args.fake_url, [arg for arg in args.streamlit_args if arg != "--"])
+        return
+
+    parser = argparse.ArgumentParser(description="Drive many concurrent dashboard sessions and report rerun latency.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 25, 50, 100, 200],
+                        help="concurrent viewers per step (ramped up, earlier viewers stay)")
+    parser.add_argument("--step-seconds", type=float, default=60)
+    parser.add_argument("--think-seconds", type=float, default=5, help="mean pause between a viewer's actions")
+    parser.add_argument("--mix", type=float, nargs=len(ACTIONS), default=DEFAULT_MIX, metavar="W",
+                        help=f"action weights, in the order {' '.join(ACTIONS)}")
+    parser.add_argument("--issues", type=int, default=5000, help="active issues of the fake Jira")
+    parser.add_argument("--latency-ms", type=int, default=0, help="simulated per-request latency of the fake Jira")
+    parser.add_argument("--query", default="", help="query string of every viewer, e.g. 'nav=lazy&view=summary'")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a rerun counts as failed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="drive an app that is already running instead of starting one")
+    parser.add_argument("--pid", type=int, help="with --url: the app's process, for CPU/RSS")
+    parser.add_argument("--save", help="write results JSON here (e.g. bench/results/load.json)")
+    args = parser.parse_args()
+
+    servers, app = [], None
+    with tempfile.TemporaryDirectory(prefix="tkts-load-") as directory:
+        try:
+            if args.url:
+                url, pid = args.url, args.pid
+                ticket_keys = [str(generators.KEY_BASE + i) for i in range(args.issues)]
+            else:
+                backend = FakeBackend(issues=args.issues, seed=args.seed, latency_ms=args.latency_ms)
+                server, fake_url = serve(backend)
+                servers.append(server)
+                port = free_port()
+                print(f"Starting the app against {args.issues} fake issues...", file=sys.stderr)
+                app = start_app(fake_url, port, directory)
+                url, pid = f"http://127.0.0.1:{port}", app.pid
+                ticket_keys = [str(generators.KEY_BASE + i) for i in range(backend.issues)]
+            steps = asyncio.run(run_steps(url, pid, ticket_keys, args))
+        finally:
+            if app is not None:
+                app.terminate()
+                app.wait(timeout=30)
+            for server in servers:
+                server.shutdown()
+
+    if args.save:
+        from bench.run_bench import git_revision
+
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"created": datetime.now(timezone.utc).isoformat(), "git": git_revision(),
+                       "params": {key: value for key, value in vars(args).items() if key != "save"},
+                       "steps": steps}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+End-to-end refresh benchmark against the fake Jira/Gmail server.
+
+For each snapshot size it times, over several repeats:
+
+    load_jira_data         active-ticket fetch + parse (cache cleared each run)
+    load_all_jira_data     created/resolved-today fetch + parse
+    get_priority_ticket_set  Gmail list + batch + regex scan
+    section9               compute_sla() over the active frame
+    build_html_table       the SUMMARY table for all active tickets
+    priority_scan          match_priority_tickets()
+    breach_index.build     BreachTimeIndex over the snapshot (once per refresh)
+    breach_index.forecast  1h/4h/8h/24h counts + per-assignee forecast
+    workload               per-assignee workload/aging leaderboard
+    urgency.build          UrgencyQueue over a first snapshot (heapify)
+    urgency.update         next snapshot with a few deadlines moved (heap pushes)
+    urgency.top_k          top 10 for the wall display
+    search.sync            full-text index over a first snapshot
+    search.resync          next snapshot with a few tickets changed (incremental)
+    search.query           prefix search + status filter on the LOOKUP tab
+
+and saves the medians as JSON, with the response bytes of each Jira query
+(bytes_per_query; the first repeat is a full SLA pass, later ones are the
+narrow pass of a normal refresh). --sources N federates N Jira sources (each
+on its own fake server) to measure the parallel fan-out. Pass --compare to
+diff against a saved run:
+
+    python -m bench.run_bench --sizes 1000 10000 --save results.json
+    python -m bench.run_bench --sizes 1000 10000 --compare bench/baselines/user-030.json
+
+bench/baselines/user-030.json is the reference the later changes are
+measured against: this harness as first committed, before any of the
+optimizations, with the defaults (seed 0, 3 repeats, 50 emails, no
+latency). Timings depend on the machine, so compare runs from the same
+one; to regenerate it on yours:
+
+    git worktree add /tmp/tkts-030 "$(git log --reverse --format=%h --grep=user-030 | head -1)"
+    (cd /tmp/tkts-030 && python -m bench.run_bench --sizes 1000 10000 --save baseline.json)
+    cp /tmp/tkts-030/baseline.json bench/baselines/user-030.json
+    git worktree remove /tmp/tkts-030
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import tkts_data
+import tkts_perf as perf
+import tkts_search
+from bench.fake_server import FakeBackend, gmail_service, serve
+
+
+def summary_table_frame(df):
+    """The same frame app.py hands to build_html_table for the SUMMARY table."""
+    table_df = df.copy()
+    table_df['created'] = table_df['created'].dt.strftime('%d%b%Y %H:%M')
+    table_df['campaign_start_date'] = table_df['campaign_start_date'].dt.strftime('%d%b%Y')
+
+    final_table_df = pd.DataFrame()
+    final_table_df['TKTS'] = table_df['Ticket']
+    final_table_df['Link'] = table_df['Ticket Link']
+    final_table_df['Link Text'] = "Open ↗"
+    final_table_df['SLA Status'] = table_df['SLA Timer']
+    final_table_df['Status'] = table_df['status']
+    final_table_df['Assignee'] = table_df['assignee']
+    final_table_df['Request Type'] = table_df['request_type']
+    final_table_df['Created (UTC)'] = table_df['created']
+    final_table_df['Start Date'] = table_df['campaign_start_date']
+    return final_table_df
+
+SUMMARY_HTML_COLS = {
+    'TKTS': 'TKTS-No', 'Link': '', 'SLA Status': 'SLA', 'Status': 'Status', 'Assignee': 'Assignee',
+    'Request Type': 'Request Type', 'Created (UTC)': 'Created (UTC)', 'Start Date': 'Start Date'
+}
+
+
+def timed(results, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    results.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+    return value
+
+
+def bench_size(size, repeat, seed, latency_ms, emails, sources=1):
+    backends = [FakeBackend(issues=size, emails=emails, seed=seed + i, latency_ms=latency_ms) for i in range(sources)]
+    servers, urls = zip(*(serve(backend) for backend in backends))
+    backend, base_url = backends[0], urls[0]
+    tkts_data.configure(base_url, "bench@example.com", "bench-token", sources=[
+        {"name": f"SRC{i}", "project": f"SRC{i}", "domain": url, "rate_limit": 0} for i, url in enumerate(urls[1:], 1)
+    ])
+    service = gmail_service(base_url)
+    today_str = datetime.now(timezone.utc).strftime('%Y/%m/%d')
+
+    runs = {}
+    stage_runs = {}
+    query_bytes = {} # response bytes per Jira query (stage name), summed over the repeats
+    try:
+        for _ in range(repeat):
+            for loader in (tkts_data.load_jira_data, tkts_data.load_all_jira_data, tkts_data.get_priority_ticket_set):
+                loader.clear()
+            perf.start_run()
+
+            df = timed(runs, "load_jira_data", tkts_data.load_jira_data)
+            df_all = timed(runs, "load_all_jira_data", tkts_data.load_all_jira_data)
+            priority_set = timed(runs, "get_priority_ticket_set", tkts_data.get_priority_ticket_set, service, today_str)
+
+            now = pd.Timestamp.now(tz='UTC')
+            df = timed(runs, "section9", tkts_data.compute_sla, df, now)
+            table = summary_table_frame(df)
+            timed(runs, "build_html_table", tkts_data.build_html_table, table, SUMMARY_HTML_COLS,
+                  link_column_key="Link", link_text_col_key="Link Text")
+            timed(runs, "priority_scan", tkts_data.match_priority_tickets, df, df_all, priority_set)
+            index = timed(runs, "breach_index.build", tkts_data.BreachTimeIndex, df['breach_time_api'], df['assignee'])
+            timed(runs, "breach_index.forecast", lambda: (index.breaching_within(now, [1, 4, 8, 24]),
+                                                          index.forecast_by_assignee(now, [1, 4, 8, 24])))
+            timed(runs, "workload", tkts_data.compute_workload, df, now)
+            queue = tkts_data.UrgencyQueue()
+            timed(runs, "urgency.build", queue.apply, df, priority_set, 1)
+            moved = df.copy()
+            moved.loc[moved.index[::100], 'breach_time_api'] -= pd.Timedelta(hours=1)
+            timed(runs, "urgency.update", queue.apply, moved, priority_set, 2)
+            timed(runs, "urgency.top_k", queue.top_k, tkts_data.URGENCY_TOP_K)
+            search_index = tkts_search.TicketIndex()
+            timed(runs, "search.sync", search_index.sync, df, df_all)
+            moved.loc[moved.index[::100], 'status'] = "Reopened"
+            moved.attrs['snapshot_version'] = -1
+            timed(runs, "search.resync", search_index.sync, moved, df_all)
+            timed(runs, "search.query", search_index.search, "dis crea", statuses=["Open", "In Progress"])
+
+            # Network vs parse split recorded by the loaders themselves
+            per_run = {}
+            for record in perf.current_stages():
+                if "." in record["stage"]:
+                    per_run[record["stage"]] = per_run.get(record["stage"], 0) + record["ms"]
+                if record["stage"].endswith(".network"):
+                    query = record["stage"].removesuffix(".network")
+                    query_bytes[query] = query_bytes.get(query, 0) + record.get("bytes", 0)
+            for name, ms in per_run.items():
+                stage_runs.setdefault(name, []).append(ms)
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    def summarize(samples):
+        return {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2),
+                "runs_ms": [round(s, 2) for s in samples]}
+
+    return {
+        "rows": len(df),
+        "upstream_requests_per_refresh": sum(b.request_count for b in backends) // repeat,
+        "upstream_bytes_per_refresh": sum(b.bytes_sent for b in backends) // repeat,
+        "bytes_per_query": {name: total // repeat for name, total in sorted(query_bytes.items())},
+        "timings": {name: summarize(samples) for name, samples in runs.items()},
+        "stages": {name: summarize(samples) for name, samples in sorted(stage_runs.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, baseline=None):
+    for size, result in results["sizes"].items():
+        print(f"\n== {size} active issues ({result['upstream_requests_per_refresh']} upstream requests, "
+              f"{result['upstream_bytes_per_refresh'] / 1e6:.1f} MB per refresh)")
+        for query, size_bytes in result.get("bytes_per_query", {}).items():
+            print(f"  {query + ' response':<48} {size_bytes / 1e6:>10.2f} MB")
+        base = (baseline or {}).get("sizes", {}).get(size, {}).get("timings", {})
+        for name, timing in {**result["timings"], **result["stages"]}.items():
+            line = f"  {name:<48} {timing['median_ms']:>10.1f} ms"
+            if name in base:
+                ratio = timing["median_ms"] / base[name]["median_ms"] if base[name]["median_ms"] else float("nan")
+                line += f"   baseline {base[name]['median_ms']:>10.1f} ms  ({ratio:.2f}x)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a dashboard refresh against the fake Jira/Gmail server.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="active-issue counts (1k-100k)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--latency-ms", type=int, default=0, help="simulated per-request server latency")
+    parser.add_argument("--sources", type=int, default=1, help="federated Jira sources (one fake server each)")
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "params": {"repeat": args.repeat, "seed": args.seed, "emails": args.emails, "latency_ms": args.latency_ms,
+                   "sources": args.sources},
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} issues...", file=sys.stderr)
+        results["sizes"][str(size)] = bench_size(size, args.repeat, args.seed, args.latency_ms, args.emails,
+                                                args.sources)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Timestamp parsing cost of the Jira loaders, per timestamp shape.
+
+Compares pd.to_datetime (what the loaders used to call on each column,
+inferring the format) with tkts_data.parse_jira_timestamps on the same
+synthetic column, and checks that both give the same values:
+
+    created      '2026-10-19T09:12:33.123+0000' (created, resolutiondate)
+    breach       '2026-10-19T09:12:33+0000' (SLA breachTime)
+    date         '2026-10-19' (campaign start custom fields)
+
+Every column has a few missing values, as in real payloads.
+
+    python -m bench.timestamps
+    python -m bench.timestamps --count 100000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import tkts_data
+
+SHAPES = {
+    "created": ("%Y-%m-%dT%H:%M:%S.{ms}%z", False),
+    "breach": ("%Y-%m-%dT%H:%M:%S%z", False),
+    "date": ("%Y-%m-%d", True),
+}
+MISSING_FRACTION = 0.05
+
+
+def synthetic_column(shape, count, seed=0):
+    """`count` Jira-formatted timestamp strings (object dtype, some None) of one shape."""
+    rng = np.random.default_rng(seed)
+    pattern, _ = SHAPES[shape]
+    # Jira writes times in the site's zone; London mixes +0000 and +0100
+    times = (pd.Timestamp("2026-10-19", tz="UTC")
+             - pd.to_timedelta(rng.integers(0, 90 * 86400, count), unit="s")).tz_convert("Europe/London")
+    head, _, tail = pattern.partition(".{ms}")
+    text = pd.Series(times.strftime(head))
+    if tail:
+        # Jira writes milliseconds; strftime has no directive for them
+        text = text + "." + pd.Series(rng.integers(0, 1000, count)).map("{:03d}".format) + pd.Series(times.strftime(tail))
+    column = text.astype(object)
+    column[rng.random(count) < MISSING_FRACTION] = None
+    return column
+
+
+def current_path(values, date_only):
+    """The loaders' previous call for this column."""
+    if date_only:
+        return pd.to_datetime(values, utc=True, errors='coerce')
+    return pd.to_datetime(values, utc=True)
+
+
+def median_ms(parse, values, date_only, repeat):
+    """(median ms of `repeat` parses, the parsed column)"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = parse(values, date_only=date_only)
+        runs.append((time.perf_counter() - started) * 1000)
+    return statistics.median(runs), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timestamp parsing: pd.to_datetime vs parse_jira_timestamps.")
+    parser.add_argument("--count", type=int, default=100_000, help="timestamps per column")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'shape':<10} {'pd.to_datetime':>16} {'parse_jira_timestamps':>23} {'speedup':>8}  same values")
+    for shape, (_, date_only) in SHAPES.items():
+        values = synthetic_column(shape, args.count)
+        old_median, old = median_ms(current_path, values, date_only, args.repeat)
+        new_median, new = median_ms(tkts_data.parse_jira_timestamps, values, date_only, args.repeat)
+        same = old.dt.as_unit('us').equals(new)
+        print(f"{shape:<10} {old_median:>13.1f} ms {new_median:>20.1f} ms {old_median / new_median:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
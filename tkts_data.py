@@ -0,0 +1,1955 @@
+"""
+Data layer for the TKTS Dashboard.
+
+Jira/Gmail loaders, the section 9 SLA computation and the HTML table
+builder, kept free of any page rendering so they can be imported outside
+`streamlit run` (benchmarks, CLI tools). app.py calls configure() with its
+secrets before using any loader.
+"""
+import streamlit as st
+import requests
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+import time
+import itertools
+import functools
+import heapq
+import threading
+import queue
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from tenacity import retry, wait_fixed, stop_after_attempt, retry_if_exception_type, RetryError
+import re # --- NEW --- (For search)
+
+# --- START OF NEW SECTION (Gmail Imports) ---
+import base64 # <-- NEW: For reading email body
+# The Google client libraries (~200 ms to import) are imported inside the
+# Gmail functions, so processes without a GMAIL_TOKEN never load them.
+# --- END OF NEW SECTION ---
+
+import tkts_perf as perf
+
+logger = logging.getLogger("tkts.data")
+
+
+# --- 3. Configuration ---
+# Filled in by configure(); the loaders read these module globals.
+JIRA_DOMAIN = None
+JIRA_AUTH = None
+GMAIL_TOKEN = None
+JIRA_SOURCES = [] # [primary TKTS source, *extra federated sources]
+SHARED_SNAPSHOT = None # tkts_snapshot.SharedSnapshot when the loaders read a shared snapshot
+DEFAULT_STALE_LIMIT_SECONDS = 30 * 60
+STALE_LIMIT_SECONDS = DEFAULT_STALE_LIMIT_SECONDS # how long a failing source's last good data is served
+DEFAULT_RENDER_CACHE_MAX_MB = 64 # memory cap of the shared render cache (section 9d)
+
+def configure(jira_domain, jira_user_email, jira_api_token, gmail_token=None, sources=None, snapshot_dir=None,
+              stale_limit_seconds=None, render_cache_max_mb=None):
+    """
+    Points every loader at a Jira site (and optionally a Gmail token).
+    `sources` adds more Jira projects/sites to federate, as dicts (see
+    source_from_config); the TKTS project on jira_domain is always the first.
+    With `snapshot_dir`, the snapshot loaders read the files a
+    tkts_snapshot writer keeps there instead of calling Jira/Gmail.
+    `stale_limit_seconds` bounds how old the data served for a failing
+    source may get (see stale_while_revalidate), `render_cache_max_mb`
+    the memory of the shared render cache.
+    """
+    global JIRA_DOMAIN, JIRA_AUTH, GMAIL_TOKEN, JIRA_SOURCES, SHARED_SNAPSHOT, STALE_LIMIT_SECONDS
+    JIRA_DOMAIN = jira_domain.rstrip("/")
+    JIRA_AUTH = HTTPBasicAuth(jira_user_email, jira_api_token)
+    GMAIL_TOKEN = gmail_token
+    if snapshot_dir:
+        import tkts_snapshot
+        SHARED_SNAPSHOT = tkts_snapshot.SharedSnapshot(snapshot_dir)
+    else:
+        SHARED_SNAPSHOT = None
+    STALE_LIMIT_SECONDS = float(stale_limit_seconds or DEFAULT_STALE_LIMIT_SECONDS)
+    render_cache.resize(int(float(render_cache_max_mb or DEFAULT_RENDER_CACHE_MAX_MB) * 2**20))
+
+    primary = JiraSource("TKTS", JIRA_DOMAIN, JIRA_AUTH, project="TKTS", active_scope=TKTS_ACTIVE_SCOPE,
+                         upstream="jira")
+    extra = [source_from_config(config) for config in sources or []]
+    names = [source.name for source in [primary, *extra]]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Jira source names must be unique, got {names}")
+    JIRA_SOURCES = [primary, *extra]
+
+def configure_from_env(**overrides):
+    """
+    configure() from JIRA_DOMAIN / JIRA_USER_EMAIL / JIRA_API_TOKEN / GMAIL_TOKEN
+    env vars, plus JIRA_SOURCES (a JSON list of source dicts),
+    TKTS_SNAPSHOT_DIR, TKTS_STALE_LIMIT_SECONDS and TKTS_RENDER_CACHE_MAX_MB
+    if set. Keyword arguments of configure() override the environment.
+    """
+    settings = dict(
+        jira_domain=os.environ["JIRA_DOMAIN"],
+        jira_user_email=os.environ["JIRA_USER_EMAIL"],
+        jira_api_token=os.environ["JIRA_API_TOKEN"],
+        gmail_token=os.environ.get("GMAIL_TOKEN"),
+        sources=json.loads(os.environ.get("JIRA_SOURCES") or "[]"),
+        snapshot_dir=os.environ.get("TKTS_SNAPSHOT_DIR"),
+        stale_limit_seconds=os.environ.get("TKTS_STALE_LIMIT_SECONDS"),
+        render_cache_max_mb=os.environ.get("TKTS_RENDER_CACHE_MAX_MB")
+    )
+    configure(**{**settings, **overrides})
+
+
+def quiet_streamlit_runtime():
+    """
+    Silences the "No runtime found" chatter of st.cache_data outside
+    `streamlit run` (CLIs, benchmarks); a no-op under a running app.
+    """
+    if not st.runtime.exists():
+        import streamlit.logger
+        streamlit.logger.set_log_level(logging.ERROR)
+
+# The cached loaders below log it as they are defined, so before them
+quiet_streamlit_runtime()
+
+
+# --- 3b. NEW: Jira Sources (federation) ---
+# The active-ticket scope of the TKTS project (the creative request types)
+TKTS_ACTIVE_SCOPE = """
+        issuetype in ("ANZ - Advanced Pixels", "ANZ - Audio Creatives", "ANZ - Bespoke Requests", "ANZ - Brand Lift Study Creatives", "ANZ - CTV and BVOD Creatives", "ANZ - Celtra Creatives", "ANZ - DCO Creatives", "ANZ - DOOH Creatives", "ANZ - Display Creatives", "ANZ - HTML5 Hosted Creatives", "ANZ - Native Creatives", "ANZ - Rejected Creatives", "ANZ - Social Boost Creatives", "ANZ - Standard Pixels", "ANZ - Troubleshooting - Creatives", "ANZ - Troubleshooting - Pixels", "ANZ - Video Creatives", "DE - Audio Creatives", "DE - Bespoke Requests", "DE - CTV Creatives", "DE - Celtra Creatives", "DE - Display Creatives", "DE - Native Creatives", "DE - Troubleshooting Creatives", "DE - Video Creatives", "IN - Audio Creatives", "IN - Bespoke Requests", "IN - Brand Lift Study Creatives", "IN - CTV/OTT Creatives", "IN - DCO Creatives", "IN - Display Creatives", "IN - Native Creatives", "IN - Troubleshooting Requests", "IN - Video Creatives", "Lenovo - Bespoke Request", "Lenovo - Display Creatives", "Lenovo - Trackers", "Lenovo - Troubleshooting", "Lenovo - Video Creatives", "MENA - Bespoke Requests", "MENA - Display Creatives", "MENA - Native Creatives", "MENA - Troubleshooting Creatives", "MENA - Video Creatives", "SEA - Audio Creatives", "SEA - Bespoke Requests", "SEA - Celtra Creatives", "SEA - DOOH Creatives", "SEA - Display Creatives", "SEA - Native Creatives", "SEA - Troubleshooting Creatives", "SEA - Video Creatives", "SEA - OMG/Assembly Creatives", "UK - Ad-Lib Creatives", "UK - Audio Creatives", "UK - Bespoke Requests", "UK - CTV Creatives", "UK - Celtra Creatives", "UK - Customer Match Creatives", "UK - Display Creatives", "UK - Native Creatives", "UK - Skin Creatives", "UK - Stories Creatives", "UK - THG - Creatives and Trackers", "UK - Troubleshooting Creatives", "UK - Video Creatives", "China - Bespoke Request", "China - Inbound", "MENA - Celtra Creatives", "IN - Customer Match Creatives", "ANZ - SeenThis Creatives - Self-serve only", "SEA - SeenThis Creatives - Self-serve only", "IN - SeenThis Creatives - Self-serve only", "UK - SeenThis Creatives - Self-serve only", "MENA - SeenThis Creatives - Self-serve only", "SEA - DCO Creatives", "MENA - CTV Creatives", "SEA - OTT Creatives")
+    """
+ACTIVE_STATUSES = '("In Progress", Open, Reopened, "Waiting for customer", "Waiting for support")'
+
+JIRA_DEFAULT_RATE_LIMIT = 10 # requests/second per source, shared by all sessions
+JIRA_POOL_MAXSIZE = 16       # keep-alive connections per Jira site
+FEDERATION_MAX_WORKERS = 4   # sources searched in parallel
+
+class JiraSource:
+    """
+    One federated Jira project: the site and credentials to reach it, the
+    project key, and optional JQL scopes ANDed into every query (`scope`)
+    or only into the active-tickets query (`active_scope`).
+    """
+    def __init__(self, name, domain, auth, project, scope=None, active_scope=None,
+                 rate_limit=JIRA_DEFAULT_RATE_LIMIT, upstream=None):
+        self.name = name
+        self.domain = domain.rstrip("/")
+        self.auth = auth
+        self.project = project
+        self.scope = scope
+        self.active_scope = active_scope
+        self.rate_limit = rate_limit
+        # Label in the upstream-calls footer
+        self.upstream = upstream or f"jira:{name}"
+
+    def jql(self, clause, active=False):
+        """`project = X AND <scopes> AND <clause>` for this source."""
+        parts = [f"project = {self.project}", self.scope, self.active_scope if active else None, clause]
+        return " AND ".join(f"({part.strip()})" if i else part for i, part in enumerate(parts) if part)
+
+    def browse_url(self, key):
+        return f"{self.domain}/browse/{key}"
+
+    @property
+    def limiter(self):
+        return rate_limiter(self.name, self.rate_limit)
+
+def source_from_config(config):
+    """
+    A JiraSource from a secrets/env dict: name and project are required;
+    domain, user_email and api_token default to the primary site's, so a
+    second project on the same site only needs {name, project}.
+    """
+    auth = JIRA_AUTH
+    if config.get("user_email") and config.get("api_token"):
+        auth = HTTPBasicAuth(config["user_email"], config["api_token"])
+    return JiraSource(
+        config["name"],
+        config.get("domain") or JIRA_DOMAIN,
+        auth,
+        project=config["project"],
+        scope=config.get("scope"),
+        active_scope=config.get("active_scope"),
+        rate_limit=config.get("rate_limit", JIRA_DEFAULT_RATE_LIMIT)
+    )
+
+def primary_source():
+    return JIRA_SOURCES[0]
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests/second on average, bursts of `rate`."""
+    def __init__(self, rate):
+        self.rate = rate
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until it is available. Returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative reserves a future slot, so waiters queue up fairly
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+# Process-wide, so the limit holds across sessions and reruns (which build
+# new JiraSource objects on every configure())
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def rate_limiter(name, rate):
+    """The shared RateLimiter of a source; None when rate is 0/None (unlimited)."""
+    if not rate:
+        return None
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(name)
+        if limiter is None or limiter.rate != rate:
+            limiter = _rate_limiters[name] = RateLimiter(rate)
+        return limiter
+
+_jira_session = None
+_jira_session_lock = threading.Lock()
+
+def jira_session():
+    """
+    One requests.Session for every Jira call of the process, so requests
+    (and concurrent sources/sessions) reuse keep-alive connections instead
+    of opening a new TLS connection per call.
+    """
+    global _jira_session
+    with _jira_session_lock:
+        if _jira_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FEDERATION_MAX_WORKERS * 2, pool_maxsize=JIRA_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _jira_session = session
+        return _jira_session
+
+def jira_request(source, method, url, **kwargs):
+    """One rate-limited, counted request to a source's site over the shared session."""
+    if source.limiter:
+        source.limiter.acquire()
+    perf.count_upstream(source.upstream)
+    return jira_session().request(method, url, auth=source.auth, **kwargs)
+
+def ticket_links(keys, sources):
+    """Browse URLs for a column of keys, each on its own source's site."""
+    bases = {source.name: f"{source.domain}/browse/" for source in JIRA_SOURCES}
+    return sources.map(bases).fillna(f"{JIRA_DOMAIN}/browse/") + keys
+
+
+# Shared TTL of the refresh-driven loaders (active / daily / newly assigned
+# tickets, Gmail): the base interval of the adaptive refresh (tkts_refresh),
+# so clicks, lookups and other sessions' reruns in between reuse the entry.
+# A refresh the schedule wants sooner expires it explicitly, once per
+# snapshot (expire_refresh_loaders), so the cache follows the schedule.
+CACHE_TTL_SECONDS = 300
+
+_early_expiry = {"version": None}
+_early_expiry_lock = threading.Lock()
+
+def expire_refresh_loaders(snapshot_version):
+    """
+    Drops the refresh-driven loaders' entries before CACHE_TTL_SECONDS is up,
+    for a refresh of the snapshot `snapshot_version` that fell due early.
+    Every session's timer fires for the same snapshot, so only the first
+    call clears; returns whether this one did.
+    """
+    with _early_expiry_lock:
+        if _early_expiry["version"] == snapshot_version:
+            return False
+        _early_expiry["version"] = snapshot_version
+    for loader in (load_jira_data, load_all_jira_data, load_assignment_events, get_priority_ticket_set):
+        loader.clear()
+    return True
+
+
+# --- 4. Helper Function for SLA Formatting ---
+def format_time_remaining(time_diff):
+    """Formats a timedelta into a human-readable SLA status."""
+    if pd.isna(time_diff):
+        return "N/A (No SLA)"
+
+    if time_diff.total_seconds() < 0:
+        ago = -time_diff
+        days, rem = divmod(ago.total_seconds(), 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes, _ = divmod(rem, 60)
+        if days > 0:
+            return f"🚨 Breached {int(days)}d {int(hours)}h ago"
+        elif hours > 0:
+            return f"🚨 Breached {int(hours)}h {int(minutes)}m ago"
+        else:
+            return f"🚨 Breached {int(minutes)}m ago"
+    elif time_diff.total_seconds() < 8 * 3600:
+        days, rem = divmod(time_diff.total_seconds(), 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes, _ = divmod(rem, 60)
+        return f"⚠️ {int(hours)}h {int(minutes)}m remaining"
+    else:
+        days, rem = divmod(time_diff.total_seconds(), 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes, _ = divmod(rem, 60)
+        return f"✅ {int(days)}d {int(hours)}h remaining"
+
+
+# --- 5. Jira Search Helper (pagination) ---
+def jira_search(jql_query, fields_to_request, timeout, stage_name, source=None):
+    """
+    POSTs a JQL search to /rest/api/3/search/jql on `source` (default: the
+    primary TKTS site) and follows nextPageToken until the last page.
+    Returns the raw list of issues.
+
+    Network time (with response bytes) and JSON decoding are recorded as
+    separate perf stages under `stage_name`.
+    """
+    source = source or primary_source()
+    url = f"{source.domain}/rest/api/3/search/jql"
+    headers = {"Accept": "application/json", "Content-Type": "application/json"}
+
+    issues = []
+    next_page_token = None
+    while True:
+        body = {
+            "jql": jql_query,
+            "fields": fields_to_request,
+            "maxResults": 1000
+        }
+        if next_page_token:
+            body["nextPageToken"] = next_page_token
+
+        with perf.stage(f"{stage_name}.network") as info:
+            response = jira_request(source, "POST", url, headers=headers, data=json.dumps(body), timeout=timeout)
+            response.raise_for_status()
+            info["bytes"] = len(response.content)
+        with perf.stage(f"{stage_name}.parse.json") as parsed:
+            data = response.json()
+            parsed["issues"] = len(data.get("issues", []))
+
+        issues.extend(data.get("issues", []))
+        next_page_token = data.get("nextPageToken")
+        if data.get("isLast", True) or not next_page_token:
+            return issues
+
+
+@retry(
+    wait=wait_fixed(2),
+    stop=stop_after_attempt(3),
+    retry=retry_if_exception_type(requests.RequestException)
+)
+def search_source(source, jql_clause, fields_to_request, timeout, stage_name, active=False):
+    """jira_search() of one source's scoped JQL, retried on its own."""
+    return jira_search(source.jql(jql_clause, active=active), fields_to_request, timeout,
+                       stage_name if source is primary_source() else f"{stage_name}.{source.name}", source=source)
+
+
+def describe_error(error):
+    """Short text for a failed source (the last attempt's error for a RetryError)."""
+    if isinstance(error, RetryError):
+        error = error.last_attempt.exception()
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"HTTP {error.response.status_code} ({error.response.reason})"
+    return f"{type(error).__name__}: {str(error)[:200]}"
+
+
+def federated_search(jql_clause, fields_to_request, timeout, stage_name, active=False, sources=None):
+    """
+    Runs the same search on every configured source (or just `sources`) in
+    parallel (one worker per source, shared session, per-source rate limits
+    and retries).
+    Returns ({source name: issues}, {source name: error text}).
+
+    A source that still fails after its retries is reported in the errors
+    instead of failing the others; only when every source fails is the
+    first error raised (a RetryError, like the single-site loaders).
+    """
+    sources = JIRA_SOURCES if sources is None else sources
+    if len(sources) == 1:
+        # Nothing to fan out: no thread hop, and errors propagate as before
+        return {sources[0].name: search_source(sources[0], jql_clause, fields_to_request, timeout, stage_name, active)}, {}
+
+    results, errors, first_error = {}, {}, None
+    search = perf.in_current_run(search_source)
+    with ThreadPoolExecutor(max_workers=min(len(sources), FEDERATION_MAX_WORKERS)) as pool:
+        futures = [(source, pool.submit(search, source, jql_clause, fields_to_request, timeout, stage_name, active))
+                   for source in sources]
+        for source, future in futures:
+            try:
+                results[source.name] = future.result()
+            except (RetryError, requests.RequestException) as e:
+                errors[source.name] = describe_error(e)
+                first_error = first_error or e
+    if not results:
+        raise first_error
+    return results, errors
+
+
+# --- 5-2. NEW: Shared Snapshot (multi-replica) ---
+def served_from_snapshot(name, from_frame=None):
+    """
+    Loader decorator: with a shared snapshot configured, returns its `name`
+    frame (passed through `from_frame` for loaders that don't return a
+    DataFrame) instead of running the loader.
+    """
+    def decorate(loader):
+        @functools.wraps(loader)
+        def load(*args, **kwargs):
+            if SHARED_SNAPSHOT is None:
+                return loader(*args, **kwargs)
+            frame = SHARED_SNAPSHOT.frame(name)
+            return from_frame(frame) if from_frame else frame
+        return load
+    return decorate
+
+
+# --- 5-3. NEW: Stale-While-Revalidate (last known good, per source) ---
+# A failed fetch used to replace the data with an empty frame until the
+# next successful one. Now each source's last good rows keep being served,
+# marked stale with their age, for up to STALE_LIMIT_SECONDS; a loader that
+# fails outright is retried with backoff, so reruns don't each wait out the
+# retries of a Jira that is down. One attempt per backoff step, made by the
+# first rerun after it (or a background thread if no rerun comes), so the
+# data is back within one step of Jira recovering.
+REVALIDATE_BACKOFF_SECONDS = [15, 30, 60, 120] # then every 120 s, the fastest refresh
+
+class LastKnownGood:
+    """Last good rows of one loader per Jira source, and its background refetch."""
+
+    def __init__(self, name):
+        self.name = name
+        self._rows = {}              # source name -> (its rows, fetched_at)
+        self._remembered = None      # snapshot_version of the last frame kept
+        self._served = None          # (key, frame): the patched frame handed out
+        self._failure = None         # (last exception, failures in a row) while failing
+        self._retry_at = 0.0         # monotonic time of the next attempt while failing
+        self._refetching = False
+        self._lock = threading.Lock()
+
+    @property
+    def failure(self):
+        """(last exception, failures in a row) while the loader fails outright, else None."""
+        return self._failure
+
+    def remember(self, df):
+        """Keeps the rows of every source that `df` was fetched from successfully."""
+        if df.attrs.get('snapshot_version') == self._remembered:
+            return
+        failed = df.attrs.get('source_errors', {})
+        fetched_at = df.attrs.get('fetched_at') or datetime.now()
+        groups = dict(tuple(df.groupby('source', sort=False)))
+        with self._lock:
+            for source in JIRA_SOURCES:
+                if source.name not in failed:
+                    self._rows[source.name] = (groups.get(source.name, df.iloc[:0]), fetched_at)
+            self._remembered = df.attrs.get('snapshot_version')
+
+    def serve(self, df=None, error=None):
+        """
+        `df` plus the last good rows of the sources it is missing (`df=None`:
+        the whole loader failed with `error`). Sources whose rows are older
+        than STALE_LIMIT_SECONDS stay in source_errors; raises `error` if
+        that leaves nothing to serve.
+        """
+        failed = df.attrs.get('source_errors', {}) if df is not None else \
+            {source.name: describe_error(error) for source in JIRA_SOURCES}
+        if not failed:
+            return df
+        now = datetime.now()
+        with self._lock:
+            stale = {name: self._rows[name] for name in failed if name in self._rows
+                     and (now - self._rows[name][1]).total_seconds() <= STALE_LIMIT_SECONDS}
+            if not stale:
+                if df is None:
+                    raise error
+                return df
+
+            key = (df.attrs.get('snapshot_version') if df is not None else None, tuple(sorted(stale)))
+            if self._served is None or self._served[0] != key:
+                parts = ([df] if df is not None else []) + [rows for rows, _ in stale.values()]
+                frame = pd.concat([part for part in parts if len(part)] or parts[:1], ignore_index=True)
+                frame.attrs = {
+                    **(df.attrs if df is not None else {}),
+                    'fetched_at': df.attrs['fetched_at'] if df is not None else min(at for _, at in stale.values()),
+                    # Its own version: the content differs from `df`'s
+                    'snapshot_version': next(_snapshot_versions),
+                    'source_errors': {name: text for name, text in failed.items() if name not in stale},
+                    'stale_sources': {name: {"since": at.isoformat(timespec='seconds'), "error": failed[name]}
+                                      for name, (_, at) in stale.items()},
+                }
+                self._served = (key, frame)
+            return self._served[1].copy(deep=False)
+
+    def revalidate(self, load, error):
+        """Records a failure of the whole loader and starts its background refetch (once)."""
+        self.failed(error)
+        with self._lock:
+            if self._refetching:
+                return
+            self._refetching = True
+        threading.Thread(target=self._refetch, args=(load,), name=f"revalidate-{self.name}", daemon=True).start()
+
+    def failed(self, error):
+        """Counts a failed attempt and schedules the next one."""
+        with self._lock:
+            self._failure = (error, self._failure[1] + 1 if self._failure else 1)
+            step = REVALIDATE_BACKOFF_SECONDS[min(self._failure[1], len(REVALIDATE_BACKOFF_SECONDS)) - 1]
+            self._retry_at = time.monotonic() + step
+
+    def recovered(self, df):
+        """Keeps a successful fetch and ends the failure, if any."""
+        self.remember(df)
+        with self._lock:
+            # The fresh frame is in the loader's cache now; reruns go back to it
+            self._failure = None
+
+    def claim_retry(self):
+        """True for exactly one caller once the current backoff step has passed."""
+        with self._lock:
+            if self._failure is None or time.monotonic() < self._retry_at:
+                return False
+            # Whoever claims it owns the attempt; the others keep serving stale
+            self._retry_at = float("inf")
+            return True
+
+    def _refetch(self, load):
+        while True:
+            with self._lock:
+                if self._failure is None:
+                    self._refetching = False
+                    return
+                delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                # Wakes up at the latest at the next step; a rerun may have claimed it by then
+                time.sleep(min(delay, REVALIDATE_BACKOFF_SECONDS[-1]))
+                continue
+            if not self.claim_retry():
+                time.sleep(1)
+                continue
+            perf.start_run()
+            try:
+                df = load()
+            except Exception as e:
+                self.failed(e)
+                perf.finish_run(view="revalidate", loader=self.name, ok=False, error=describe_error(e))
+                continue
+            self.recovered(df)
+            perf.finish_run(view="revalidate", loader=self.name, ok=True)
+
+
+LAST_KNOWN_GOOD = {} # loader name -> LastKnownGood
+
+def stale_while_revalidate(name):
+    """
+    Loader decorator (under served_from_snapshot): fills in the rows of
+    failed sources from LastKnownGood and lists them in attrs['stale_sources']
+    ({source: {"since": ISO time of their data, "error": text}}). While the
+    loader fails outright, calls return the stale frame at once and the
+    refetch happens in the background, except for the one call that finds
+    the current backoff step over: it tries the loader itself.
+    """
+    def decorate(loader):
+        last_good = LAST_KNOWN_GOOD[name] = LastKnownGood(name)
+
+        @functools.wraps(loader)
+        def load(*args, **kwargs):
+            failure = last_good.failure
+            if failure and not last_good.claim_retry():
+                return last_good.serve(error=failure[0])
+            try:
+                df = loader(*args, **kwargs)
+            except Exception as e:
+                last_good.revalidate(lambda: loader(*args, **kwargs), e)
+                return last_good.serve(error=e)
+            last_good.recovered(df)
+            return last_good.serve(df)
+        return load
+    return decorate
+
+
+# --- 5-4. NEW: Jira Timestamp Parsing ---
+# Jira sends each timestamp field in one fixed ISO 8601 shape:
+# '2026-10-19T09:12:33.123+0000' (created, resolutiondate),
+# '2026-10-19T09:12:33+0000' (SLA breachTime) and '2026-10-19' (date custom
+# fields, e.g. the campaign start). Arrow's ISO 8601 cast parses a whole
+# column of them in one vectorized call; pd.to_datetime, which infers the
+# format and parses value by value, is only the fallback for a column with
+# a value in some other shape. (bench/timestamps.py compares the two.)
+NAT_NS = np.iinfo(np.int64).min # NaT as int64 ns
+
+def parse_jira_timestamps(values, date_only=False):
+    """
+    Jira timestamp strings (Series or list; None/NaN allowed) ->
+    datetime64[us, UTC] Series. `date_only` is for date fields, read as
+    midnight UTC. Values that aren't timestamps become NaT.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    try:
+        text = pa.array(values, type=pa.string(), from_pandas=True)
+        if date_only:
+            parsed = text.cast(pa.timestamp('us')).to_pandas().dt.tz_localize('UTC')
+        else:
+            parsed = text.cast(pa.timestamp('us', tz='UTC')).to_pandas()
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pd.to_datetime(values, format='ISO8601', utc=True, errors='coerce').dt.as_unit('us')
+    parsed.index = values.index
+    return parsed.rename(values.name)
+
+def utc_ns(times):
+    """datetime64[UTC] Series -> int64 ns since the epoch (a writable array; NaT -> NAT_NS)."""
+    return times.dt.tz_convert(None).to_numpy().astype('datetime64[ns]').view('int64')
+
+def from_utc_ns(values, index=None):
+    """Inverse of utc_ns(), as a datetime64[us, UTC] Series."""
+    return pd.Series(np.asarray(values, dtype='int64').view('datetime64[ns]'), index=index).dt.tz_localize('UTC').dt.as_unit('us')
+
+
+# --- 5a. Load Jira Data (Active Tickets) ---
+@served_from_snapshot("active")
+@stale_while_revalidate("active")
+@perf.track_cache
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+@perf.count_miss
+def load_jira_data():
+    # Per source: project = X AND <its active scope> AND status in (...)
+    # (for TKTS the scope is the creative request types, TKTS_ACTIVE_SCOPE)
+    jql_clause = f"status in {ACTIVE_STATUSES}"
+
+    # --- UPDATED: Lean projection. The SLA object (every completed cycle, ~2 KB
+    # per ticket) only comes with a full pass; in between, a second narrow
+    # pass reads it for the tickets updated since the last fetch
+    with _sla_lock:
+        started, previous = datetime.now(timezone.utc), _sla_state.copy()
+    full_pass = sla_full_pass_due(previous, started)
+    fields_to_request = ACTIVE_FIELDS + ([SLA_FIELD] if full_pass else [])
+
+    issues_by_source, source_errors = federated_search(jql_clause, fields_to_request, timeout=10,
+                                                       stage_name="load_jira_data", active=True)
+    breach_times = {}
+    if not full_pass:
+        breach_times, sla_errors = fetch_changed_breach_times(jql_clause, issues_by_source, previous, started)
+        source_errors = {**sla_errors, **source_errors}
+
+    with perf.stage("load_jira_data.parse"):
+        df = parse_active_issues(issues_by_source, breach_times)
+    df.attrs['source_errors'] = source_errors
+    df.attrs['sla_pass'] = "full" if full_pass else "changed"
+    remember_breach_times(df, started, started if full_pass else previous["full_at"], source_errors)
+    return df
+
+
+# --- 5a-2. NEW: Narrow SLA Pass ---
+# A ticket's SLA breachTime only moves when the ticket changes (a status
+# that pauses or restarts the cycle), which bumps `updated`. So between
+# full passes the breach times of the previous fetch are reused and only
+# tickets with `updated` inside the window since that fetch are re-read,
+# with the SLA field alone. A full pass still runs every
+# SLA_FULL_PASS_SECONDS, after a fetch with a failed source, and whenever
+# the sources change, as a backstop for changes Jira doesn't stamp.
+ACTIVE_FIELDS = ["summary", "status", "assignee", "created", "issuetype", "customfield_10522", "customfield_16020"]
+SLA_FIELD = "customfield_10704"
+SLA_FULL_PASS_SECONDS = 3600
+SLA_WINDOW_MARGIN_MINUTES = 2 # overlap for clock skew and edits during the previous fetch
+
+# Process-wide: {"breach_times": {(source, key): breach time as int64 ns
+# (utc_ns)}, "started":
+# start of the fetch they come from, "full_at": start of the last full
+# pass, "sources": sla_sources()}; empty until the first full pass
+_sla_state = {}
+_sla_lock = threading.Lock()
+
+def sla_sources():
+    """What the kept breach times belong to: reconfiguring any source starts over with a full pass."""
+    return tuple((source.name, source.domain, source.project) for source in JIRA_SOURCES)
+
+def sla_full_pass_due(previous, now):
+    return (not previous
+            or previous["sources"] != sla_sources()
+            or (now - previous["full_at"]).total_seconds() >= SLA_FULL_PASS_SECONDS)
+
+def sla_breach_time(sla_field):
+    """breachTime (ISO 8601 text) of the ongoing SLA cycle, else of the last completed one; None without an SLA."""
+    if not sla_field:
+        return None
+    try:
+        return sla_field['ongoingCycle']['breachTime']['iso8601']
+    except (KeyError, TypeError, AttributeError):
+        try:
+            return sla_field['completedCycles'][-1]['breachTime']['iso8601']
+        except (KeyError, TypeError, AttributeError, IndexError):
+            return None
+
+def breach_times_ns(source_issues):
+    """{(source, key): breach time as int64 ns} of (source name, raw issue) pairs fetched with the SLA field."""
+    keys, texts = [], []
+    for source_name, issue in source_issues:
+        keys.append((source_name, issue['key']))
+        texts.append(sla_breach_time(issue['fields'].get(SLA_FIELD)))
+    return dict(zip(keys, utc_ns(parse_jira_timestamps(texts)).tolist()))
+
+def fetch_changed_breach_times(jql_clause, issues_by_source, previous, started):
+    """
+    {(source, key): breach time} for every ticket of this fetch: the previous
+    ones, overridden by the tickets updated since the previous fetch (one
+    `updated >= -Nm` search with only the SLA field) and by tickets the
+    previous fetch didn't have (`key in (...)`). Also returns per-source
+    errors of the narrow pass; raises if it failed for every source.
+    """
+    minutes = int((started - previous["started"]).total_seconds() // 60) + 1 + SLA_WINDOW_MARGIN_MINUTES
+    # Only the sources the first pass reached (a failed one is reported already)
+    sources = [source for source in JIRA_SOURCES if source.name in issues_by_source]
+    changed, errors = federated_search(f'({jql_clause}) AND updated >= "-{minutes}m"', [SLA_FIELD], timeout=10,
+                                       stage_name="load_jira_data.sla", active=True, sources=sources)
+    breach_times = dict(previous["breach_times"])
+    breach_times.update(breach_times_ns(iter_source_issues(changed)))
+
+    for source in JIRA_SOURCES:
+        # Should be rare: tickets of a source that failed last time, or that
+        # came back into the active set unchanged
+        missing = [issue['key'] for issue in issues_by_source.get(source.name, [])
+                   if (source.name, issue['key']) not in breach_times]
+        for start in range(0, len(missing), ENRICH_BATCH_SIZE):
+            chunk = missing[start:start + ENRICH_BATCH_SIZE]
+            try:
+                found = search_source(source, f"key in ({', '.join(chunk)})", [SLA_FIELD], 10, "load_jira_data.sla_missing")
+            except (RetryError, requests.RequestException) as e:
+                errors[source.name] = describe_error(e)
+                continue
+            breach_times.update(breach_times_ns((source.name, issue) for issue in found))
+    return breach_times, errors
+
+def remember_breach_times(df, started, full_at, source_errors):
+    """Keeps this fetch's breach times for the next narrow pass (or forgets them after a failure)."""
+    with _sla_lock:
+        if source_errors:
+            # Some breach times may be missing or old: the next fetch reads them all
+            _sla_state.clear()
+            return
+        _sla_state.update({
+            "breach_times": dict(zip(zip(df['source'], df['key']), utc_ns(df['breach_time_api']).tolist())),
+            "started": started,
+            "full_at": full_at,
+            "sources": sla_sources(),
+        })
+
+
+_snapshot_versions = itertools.count(1)
+
+def iter_source_issues(issues_by_source):
+    """Yields (source name, raw issue) over federated_search() results."""
+    for source_name, issues in issues_by_source.items():
+        for issue in issues:
+            yield source_name, issue
+
+def parse_active_issues(issues_by_source, breach_times=None):
+    """
+    Turns raw /search/jql issues ({source name: issues}) into the
+    active-tickets DataFrame. Issues fetched without the SLA field take
+    their breach time from `breach_times` ({(source, key): int64 ns}).
+    """
+    breach_times = breach_times or {}
+    issues_list = []
+    reused = {} # row -> breach time (int64 ns) kept from the previous fetch
+    for source_name, issue in iter_source_issues(issues_by_source):
+        request_type = "N/A"
+        if issue['fields'].get('issuetype'):
+            try:
+                request_type = issue['fields']['issuetype']['name']
+            except (KeyError, TypeError, AttributeError):
+                request_type = "Other (See Jira)"
+
+        if SLA_FIELD in issue['fields']:
+            breach_time = sla_breach_time(issue['fields'][SLA_FIELD])
+        else:
+            breach_time = None
+            reused[len(issues_list)] = breach_times.get((source_name, issue['key']), NAT_NS)
+
+        issues_list.append({
+            "key": issue['key'],
+            "source": source_name,
+            "summary": issue['fields'].get('summary') or "",
+            "status": issue['fields']['status']['name'],
+            "assignee": (issue['fields']['assignee']['displayName']
+                         if issue['fields']['assignee'] else "Unassigned"),
+            "created": issue['fields']['created'],
+            "request_type": request_type,
+            "breach_time_api": breach_time,
+            "campaign_start_main": issue['fields'].get("customfield_10522"),
+            "campaign_start_china": issue['fields'].get("customfield_16020")
+        })
+
+    if not issues_list:
+        # Empty frame with datetime dtypes, so the .dt accessors downstream still work
+        df = pd.DataFrame(columns=[
+            "key", "source", "summary", "status", "assignee", "created", "request_type",
+            "breach_time_api", "campaign_start_main", "campaign_start_china",
+            "campaign_start_date"
+        ])
+        for col in ["created", "breach_time_api", "campaign_start_main", "campaign_start_china", "campaign_start_date"]:
+            df[col] = pd.to_datetime(df[col], utc=True)
+    else:
+        df = pd.DataFrame(issues_list)
+        # --- UPDATED: One vectorized parse per column (parse_jira_timestamps)
+        df['created'] = parse_jira_timestamps(df['created'])
+        df['breach_time_api'] = parse_jira_timestamps(df['breach_time_api'])
+        if reused:
+            breach_ns = utc_ns(df['breach_time_api'])
+            breach_ns[list(reused)] = list(reused.values())
+            df['breach_time_api'] = from_utc_ns(breach_ns, df.index)
+        df['campaign_start_main'] = parse_jira_timestamps(df['campaign_start_main'], date_only=True)
+        df['campaign_start_china'] = parse_jira_timestamps(df['campaign_start_china'], date_only=True)
+        df['campaign_start_date'] = df['campaign_start_china'].fillna(df['campaign_start_main'])
+
+    # Travels with the cached frame, so every session can show when the
+    # data was actually fetched (app.py footer: "Data last refreshed")
+    df.attrs['fetched_at'] = datetime.now()
+    # Bumped on every real fetch; derived artefacts (chart specs) are
+    # cached per snapshot version instead of being rebuilt on every rerun
+    df.attrs['snapshot_version'] = next(_snapshot_versions)
+    df.attrs['delta'] = snapshot_delta(df)
+    return df
+
+
+# Ticket state of the previous fetch, to measure how much each refresh changed
+_previous_snapshot = {"tickets": None, "quiet_streak": 0}
+_previous_snapshot_lock = threading.Lock()
+
+def snapshot_delta(df):
+    """
+    Compares a freshly parsed snapshot with the previous one (this process):
+    tickets added, removed and changed (status/assignee/breach time), plus
+    how many fetches in a row changed nothing.
+    """
+    # NaT != NaT, so tickets without an SLA get a fixed placeholder
+    breach_times = df['breach_time_api'].fillna(pd.Timestamp(0, tz='UTC'))
+    # Keyed by (source, key): two federated sites can both have a TKTS-1
+    tickets = dict(zip(zip(df['source'], df['key']), zip(df['status'], df['assignee'], breach_times)))
+    with _previous_snapshot_lock:
+        previous = _previous_snapshot["tickets"]
+        if previous is None:
+            delta = {"added": 0, "removed": 0, "changed": 0, "first": True}
+        else:
+            delta = {
+                "added": len(tickets.keys() - previous.keys()),
+                "removed": len(previous.keys() - tickets.keys()),
+                "changed": sum(1 for key, state in tickets.items() if key in previous and previous[key] != state),
+                "first": False,
+            }
+        quiet = not delta["first"] and delta["added"] == delta["removed"] == delta["changed"] == 0
+        _previous_snapshot["quiet_streak"] = _previous_snapshot["quiet_streak"] + 1 if quiet else 0
+        _previous_snapshot["tickets"] = tickets
+        delta["quiet_streak"] = _previous_snapshot["quiet_streak"]
+    return delta
+
+
+# --- 5b. Load All-Time Jira Data (UPDATED) ---
+@served_from_snapshot("daily")
+@stale_while_revalidate("daily")
+@perf.track_cache
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+@perf.count_miss
+def load_all_jira_data():
+    # --- UPDATED JQL QUERY ---
+    # Now finds tickets CREATED today OR RESOLVED today.
+    jql_clause = "created >= startOfDay() OR resolutiondate >= startOfDay()"
+
+    # --- UPDATED: Added assignee and issuetype (and summary, for tkts_search);
+    # the key always comes with the issue, so it isn't requested as a field
+    fields_to_request = ["summary", "status", "created", "resolutiondate", "assignee", "issuetype"]
+
+    issues_by_source, source_errors = federated_search(jql_clause, fields_to_request, timeout=15,
+                                                       stage_name="load_all_jira_data")
+
+    with perf.stage("load_all_jira_data.parse"):
+        df = parse_daily_issues(issues_by_source)
+    df.attrs['source_errors'] = source_errors
+    return df
+
+
+def parse_daily_issues(issues_by_source):
+    """Turns raw /search/jql issues ({source name: issues}) into the created/resolved-today DataFrame."""
+    rows = []
+    for source_name, issue in iter_source_issues(issues_by_source):
+        fields = issue["fields"]
+
+        # --- UPDATED: Parse new fields ---
+        assignee_data = fields.get('assignee')
+        assignee = assignee_data['displayName'] if assignee_data else "Unassigned"
+
+        issuetype_data = fields.get('issuetype')
+        request_type = issuetype_data['name'] if issuetype_data else "N/A"
+
+        rows.append({
+            "key": issue["key"],
+            "source": source_name,
+            "summary": fields.get("summary") or "",
+            "created": fields["created"],
+            "resolutiondate": fields.get("resolutiondate"),
+            "status": fields["status"]["name"],
+            "assignee": assignee,
+            "request_type": request_type
+        })
+
+    # --- THIS IS THE FIX ---
+    if not rows:
+        # Create an empty DataFrame with the correct dtypes (data types)
+        df = pd.DataFrame(columns=[
+            "key", "source", "summary", "created", "resolutiondate", "status", "assignee", "request_type"
+        ])
+        df["created"] = pd.to_datetime(df["created"], utc=True)
+        df["resolutiondate"] = pd.to_datetime(df["resolutiondate"], utc=True)
+    # --- END OF FIX ---
+    else:
+        df = pd.DataFrame(rows)
+        df["created"] = parse_jira_timestamps(df["created"])
+        df["resolutiondate"] = parse_jira_timestamps(df["resolutiondate"])
+
+    # Same stamps as the active snapshot (see parse_active_issues)
+    df.attrs['fetched_at'] = datetime.now()
+    df.attrs['snapshot_version'] = next(_snapshot_versions)
+    return df
+
+
+# --- 5c. NEW: Assignment History (changelog ingester) ---
+# `assignee CHANGED` alone can only credit a ticket to its *current*
+# assignee, so a ticket reassigned three times today counted once, for the
+# last person. Instead, the search just finds which issues changed, and
+# their changelogs are read for the actual assignments, incrementally.
+CHANGELOG_BULK_SIZE = 1000  # issues per POST /changelog/bulkfetch (Jira's maximum)
+CHANGELOG_PAGE_SIZE = 100   # entries per GET /issue/{key}/changelog page (fallback)
+CHANGELOG_MAX_WORKERS = 8   # parallel changelog requests (per-source rate limits still apply)
+
+# Process-wide, across reruns and sessions: (source name, key) -> {
+#   "updated": the issue's `updated` when last read, "last_id": id of the
+#   last changelog entry read, "start_at": entries read through the
+#   per-issue endpoint, "seen": last day the issue came back from the search}
+_changelog_cache = {}
+# Today's assignment events: new events are appended as they are ingested,
+# the list restarts when the UTC day changes
+_assignments_today = {"day": None, "events": []}
+_changelog_lock = threading.Lock()
+# Sources whose site has no bulkfetch endpoint (e.g. older servers)
+_no_bulk_changelog = set()
+
+def parse_jira_datetime(value):
+    """Jira's '2026-10-19T09:12:33.123+0000' -> aware UTC datetime."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z").astimezone(timezone.utc)
+
+def fetch_changelogs_bulk(source, issue_ids):
+    """
+    {issue id: changelog entries} with assignee changes for up to
+    CHANGELOG_BULK_SIZE issues, via POST /rest/api/3/changelog/bulkfetch
+    (all pages).
+    """
+    histories = {}
+    next_page_token = None
+    while True:
+        body = {"issueIdsOrKeys": issue_ids, "fieldIds": ["assignee"], "maxResults": 1000}
+        if next_page_token:
+            body["nextPageToken"] = next_page_token
+        response = jira_request(
+            source, "POST",
+            f"{source.domain}/rest/api/3/changelog/bulkfetch",
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+            data=json.dumps(body),
+            timeout=15
+        )
+        response.raise_for_status()
+        page = response.json()
+        for log in page.get("issueChangeLogs", []):
+            histories.setdefault(log["issueId"], []).extend(log.get("changeHistories", []))
+        next_page_token = page.get("nextPageToken")
+        if not next_page_token:
+            return histories
+
+def fetch_changelog(source, key, start_at):
+    """
+    Changelog entries of one issue from `start_at` on, via the per-issue
+    endpoint (all pages). Returns (entries, next start_at).
+    """
+    entries = []
+    while True:
+        response = jira_request(
+            source, "GET",
+            f"{source.domain}/rest/api/3/issue/{key}/changelog",
+            headers={"Accept": "application/json"},
+            params={"startAt": start_at, "maxResults": CHANGELOG_PAGE_SIZE},
+            timeout=10
+        )
+        response.raise_for_status()
+        page = response.json()
+        values = page.get("values", [])
+        entries.extend(values)
+        start_at += len(values)
+        if page.get("isLast", True) or not values:
+            return entries, start_at
+
+def fetch_new_changelog_entries(stale):
+    """
+    Reads the changelogs of `stale` issues [(source, key, issue id, cached)]:
+    bulkfetch in chunks per source, per-issue pages (from the cached
+    start_at) where bulkfetch isn't available, all on one bounded pool.
+    Returns {(source name, key): (entries newer than cached last_id, start_at)}.
+    """
+    results = {}
+    per_issue = [item for item in stale if item[0].name in _no_bulk_changelog]
+    bulk = [item for item in stale if item[0].name not in _no_bulk_changelog]
+    chunks = []
+    for source in {item[0] for item in bulk}:
+        items = [item for item in bulk if item[0] is source]
+        chunks.extend((source, items[i:i + CHANGELOG_BULK_SIZE]) for i in range(0, len(items), CHANGELOG_BULK_SIZE))
+
+    with ThreadPoolExecutor(max_workers=CHANGELOG_MAX_WORKERS) as pool:
+        fetch_bulk = perf.in_current_run(fetch_changelogs_bulk)
+        futures = [(source, chunk, pool.submit(fetch_bulk, source, [item[2] for item in chunk])) for source, chunk in chunks]
+        for source, chunk, future in futures:
+            try:
+                histories = future.result()
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in (404, 405):
+                    raise
+                _no_bulk_changelog.add(source.name)
+                per_issue.extend(chunk)
+                continue
+            for source_, key, issue_id, cached in chunk:
+                results[(source.name, key)] = (histories.get(issue_id, []), cached["start_at"])
+
+        fetch_one = perf.in_current_run(lambda item: fetch_changelog(item[0], item[1], item[3]["start_at"]))
+        for (source, key, _, _), result in zip(per_issue, pool.map(fetch_one, per_issue)):
+            results[(source.name, key)] = result
+
+    # Ids only grow, so this drops what was already counted (bulkfetch
+    # always returns the whole history, startAt may have shifted)
+    last_ids = {(source.name, key): cached["last_id"] for source, key, _, cached in stale}
+    return {cache_key: ([entry for entry in entries if int(entry["id"]) > last_ids[cache_key]], start_at)
+            for cache_key, (entries, start_at) in results.items()}
+
+def assignment_events(source_name, key, entries):
+    """The assignee changes in changelog entries (unassignments left out)."""
+    events = []
+    for entry in entries:
+        for item in entry.get("items", []):
+            if item.get("fieldId", item.get("field")) == "assignee" and item.get("toString"):
+                events.append({
+                    "key": key,
+                    "source": source_name,
+                    "assignee": item["toString"],
+                    "previous": item.get("fromString") or "Unassigned",
+                    "at": parse_jira_datetime(entry["created"]),
+                })
+    return events
+
+def ingest_assignment_history(issues_by_source, today):
+    """
+    Brings the cached changelogs up to date for the issues a CHANGED search
+    returned: only issues whose `updated` moved are read, and only entries
+    after their last-seen id are counted. Returns the number of issues read.
+    """
+    sources = {source.name: source for source in JIRA_SOURCES}
+    with _changelog_lock:
+        if _assignments_today["day"] != today:
+            # New day: restart the count, forget issues not changed since yesterday
+            _assignments_today.update(day=today, events=[])
+            for cache_key in [k for k, cached in _changelog_cache.items() if (today - cached["seen"]).days > 1]:
+                del _changelog_cache[cache_key]
+
+        stale, updated_at = [], {}
+        for source_name, issue in iter_source_issues(issues_by_source):
+            cached = _changelog_cache.get((source_name, issue["key"]))
+            updated = issue.get("fields", {}).get("updated")
+            if cached is None or cached["updated"] != updated or updated is None:
+                updated_at[(source_name, issue["key"])] = updated
+                stale.append((sources[source_name], issue["key"], issue.get("id", issue["key"]),
+                              cached or {"last_id": -1, "start_at": 0}))
+            else:
+                cached["seen"] = today
+        if not stale:
+            return 0
+
+        new_entries = fetch_new_changelog_entries(stale)
+        for source, key, _, cached in stale:
+            entries, start_at = new_entries[(source.name, key)]
+            _changelog_cache[(source.name, key)] = {
+                "updated": updated_at[(source.name, key)],
+                "last_id": max([int(entry["id"]) for entry in entries], default=cached["last_id"]),
+                "start_at": start_at,
+                "seen": today,
+            }
+            _assignments_today["events"].extend(
+                event for event in assignment_events(source.name, key, entries) if event["at"].date() == today)
+        return len(stale)
+
+@served_from_snapshot("assignments", from_frame=lambda frame: frame.to_dict("records"))
+@perf.track_cache
+@st.cache_data(ttl=CACHE_TTL_SECONDS) # Match our refresh
+@perf.count_miss
+def load_assignment_events():
+    """
+    Every assignment made today (UTC), one dict per change:
+    [{'key': 'TKTS-123', 'source': 'TKTS', 'assignee': 'John Doe',
+      'previous': 'Jane Roe', 'at': datetime}, ...]
+    A ticket reassigned three times today appears three times.
+    """
+    # startOfDay() is in the Jira user's timezone; from yesterday on is a
+    # superset of the UTC day for any timezone, and the events are cut to
+    # the UTC day locally. Only `updated` is needed to detect changes.
+    jql_clause = "assignee CHANGED during (startOfDay(-1), now())"
+    issues_by_source, _ = federated_search(jql_clause, ["updated"], timeout=15,
+                                           stage_name="load_assignment_events")
+
+    today = datetime.now(timezone.utc).date()
+    with perf.stage("load_assignment_events.changelog", issues=sum(map(len, issues_by_source.values()))) as info:
+        info["fetched"] = ingest_assignment_history(issues_by_source, today)
+    with _changelog_lock:
+        return sorted(_assignments_today["events"], key=lambda event: event["at"])
+
+
+# --- 5d. NEW: Helper Function for Ticket Lookup ---
+@perf.track_cache
+@st.cache_data(ttl=60) # Short cache for individual ticket lookups
+@perf.count_miss
+def get_ticket_details(ticket_key):
+    """
+    Fetches details for a single ticket from Jira.
+    """
+    # Smart logic: if just a number is passed, prefix it.
+    if re.fullmatch(r'\d+', ticket_key):
+        ticket_key = f"TKTS-{ticket_key}"
+    
+    # Check if it's a valid TKTS key format
+    if not re.fullmatch(r'TKTS-\d+', ticket_key, re.IGNORECASE):
+        raise ValueError(f"Invalid ticket format. Please use 'TKTS-1234' or just '1234'.")
+
+    url = f"{JIRA_DOMAIN}/rest/api/3/issue/{ticket_key.upper()}"
+    headers = {"Accept": "application/json"}
+    
+    # Request specific fields
+    params = {
+        "fields": "status,assignee,created,resolutiondate,issuetype"
+    }
+
+    with perf.stage("get_ticket_details.network") as info:
+        response = jira_request(primary_source(), "GET", url, headers=headers, params=params, timeout=10)
+    
+        # Handle "Not Found" specifically
+        if response.status_code == 404:
+            raise FileNotFoundError(f"Ticket '{ticket_key.upper()}' not found.")
+    
+        # Handle other errors
+        response.raise_for_status()
+        info["bytes"] = len(response.content)
+    
+    with perf.stage("get_ticket_details.parse"):
+        data = response.json()
+        fields = data.get("fields", {})
+    
+        # --- Parse the data ---
+        # Assignee
+        assignee_data = fields.get('assignee')
+        assignee = assignee_data['displayName'] if assignee_data else "Unassigned"
+    
+        # Status
+        status_data = fields.get('status')
+        status = status_data['name'] if status_data else "N/A"
+    
+        # Request Type
+        issuetype_data = fields.get('issuetype')
+        request_type = issuetype_data['name'] if issuetype_data else "N/A"
+    
+        # Dates, in the offset Jira sent them in (the API user's profile zone)
+        created_date = pd.to_datetime(fields.get('created')).strftime('%d-%b-%Y %H:%M')
+        resolved_date_raw = fields.get('resolutiondate')
+        resolved_date = pd.to_datetime(resolved_date_raw).strftime('%d-%b-%Y %H:%M') if resolved_date_raw else "Not yet resolved"
+
+        return {
+            "Ticket ID": data['key'],
+            "Link": f"{JIRA_DOMAIN}/browse/{data['key']}",
+            "Status": status,
+            "Assignee": assignee,
+            "Request Type": request_type,
+            "Created": created_date,
+            "Resolved": resolved_date
+        }
+
+# --- 5d-2. NEW: Batched Lookup (priority tickets outside the snapshot) ---
+ENRICH_BATCH_SIZE = 100  # keys per `key in (...)` query
+ENRICH_MAX_WORKERS = 8   # parallel single-issue GETs in the fallback path
+
+def parse_ticket_row(issue):
+    """One raw Jira issue -> the row shape of match_priority_tickets()."""
+    fields = issue.get('fields', {})
+    return {
+        "key": issue['key'],
+        "assignee": fields['assignee']['displayName'] if fields.get('assignee') else "Unassigned",
+        "request_type": fields['issuetype']['name'] if fields.get('issuetype') else "N/A",
+        "status": fields['status']['name'] if fields.get('status') else "N/A",
+        "source": primary_source().name,
+        "Ticket Link": primary_source().browse_url(issue['key']),
+    }
+
+def fetch_issue_or_none(ticket_key, fields):
+    """Single-issue GET for the fan-out path; None if Jira doesn't know the key."""
+    response = jira_request(
+        primary_source(), "GET",
+        f"{JIRA_DOMAIN}/rest/api/3/issue/{ticket_key}",
+        headers={"Accept": "application/json"},
+        params={"fields": ",".join(fields)},
+        timeout=10
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+@perf.track_cache
+@st.cache_data(ttl=900) # Old tickets rarely change; reused across refreshes
+@perf.count_miss
+def get_tickets_by_keys(ticket_keys):
+    """
+    Looks up a tuple of ticket keys with batched `key in (...)` JQL searches
+    instead of one request per ticket. Keys Jira doesn't know are left out.
+    """
+    fields = ["status", "assignee", "issuetype"]
+    issues = []
+    for start in range(0, len(ticket_keys), ENRICH_BATCH_SIZE):
+        chunk = ticket_keys[start:start + ENRICH_BATCH_SIZE]
+        try:
+            issues.extend(jira_search(f"key in ({', '.join(chunk)})", fields, timeout=10, stage_name="get_tickets_by_keys"))
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 400:
+                raise
+            # JQL rejects the whole query when one key doesn't exist (deleted
+            # or moved ticket), so fall back to a bounded parallel fan-out
+            with perf.stage("get_tickets_by_keys.fanout", keys=len(chunk)):
+                with ThreadPoolExecutor(max_workers=ENRICH_MAX_WORKERS) as pool:
+                    issues.extend(issue for issue in pool.map(lambda key: fetch_issue_or_none(key, fields), chunk) if issue)
+
+    return pd.DataFrame([parse_ticket_row(issue) for issue in issues],
+                        columns=["key", "assignee", "request_type", "status", "source", "Ticket Link"])
+
+
+# --- START OF NEW/UPDATED GMAIL SECTION ---
+# --- 5e. GMAIL - Authentication ---
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+# Refresh the access token this long before it expires, so no request is
+# ever sent with a token that dies mid-flight (they last ~1 hour)
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# One Credentials object per process, shared by every pooled service.
+# _gmail_lock serialises creation and refresh across session threads.
+_gmail_lock = threading.Lock()
+_gmail_state = {"token": None, "credentials": None, "missing_logged": False}
+
+# Idle Gmail services. googleapiclient/httplib2 objects aren't thread-safe,
+# so each concurrent script run checks one out instead of sharing a single
+# cached service (see gmail_service()).
+_gmail_pool = queue.LifoQueue()
+
+def get_gmail_credentials():
+    """
+    Returns the shared Gmail Credentials, refreshed proactively when they
+    expire within TOKEN_REFRESH_MARGIN. None if no GMAIL_TOKEN is configured.
+    Raises google.auth.exceptions.RefreshError if the refresh is rejected.
+    """
+    if not GMAIL_TOKEN:
+        return None
+    with _gmail_lock:
+        if _gmail_state["token"] != GMAIL_TOKEN:
+            # First use, or the secret changed: drop services built on the old token
+            from google.oauth2.credentials import Credentials
+            _gmail_state["credentials"] = Credentials.from_authorized_user_info(json.loads(GMAIL_TOKEN), SCOPES)
+            _gmail_state["token"] = GMAIL_TOKEN
+            while not _gmail_pool.empty():
+                _gmail_pool.get_nowait()
+
+        creds = _gmail_state["credentials"]
+        # No expiry (token JSON without one) counts as unknown age: refresh once.
+        # google-auth keeps expiry as naive UTC.
+        now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+        expiring = creds.expiry is None or creds.expiry - now_utc < TOKEN_REFRESH_MARGIN
+        if creds.refresh_token and (not creds.token or expiring):
+            from google.auth.transport.requests import Request
+            with perf.stage("gmail.token_refresh"):
+                perf.count_upstream("google_oauth")
+                creds.refresh(Request())
+    return creds
+
+def build_gmail_service(creds):
+    """
+    Builds a Gmail service from the discovery document bundled with
+    google-api-python-client (static_discovery), so no discovery request
+    goes over the network.
+    """
+    from googleapiclient.discovery import build
+    with perf.stage("gmail.build_service"):
+        return build('gmail', 'v1', credentials=creds, static_discovery=True, cache_discovery=False)
+
+@contextmanager
+def gmail_service():
+    """
+    Checks a Gmail service out of the pool for the duration of the block
+    (building one if none is idle) and returns it afterwards. Yields None
+    when no GMAIL_TOKEN is configured.
+
+    Streamlit runs every script run in a fresh thread, so a threading.local
+    per thread would rebuild the service on every rerun; the pool keeps one
+    service per *concurrent* run instead.
+    """
+    creds = get_gmail_credentials()
+    if creds is None:
+        # Don't stop the app, just yield None. We'll handle this gracefully.
+        # Every rerun gets here, so say it once per process.
+        if not _gmail_state["missing_logged"]:
+            _gmail_state["missing_logged"] = True
+            logger.warning("Gmail token not found in Streamlit Secrets.")
+        yield None
+        return
+    try:
+        service = _gmail_pool.get_nowait()
+    except queue.Empty:
+        service = build_gmail_service(creds)
+    try:
+        yield service
+    finally:
+        _gmail_pool.put(service)
+
+# --- 5f. GMAIL - Helper function to parse email body ---
+def get_email_body(payload):
+    """
+    Recursively searches a Gmail message payload for the 'text/plain' part
+    and decodes it from base64.
+    """
+    body = ""
+    if 'parts' in payload:
+        for part in payload['parts']:
+            body += get_email_body(part) # Recursive call
+    elif payload.get('mimeType') == 'text/plain':
+        data = payload.get('body', {}).get('data')
+        if data:
+            # Decode from base64 and ignore errors
+            body += base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+    return body
+
+# --- 5g. GMAIL - Priority Ticket Counter (UPDATED) ---
+@served_from_snapshot("priority", from_frame=lambda frame: set(frame["key"]))
+@perf.track_cache
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+@perf.count_miss
+def get_priority_ticket_set(_service, today_str): # <-- CHANGED: Renamed function
+    """
+    Searches Gmail for priority tickets for the given day and returns a *set* of unique ticket IDs.
+    """
+    if not _service: 
+        return set() # Return an empty set
+
+    from googleapiclient.errors import HttpError # Already loaded by build_gmail_service()
+
+    query = f'("adops-ea@miqdigital.com" OR "adops-emea@miqdigital.com") ("priority" OR "prioritise" OR "prioritize" OR "Urgent") after:{today_str}'
+    
+    try:
+        # Search for messages
+        with perf.stage("get_priority_ticket_set.network.list"):
+            perf.count_upstream("gmail")
+            results = _service.users().messages().list(userId='me', q=query).execute()
+        messages = results.get('messages', [])
+        
+        if not messages:
+            return set() # No priority emails today
+
+        unique_ticket_ids = set()
+        ticket_regex = re.compile(r'TKTS-\d+', re.IGNORECASE)
+        batch = _service.new_batch_http_request()
+        
+        parse_seconds = [0.0] # Callbacks run inside batch.execute(); time them separately
+
+        def add_tickets_to_set(request_id, response, exception):
+            parse_start = time.perf_counter()
+            if exception is None:
+                subject = ""
+                snippet = response.get('snippet', '')
+                headers = response.get('payload', {}).get('headers', [])
+                for h in headers:
+                    if h['name'].lower() == 'subject':
+                        subject = h['value']
+                        break
+                
+                payload = response.get('payload', {})
+                body = get_email_body(payload)
+                search_text = subject + " " + (body if body else snippet)
+                
+                found_tickets = ticket_regex.findall(search_text)
+                if found_tickets:
+                    for ticket in found_tickets:
+                        unique_ticket_ids.add(ticket.upper())
+            else:
+                logger.warning("Failed to get email part: %s", exception)
+            parse_seconds[0] += time.perf_counter() - parse_start
+
+        for message in messages[:50]: 
+            batch.add(_service.users().messages().get(userId='me', id=message['id'], format='full'), callback=add_tickets_to_set)
+        
+        batch_start = time.perf_counter()
+        perf.count_upstream("gmail") # One multipart HTTP call for the whole batch
+        batch.execute()
+        batch_seconds = time.perf_counter() - batch_start
+        perf.record_stage("get_priority_ticket_set.network.batch", batch_seconds - parse_seconds[0])
+        perf.record_stage("get_priority_ticket_set.parse", parse_seconds[0])
+        
+        return unique_ticket_ids # <-- CHANGED: Return the full set
+
+    except HttpError as error:
+        if error.resp.status in (401, 403):
+            # Auth problems must reach the page, not be cached as "0 priority tickets"
+            raise
+        logger.warning("An error occurred searching Gmail: %s", error)
+        return set()
+    except Exception as e:
+        logger.warning("An error occurred parsing Gmail messages: %s", e)
+        return set()
+# --- END OF NEW/UPDATED GMAIL SECTION ---
+
+
+# --- 5h. NEW: Helper Function to build HTML table ---
+@perf.timed("build_html_table")
+def build_html_table(df, columns, link_column_key=None, link_text_col_key=None):
+    """
+    Builds a scrollable HTML table from a DataFrame, with Manrope font
+    and an optional clickable link column.
+    
+    Args:
+        df (pd.DataFrame): The data to display.
+        columns (dict): A dictionary of {data_column_name: display_column_name}
+        link_column_key (str): The name of the column in `df` that contains the URL.
+        link_text_col_key (str): The name of the column in `df` that contains the text for the link.
+    """
+    
+    # Start building the HTML string
+    html = """
+    <div class="table-container">
+        <table class="custom-table">
+            <thead>
+                <tr>
+    """
+    
+    # Column headers
+    for col_name in columns.values():
+        html += f"<th>{col_name}</th>"
+    html += "</tr></thead><tbody>"
+    
+    # Table rows
+    for index, row in df.iterrows():
+        html += "<tr>"
+        for col_key, col_name in columns.items():
+            if col_key == link_column_key:
+                # Create a clickable link
+                url = row[col_key]
+                text = row[link_text_col_key] # Get the text from the link_text col
+                html += f'<td><a href="{url}" target="_blank">{text}</a></td>'
+            else:
+                html += f"<td>{row[col_key]}</td>"
+        html += "</tr>"
+        
+    html += "</tbody></table></div>"
+    return html
+
+
+# --- 9. Compute SLA Metrics ---
+def assign_sla_status(time_diff):
+    if pd.isna(time_diff):
+        return "⚪ N/A"
+    if time_diff.total_seconds() < 0:
+        return "🚨 Breached"
+    return "✅ Within SLA"
+
+def format_time_remaining_column(time_diff):
+    """
+    Column version of format_time_remaining() (same strings), so the SLA
+    clock can relabel every ticket once a minute without a per-row apply.
+    """
+    seconds = time_diff.dt.total_seconds()
+    ago = -seconds
+    as_text = lambda values: values.fillna(0).astype('int64').astype(str)
+
+    # Breached: largest non-zero unit first, like the scalar version
+    ago_days = as_text(ago // 86400)
+    ago_hours = as_text((ago % 86400) // 3600)
+    ago_minutes = as_text((ago % 3600) // 60)
+    days = as_text(seconds // 86400)
+    hours = as_text((seconds % 86400) // 3600)
+    minutes = as_text((seconds % 3600) // 60)
+
+    labels = pd.Series("N/A (No SLA)", index=time_diff.index, dtype=object)
+    breached = seconds < 0
+    labels[breached & (ago >= 86400)] = "🚨 Breached " + ago_days + "d " + ago_hours + "h ago"
+    labels[breached & (ago < 86400) & (ago >= 3600)] = "🚨 Breached " + ago_hours + "h " + ago_minutes + "m ago"
+    labels[breached & (ago < 3600)] = "🚨 Breached " + ago_minutes + "m ago"
+    labels[(seconds >= 0) & (seconds < 8 * 3600)] = "⚠️ " + hours + "h " + minutes + "m remaining"
+    labels[seconds >= 8 * 3600] = "✅ " + days + "d " + hours + "h remaining"
+    return labels
+
+def update_sla_clock(df, now):
+    """
+    Re-derives time_diff, 'SLA Timer' and SLA_Status from breach_time for
+    the given `now`, in place. No network: app.py calls this once a minute
+    (SLA clock fragment) between Jira refreshes.
+    """
+    with perf.stage("sla_clock", rows=len(df)):
+        df['time_diff'] = df['breach_time'] - now
+        df['SLA Timer'] = format_time_remaining_column(df['time_diff'])
+        df['SLA_Status'] = np.select(
+            [df['time_diff'].isna(), df['time_diff'] < pd.Timedelta(0)],
+            ["⚪ N/A", "🚨 Breached"],
+            default="✅ Within SLA"
+        )
+    return df
+
+def compute_sla(df, now):
+    """
+    Adds the SLA columns (breach_time, time_diff, 'SLA Timer', SLA_Status)
+    and the display/link columns to the active-tickets frame, in place.
+    """
+    with perf.stage("section9.sla", rows=len(df)):
+        df['breach_time'] = df['breach_time_api']
+        update_sla_clock(df, now)
+
+        df['Ticket'] = df['key'] # Column for display
+        df['Ticket Link'] = ticket_links(df['key'], df['source']) # Column for URL (on the ticket's own site)
+    return df
+
+
+# --- 9a. Breach-Time Index (SLA forecast) ---
+class BreachTimeIndex:
+    """
+    The breach times of one active snapshot, sorted once so that "how many
+    tickets breach before T" is a binary search (np.searchsorted) instead
+    of a scan over every row. Tickets without an SLA are left out.
+    """
+
+    def __init__(self, breach_times, assignees):
+        has_sla = breach_times.notna().to_numpy()
+        # Naive UTC datetime64[ns], comparable with Timestamp.to_datetime64()
+        times = breach_times[has_sla].dt.tz_convert('UTC').dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+        codes, self.assignee_names = pd.factorize(assignees[has_sla])
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        self.assignee_codes = codes[order]
+
+    def __len__(self):
+        return len(self.times)
+
+    def _position(self, when):
+        return int(np.searchsorted(self.times, pd.Timestamp(when).as_unit('ns').to_datetime64(), side='left'))
+
+    def breached_count(self, now):
+        """Tickets whose breach time is already past (same rule as assign_sla_status)."""
+        return self._position(now)
+
+    def breaching_within(self, now, hours):
+        """{h: tickets breaching in [now, now + h hours)} for each h in `hours`."""
+        start = self._position(now)
+        return {h: self._position(now + pd.Timedelta(hours=h)) - start for h in hours}
+
+    def forecast_by_assignee(self, now, hours):
+        """
+        Upcoming breaches per assignee, bucketed by window ("0-1h", "1-4h",
+        ...). Long format: one row per (assignee, window) with Count > 0.
+        """
+        bounds = [self._position(now)] + [self._position(now + pd.Timedelta(hours=h)) for h in hours]
+        rows = []
+        previous = 0
+        for h, lo, hi in zip(hours, bounds, bounds[1:]):
+            counts = np.bincount(self.assignee_codes[lo:hi], minlength=len(self.assignee_names))
+            window = f"{previous}-{h}h"
+            rows.extend(
+                {"assignee": self.assignee_names[code], "window": window, "Count": int(counts[code])}
+                for code in np.flatnonzero(counts)
+            )
+            previous = h
+        return pd.DataFrame(rows, columns=["assignee", "window", "Count"])
+
+
+@perf.track_cache
+@st.cache_resource(max_entries=4, ttl=900)
+@perf.count_miss
+def breach_time_index(snapshot_version, _df):
+    """One BreachTimeIndex per snapshot, shared by every session."""
+    return BreachTimeIndex(_df['breach_time_api'], _df['assignee'])
+
+
+# --- 9a-3. NEW: Urgency Queue (wall display) ---
+URGENCY_CAMPAIGN_LEAD = pd.Timedelta(hours=24)  # creatives must be live a day before the campaign starts
+URGENCY_PRIORITY_BOOST = pd.Timedelta(hours=8)  # Gmail-flagged tickets count as due this much sooner
+URGENCY_TOP_K = 10
+_NO_DEADLINE = np.iinfo(np.int64).max
+
+class UrgencyQueue:
+    """
+    Active tickets ordered by urgency deadline: the earlier of the SLA breach
+    time and the campaign start minus URGENCY_CAMPAIGN_LEAD, pulled forward
+    by URGENCY_PRIORITY_BOOST for Gmail priority tickets.
+
+    A deadline doesn't move with the clock, so the order only changes when a
+    snapshot does. apply() diffs the new deadlines against the current ones
+    and pushes only the changed tickets onto a heap; entries that went stale
+    (deadline changed, ticket closed) are skipped when they surface.
+    """
+
+    def __init__(self):
+        self._heap = []                                 # (deadline ns, seq, ticket id)
+        self._deadlines = pd.Series(dtype='int64')      # ticket id -> current deadline ns
+        self._frame = None                              # snapshot the deadlines came from
+        self._priority = frozenset()
+        self._seq = itertools.count()                   # tie-break: older entry first
+        self._applied = None
+        self._top = {}                                  # k -> top_k frame, until the next apply
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    @staticmethod
+    def deadlines(df, priority_keys):
+        """Urgency deadline (ns since epoch) per row of df; _NO_DEADLINE without dates."""
+        def ns(column):
+            # Naive UTC datetime64 avoids boxing every Timestamp; NaT comes out as int64 min
+            values = column.dt.tz_convert(None).to_numpy().astype('datetime64[ns]').view('int64')
+            return np.where(values == np.iinfo(np.int64).min, _NO_DEADLINE, values)
+
+        deadline = np.minimum(ns(df['breach_time_api']),
+                              ns(df['campaign_start_date'] - URGENCY_CAMPAIGN_LEAD))
+        priority = df['key'].isin(priority_keys).to_numpy()
+        deadline = np.where(priority & (deadline != _NO_DEADLINE), deadline - URGENCY_PRIORITY_BOOST.value, deadline)
+        return np.where(priority & (deadline == _NO_DEADLINE), 0, deadline) # flagged, no dates: on top
+
+    def apply(self, df, priority_keys, version):
+        """Brings the queue up to a snapshot (and Gmail set). Returns the number of tickets pushed."""
+        priority = frozenset(priority_keys)
+        with self._lock:
+            if (version, priority) == self._applied:
+                return 0
+            ids = pd.Index(df['source'].astype(str) + ":" + df['key'].astype(str))
+            current = pd.Series(self.deadlines(df, priority), index=ids)
+            changed = current[current.ne(self._deadlines.reindex(ids)).to_numpy()]
+
+            if len(changed) > len(current) // 4 or len(self._heap) > 2 * len(current) + 64:
+                # First snapshot, or mostly stale entries: heapify beats pushing one by one
+                self._heap = [(value, next(self._seq), ticket_id) for ticket_id, value in current.items()]
+                heapq.heapify(self._heap)
+            else:
+                for ticket_id, value in changed.items():
+                    heapq.heappush(self._heap, (value, next(self._seq), ticket_id))
+            self._deadlines = current
+            self._frame = df
+            self._priority = priority
+            self._applied = (version, priority)
+            self._top = {}
+            return len(changed)
+
+    def top_k(self, k):
+        """The k most urgent tickets, most urgent first (deadline, driver and display columns)."""
+        with self._lock:
+            if k in self._top:
+                # Same snapshot: the order can't have changed (only "Due" relabels with the clock)
+                return self._top[k].copy()
+            live, seen = [], set()
+            while self._heap and len(live) < k:
+                entry = heapq.heappop(self._heap)
+                value, _, ticket_id = entry
+                if ticket_id in seen or self._deadlines.get(ticket_id) != value:
+                    continue # stale: superseded, duplicate or closed
+                seen.add(ticket_id)
+                live.append(entry)
+            for entry in live:
+                heapq.heappush(self._heap, entry)
+            rows = self._deadlines.index.get_indexer([ticket_id for _, _, ticket_id in live])
+            self._top[k] = self._display(self._frame, self._priority, rows, live)
+            return self._top[k].copy()
+
+    @staticmethod
+    def _display(df, priority, rows, live):
+        """Display frame of top_k() for heap entries `live` at positions `rows` of df."""
+        if df is None:
+            return pd.DataFrame(columns=["key", "source", "assignee", "status", "request_type", "link",
+                                         "breach_time", "campaign_start_date", "priority", "deadline", "driver"])
+        values = np.array([value for value, _, _ in live], dtype='int64')
+        top = pd.DataFrame({
+            "key": df['key'].iloc[rows].to_numpy(),
+            "source": df['source'].iloc[rows].to_numpy(),
+            "assignee": df['assignee'].iloc[rows].to_numpy(),
+            "status": df['status'].iloc[rows].to_numpy(),
+            "request_type": df['request_type'].iloc[rows].to_numpy(),
+            "link": df['Ticket Link'].iloc[rows].to_numpy(),
+            "breach_time": df['breach_time_api'].iloc[rows].reset_index(drop=True),
+            "campaign_start_date": df['campaign_start_date'].iloc[rows].reset_index(drop=True),
+        })
+        top['priority'] = top['key'].isin(priority)
+        no_dates = (top['breach_time'].isna() & top['campaign_start_date'].isna()).to_numpy()
+        top['deadline'] = pd.to_datetime(np.where(no_dates | (values == _NO_DEADLINE), np.iinfo(np.int64).min, values), utc=True)
+        campaign_due = top['campaign_start_date'] - URGENCY_CAMPAIGN_LEAD
+        top['driver'] = np.where(campaign_due.lt(top['breach_time']) | (top['breach_time'].isna() & campaign_due.notna()),
+                                 "Campaign start", "SLA")
+        top['driver'] = np.select([no_dates & top['priority'], no_dates, top['priority']],
+                                  ["Priority", "-", top['driver'] + " + Priority"], top['driver'])
+        return top
+
+def format_due(time_diff):
+    """'in 3h 20m' / 'overdue 1d 2h' for an urgency deadline (not only SLA, so no 'Breached')."""
+    if pd.isna(time_diff):
+        return "-"
+    seconds = abs(time_diff.total_seconds())
+    days, rem = divmod(seconds, 86400)
+    hours, rem = divmod(rem, 3600)
+    span = f"{int(days)}d {int(hours)}h" if days else f"{int(hours)}h {int(rem // 60)}m"
+    return f"🚨 overdue {span}" if time_diff.total_seconds() < 0 else f"in {span}"
+
+_urgency_queue = UrgencyQueue()
+
+def most_urgent(df, priority_keys, k=URGENCY_TOP_K):
+    """Top-k of the process-wide urgency queue, brought up to date with this snapshot first."""
+    with perf.stage("urgency_queue", k=k) as info:
+        info["pushed"] = _urgency_queue.apply(df, priority_keys, df.attrs.get('snapshot_version', 0))
+        return _urgency_queue.top_k(k)
+
+
+# --- 9a-2. NEW: Assignee Workload & Aging ---
+WORKLOAD_DUE_HOURS = 8          # "due soon" window (same as the ⚠️ SLA band)
+WORKLOAD_CAMPAIGN_DAYS = 7      # campaign starts counted as "close"
+WORKLOAD_AGE_PERCENTILES = [50, 90]
+
+def compute_workload(df, now):
+    """
+    Per-assignee workload of an active snapshot, in one pass: the rows are
+    factorized by assignee and sorted once by (assignee, age), then every
+    column is a np.bincount / np.minimum.reduceat over that order, so there
+    is no per-assignee filtering. Returns one row per assignee.
+    """
+    codes, names = pd.factorize(df['assignee'])
+    if not len(names):
+        return pd.DataFrame(columns=["Assignee", "Open", "Breached", f"Due ≤{WORKLOAD_DUE_HOURS}h",
+                                     *[f"Age p{p} (d)" for p in WORKLOAD_AGE_PERCENTILES], "Oldest (d)",
+                                     f"Campaigns ≤{WORKLOAD_CAMPAIGN_DAYS}d", "Next campaign (d)"])
+    day = pd.Timedelta(days=1)
+    age_days = ((now - df['created']) / day).to_numpy(dtype=float)
+    until_breach = (df['breach_time_api'] - now).to_numpy()
+    until_start = ((df['campaign_start_date'] - now.normalize()) / day).to_numpy(dtype=float)
+
+    order = np.lexsort((age_days, codes))
+    codes, age_days = codes[order], age_days[order]
+    counts = np.bincount(codes, minlength=len(names))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    def per_assignee(mask):
+        return np.bincount(codes, weights=mask[order], minlength=len(names)).astype(int)
+
+    # NaT compares False, so tickets without an SLA count as neither
+    breached = per_assignee(until_breach < np.timedelta64(0))
+    due_soon = per_assignee((until_breach >= np.timedelta64(0)) &
+                            (until_breach < np.timedelta64(WORKLOAD_DUE_HOURS, 'h')))
+    upcoming = (until_start >= 0) & (until_start < WORKLOAD_CAMPAIGN_DAYS)
+    campaigns_soon = per_assignee(upcoming)
+    # Earliest campaign start from today on (inf = none)
+    next_start = np.minimum.reduceat(np.where(until_start >= 0, until_start, np.inf)[order], starts)
+
+    table = {"Assignee": names, "Open": counts, "Breached": breached, f"Due ≤{WORKLOAD_DUE_HOURS}h": due_soon}
+    for p in WORKLOAD_AGE_PERCENTILES:
+        # Linear interpolation inside each assignee's (sorted) block, like np.percentile
+        position = starts + (counts - 1) * p / 100
+        lo, hi = np.floor(position).astype(int), np.ceil(position).astype(int)
+        table[f"Age p{p} (d)"] = age_days[lo] + (age_days[hi] - age_days[lo]) * (position - lo)
+    table["Oldest (d)"] = age_days[starts + counts - 1]
+    table[f"Campaigns ≤{WORKLOAD_CAMPAIGN_DAYS}d"] = campaigns_soon
+    table["Next campaign (d)"] = np.where(np.isinf(next_start), np.nan, np.floor(next_start))
+
+    return pd.DataFrame(table).sort_values(
+        ["Breached", f"Due ≤{WORKLOAD_DUE_HOURS}h", "Open"], ascending=False, ignore_index=True
+    )
+
+
+@perf.track_cache
+@st.cache_resource(max_entries=4, ttl=900)
+@perf.count_miss
+def assignee_workload(snapshot_version, sla_clock, _df):
+    """
+    compute_workload() once per snapshot and SLA minute (breached / due
+    counts move with the clock), shared by every session.
+    """
+    with perf.stage("workload", rows=len(_df)):
+        return compute_workload(_df, sla_clock)
+
+
+# --- 9b. NEW: Daily Counts (shared by the page and tkts_export) ---
+EXCLUDED_REQUEST_TYPES = ["China - Outbound"] # not counted as our work
+EXCLUDED_ASSIGNEES = ["Adops-EA Group", "Ganesh Balasaheb Zaware"] # left out of the per-assignee reports
+
+def daily_counts(df_all, today):
+    """Tickets created / closed on `today` (a UTC date), excluding EXCLUDED_REQUEST_TYPES."""
+    counted = df_all[~df_all['request_type'].isin(EXCLUDED_REQUEST_TYPES)]
+    return {
+        "created_today": int((counted['created'].dt.date == today).sum()),
+        "closed_today": int((counted['resolutiondate'].dt.date == today).sum()),
+    }
+
+
+# --- 9c. Priority Ticket Matching ---
+def match_priority_tickets(df, df_all, priority_ticket_set):
+    """
+    Looks up the priority ticket IDs found in Gmail among the active (df)
+    and created/resolved-today (df_all) tickets.
+    """
+    with perf.stage("priority_scan", priority_ids=len(priority_ticket_set)):
+        # Create a master list of all tickets we know about
+        all_known_tickets_df = pd.concat([
+            df[['key', 'source', 'assignee', 'request_type', 'status', 'Ticket Link']],
+            df_all[['key', 'source', 'assignee', 'request_type', 'status']]
+        ]).drop_duplicates(subset=['source', 'key'])
+
+        # Add Ticket Link for any tickets that only came from df_all
+        all_known_tickets_df['Ticket Link'] = ticket_links(all_known_tickets_df['key'], all_known_tickets_df['source'])
+
+        # Filter this master list for our priority tickets
+        priority_list = list(priority_ticket_set)
+        return all_known_tickets_df[all_known_tickets_df['key'].isin(priority_list)].copy()
+
+
+def enrich_priority_tickets(priority_details_df, priority_ticket_set):
+    """
+    Completes match_priority_tickets() with the priority tickets that are
+    neither active nor created/resolved today, looked up in Jira in one
+    batch (get_tickets_by_keys). Returns (full frame, keys still unknown).
+    """
+    missing = sorted(set(priority_ticket_set) - set(priority_details_df['key']))
+    if not missing:
+        return priority_details_df, []
+    with perf.stage("priority_enrichment", keys=len(missing)):
+        found_df = get_tickets_by_keys(tuple(missing))
+    unresolved = sorted(set(missing) - set(found_df['key']))
+    return pd.concat([priority_details_df, found_df], ignore_index=True), unresolved
+
+
+# --- 9d. NEW: Shared Render Cache ---
+# st.cache_data hands every caller its own copy and is keyed by arguments,
+# not by snapshot, so finished views (HTML tables) used to
+# be rebuilt in every session: ten people opening the same assignee built
+# the same table ten times. This keeps them once per process, keyed by
+# (snapshot version, view, params); a new snapshot simply stops hitting the
+# old keys, which then age out of the LRU. Exact-ID lookups stay out: they
+# are a fresh check against Jira, on get_ticket_details' 60 s TTL.
+class RenderCache:
+    """
+    LRU of finished view results shared by every session, capped by the
+    estimated bytes of its entries (value_bytes). A value being built is
+    built once: other sessions asking for the same key wait for it.
+    Exceptions propagate and are not cached.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (value, bytes), least recently used first
+        self._bytes = 0
+        self._building = {}           # key -> lock held by the session building it
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, version, view, params, build):
+        """
+        (value, hit): the cached result of `view` for (version, params), else
+        build()'s, stored if it fits.
+        """
+        key = (version, view, params)
+        with self._lock:
+            value, hit = self._hit(key)
+            if not hit:
+                build_lock = self._building.setdefault(key, threading.Lock())
+        if not hit:
+            with build_lock: # one build per key; other sessions wait for it
+                with self._lock:
+                    value, hit = self._hit(key)
+                if not hit:
+                    try:
+                        value = build()
+                        size = value_bytes(value)
+                        with self._lock:
+                            self.misses += 1
+                            self._store(key, value, size)
+                    finally:
+                        with self._lock:
+                            self._building.pop(key, None)
+        perf.count_lookup(f"render.{view}", hit)
+        return value, hit
+
+    def _hit(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], True
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return # would evict everything else
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """{entries, bytes, max_bytes, hits, misses, hit_ratio, evictions} of this process."""
+        with self._lock:
+            calls = self.hits + self.misses
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / calls, 3) if calls else None, "evictions": self.evictions}
+
+
+def value_bytes(value):
+    """Rough memory size of a cached value (str, DataFrame, or containers of those)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_bytes(k) + value_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+render_cache = RenderCache(DEFAULT_RENDER_CACHE_MAX_MB * 2**20)
+
+def shared_render(view, version, params, build):
+    """
+    build() once per (snapshot version, view, params) in this process; see
+    RenderCache. `version` identifies what the result depends on, e.g.
+    (snapshot_version, sla_clock); `params` the view's own inputs (hashable).
+    """
+    with perf.stage(f"render.{view}") as info:
+        value, hit = render_cache.get(version, view, params, build)
+        info["cache"] = "hit" if hit else "miss"
+        return value
@@ -0,0 +1,300 @@
+"""
+Headless, read-only export of the TKTS Dashboard snapshot.
+
+Other teams scrape the Streamlit page for our counts, which costs a full
+script run and all of its HTML per scrape. This serves the same numbers
+straight from the tkts_data loaders and the section 9 SLA logic, with no
+page rendering:
+
+    GET /metrics.json                      headline counts (as on the page)
+    GET /tickets.json|.csv|.parquet        active tickets with SLA status
+    GET /urgent.json?k=10                  most urgent tickets, for the wall display
+    GET /healthz
+
+Responses carry a weak ETag over their content; a client that sends it back
+in If-None-Match gets an empty 304 until something actually changes (new
+data from Jira, or a ticket crossing its breach time). The loaders keep
+their st.cache_data TTL, so polling never reaches Jira more often than the
+dashboard itself would.
+
+    python -m tkts_export serve --port 8502
+    python -m tkts_export dump --format csv -o tickets.csv
+
+Both read the Jira/Gmail settings from the environment (see
+tkts_data.configure_from_env).
+"""
+import argparse
+import hashlib
+import io
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import tkts_data
+import tkts_perf as perf
+
+FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# SLA_Status labels of section 9 -> stable codes for machine consumers
+SLA_STATUS_CODES = {"🚨 Breached": "breached", "✅ Within SLA": "within_sla", "⚪ N/A": "no_sla"}
+
+TICKET_COLUMNS = ["key", "source", "status", "assignee", "request_type", "created",
+                  "campaign_start_date", "breach_time", "sla_status", "link"]
+
+URGENT_COLUMNS = ["key", "source", "deadline", "driver", "assignee", "status", "request_type",
+                  "breach_time", "campaign_start_date", "link"]
+URGENT_MAX_K = 100
+
+
+# --- 1. Snapshot ---
+def build_snapshot(now):
+    """
+    Loads the current snapshot. Returns (tickets frame, metrics dict,
+    snapshot versions, fetched_at, SLA frame); raises what the loaders raise.
+    """
+    df = tkts_data.compute_sla(tkts_data.load_jira_data(), now)
+    df_all = tkts_data.load_all_jira_data()
+
+    tickets = pd.DataFrame({
+        "key": df['key'],
+        "source": df['source'],
+        "status": df['status'],
+        "assignee": df['assignee'],
+        "request_type": df['request_type'],
+        "created": df['created'],
+        "campaign_start_date": df['campaign_start_date'],
+        "breach_time": df['breach_time'],
+        "sla_status": df['SLA_Status'].map(SLA_STATUS_CODES),
+        "link": df['Ticket Link'],
+    }, columns=TICKET_COLUMNS).reset_index(drop=True)
+
+    sla_counts = tickets['sla_status'].value_counts()
+    metrics = {
+        "active": len(tickets),
+        "breached": int(sla_counts.get("breached", 0)),
+        "within_sla": int(sla_counts.get("within_sla", 0)),
+        "no_sla": int(sla_counts.get("no_sla", 0)),
+        **tkts_data.daily_counts(df_all, now.date()),
+        "source_errors": {**df_all.attrs.get('source_errors', {}), **df.attrs.get('source_errors', {})},
+        "stale_sources": {**df_all.attrs.get('stale_sources', {}), **df.attrs.get('stale_sources', {})},
+    }
+    versions = (df.attrs.get('snapshot_version'), df_all.attrs.get('snapshot_version'))
+    return tickets, metrics, versions, df.attrs.get('fetched_at'), df
+
+
+def priority_keys(now):
+    """Today's Gmail priority set, as on the page; empty without a (working) Gmail token."""
+    if tkts_data.SHARED_SNAPSHOT is not None:
+        # The snapshot writer holds the Gmail token
+        try:
+            return tkts_data.get_priority_ticket_set(None, now.strftime('%Y/%m/%d'))
+        except Exception:
+            return set()
+    if not tkts_data.GMAIL_TOKEN:
+        return set()
+    try:
+        with tkts_data.gmail_service() as service:
+            return tkts_data.get_priority_ticket_set(service, now.strftime('%Y/%m/%d')) if service else set()
+    except Exception:
+        return set()
+
+
+def content_etag(tickets, metrics):
+    """Weak ETag over the ticket rows and the counts (not over timestamps of the fetch)."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(tickets, index=False).to_numpy().tobytes())
+    digest.update(json.dumps(metrics, sort_keys=True).encode())
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def render(kind, fmt, snapshot, k=tkts_data.URGENCY_TOP_K):
+    """Response body of /<kind>.<fmt> for a snapshot from current_snapshot()."""
+    tickets, metrics = snapshot["tickets"], snapshot["metrics"]
+    if kind == "urgent":
+        urgent = tkts_data.most_urgent(snapshot["frame"], snapshot["priority"], k)[URGENT_COLUMNS]
+        return urgent.to_json(orient="records", date_format="iso").encode()
+    if kind == "metrics":
+        body = {"generated_at": snapshot["generated_at"], "fetched_at": snapshot["fetched_at"], **metrics}
+        return json.dumps(body).encode()
+    if fmt == "json":
+        return tickets.to_json(orient="records", date_format="iso").encode()
+    if fmt == "csv":
+        return tickets.to_csv(index=False).encode()
+    buffer = io.BytesIO()
+    tickets.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+# The loaders return a fresh copy on every call, so the computed export is
+# kept here for as long as both snapshots and the SLA minute are unchanged;
+# a 304 then costs two cache hits and a dict lookup. Rendered bodies are
+# kept with it per (kind, format). A new snapshot replaces the whole dict,
+# so a request never mixes one snapshot's ETag with another's body.
+_current = {"key": None, "snapshot": None}
+_current_lock = threading.Lock()
+
+def current_snapshot(now=None):
+    """The export of the current snapshot: tickets, metrics, etag and rendered bodies."""
+    now = now or pd.Timestamp.now(tz='UTC')
+    with _current_lock:
+        if _current["key"] is not None and _current["key"][1] == now.floor('min'):
+            # Still the same minute: only a new fetch can change the content
+            versions = (tkts_data.load_jira_data().attrs.get('snapshot_version'),
+                        tkts_data.load_all_jira_data().attrs.get('snapshot_version'))
+            if _current["key"][0] == versions:
+                return _current["snapshot"]
+
+        with perf.stage("export.snapshot"):
+            tickets, metrics, versions, fetched_at, frame = build_snapshot(now)
+        _current["key"] = (versions, now.floor('min'))
+        _current["snapshot"] = {
+            "tickets": tickets,
+            "metrics": metrics,
+            "frame": frame,
+            "priority": priority_keys(now),
+            "etag": content_etag(tickets, metrics),
+            "generated_at": now.isoformat(),
+            "fetched_at": fetched_at.isoformat() if fetched_at else None,
+            "bodies": {},
+        }
+        return _current["snapshot"]
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+# --- 2. HTTP Server ---
+class ExportHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.lstrip("/")
+        if path == "healthz":
+            self._send(200, b'{"ok": true}')
+            return
+        kind, _, fmt = path.partition(".")
+        if (kind, fmt) not in {("metrics", "json"), ("urgent", "json")} | {("tickets", f) for f in FORMATS}:
+            self._send(404, json.dumps({"error": f"unknown export '/{path}'",
+                                        "routes": ["/metrics.json", "/urgent.json"] + [f"/tickets.{f}" for f in FORMATS]}).encode())
+            return
+        k = None
+        if kind == "urgent":
+            try:
+                k = int(parse_qs(url.query).get("k", [tkts_data.URGENCY_TOP_K])[0])
+            except ValueError:
+                k = 0
+            if not 1 <= k <= URGENT_MAX_K:
+                self._send(400, json.dumps({"error": f"k must be an integer from 1 to {URGENT_MAX_K}"}).encode())
+                return
+
+        perf.start_run()
+        status = self._export(kind, fmt, k)
+        # One JSON log line per request with TKTS_PERF_LOG=1, like a page run
+        perf.finish_run(view="export", path=f"/{path}", status=status)
+
+    def _export(self, kind, fmt, k):
+        try:
+            snapshot = current_snapshot()
+        except Exception as e:
+            self._send(502, json.dumps({"error": f"could not load the snapshot: {tkts_data.describe_error(e)}"}).encode())
+            return 502
+
+        bodies = snapshot["bodies"]
+        if kind == "urgent" and (kind, k) not in bodies:
+            # Depends on the Gmail set and k as well, so it gets an ETag of its own
+            with perf.stage("export.render.urgent"):
+                body = render(kind, fmt, snapshot, k)
+            bodies[(kind, k)] = (body, f'W/"{hashlib.sha1(body).hexdigest()[:20]}"')
+        etag = bodies[(kind, k)][1] if kind == "urgent" else snapshot["etag"]
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self._send(304, headers=headers)
+            return 304
+        if kind == "urgent":
+            body = bodies[(kind, k)][0]
+        else:
+            if (kind, fmt) not in bodies:
+                with perf.stage(f"export.render.{fmt}"):
+                    bodies[(kind, fmt)] = render(kind, fmt, snapshot)
+            body = bodies[(kind, fmt)]
+        self._send(200, body, content_type=FORMATS[fmt], headers=headers)
+        return 200
+
+    do_HEAD = do_GET
+
+
+def serve(host="127.0.0.1", port=8502):
+    """Starts the export server in a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), ExportHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# --- 3. CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Export the TKTS Dashboard snapshot without Streamlit.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the read-only HTTP endpoint")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8502)
+    dump_parser = commands.add_parser("dump", help="write one export and exit")
+    dump_parser.add_argument("--kind", choices=["tickets", "metrics", "urgent"], default="tickets")
+    dump_parser.add_argument("--format", choices=list(FORMATS), default="json")
+    dump_parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+    fmt = "json" if args.command == "dump" and args.kind in ("metrics", "urgent") else getattr(args, "format", None)
+    if fmt == "parquet" and not args.output:
+        parser.error("--format parquet needs --output")
+
+    tkts_data.configure_from_env()
+
+    if args.command == "serve":
+        server, base_url = serve(args.host, args.port)
+        print(f"TKTS export serving at {base_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    body = render(args.kind, fmt, current_snapshot())
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(body)
+    else:
+        sys.stdout.buffer.write(body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Lightweight performance instrumentation for the TKTS Dashboard.
+
+Collects per-stage timings for the current script run, plus process-wide
+hit/miss counters for the @st.cache_data loaders and a rolling count of
+upstream (Jira/Gmail) HTTP calls. app.py shows both in a
+debug panel (open the app with ?debug=1). With TKTS_PERF_LOG=1 set in the
+environment, one structured JSON log line is also written per script run.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("tkts.perf")
+PERF_LOG_ENABLED = os.environ.get("TKTS_PERF_LOG") == "1"
+
+if PERF_LOG_ENABLED and not logger.handlers:
+    # One JSON document per line, nothing else, so the log pipeline can parse it
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Each Streamlit session runs its script in its own thread, so the stages of
+# the current run are kept per thread.
+_run = threading.local()
+
+# Cache counters are shared by all sessions of the process
+_cache_lock = threading.Lock()
+_cache_stats = {}
+
+# (timestamp, source) of every upstream HTTP call in the last hour
+_upstream_lock = threading.Lock()
+_upstream_calls = deque()
+
+
+# --- 1. Script Run & Stage Timings ---
+def start_run():
+    """Resets the stage list. Call once at the top of every script run."""
+    _run.started = time.perf_counter()
+    _run.stages = []
+
+
+def record_stage(name, seconds, **extra):
+    """Appends one timing record to the current run."""
+    if not hasattr(_run, "stages"):
+        start_run()
+    _run.stages.append({
+        "stage": name,
+        "ms": round(seconds * 1000, 2),
+        "start_ms": round((time.perf_counter() - seconds - _run.started) * 1000, 2),
+        **extra
+    })
+
+
+@contextmanager
+def stage(name, **extra):
+    """
+    Times the enclosed block as one stage. The yielded dict can be used to
+    attach extra fields to the record, e.g. info["bytes"] = len(body).
+    """
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        record_stage(name, time.perf_counter() - start, **extra)
+
+
+def timed(name):
+    """Decorator version of stage() for helpers like build_html_table."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_current_run(func):
+    """
+    Wraps func to run in a worker thread (ThreadPoolExecutor): the stages it
+    records are added to the calling thread's current run instead of being
+    lost with the worker's own thread-local run.
+    """
+    if not hasattr(_run, "stages"):
+        start_run()
+    started, stages = _run.started, _run.stages
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _run.started, _run.stages = started, stages # list.append is atomic
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Pool threads are reused; don't leak this run into the next task
+            del _run.started, _run.stages
+    return wrapper
+
+
+def current_stages():
+    """Returns the stage records of the current run, in start order."""
+    return sorted(getattr(_run, "stages", []), key=lambda s: s["start_ms"])
+
+
+def finish_run(**fields):
+    """
+    Closes the current run and returns its summary. The summary is also
+    logged as JSON when TKTS_PERF_LOG=1.
+    """
+    summary = {
+        "event": "script_run",
+        "ts": time.time(),
+        "total_ms": round((time.perf_counter() - getattr(_run, "started", time.perf_counter())) * 1000, 2),
+        **fields,
+        "stages": current_stages(),
+        "cache": cache_stats(),
+        "upstream_calls_last_hour": upstream_calls_last_hour(),
+    }
+    if PERF_LOG_ENABLED:
+        logger.info(json.dumps(summary, default=str))
+    return summary
+
+
+# --- 2. Cache Hit/Miss Counters ---
+# Streamlit doesn't expose hit rates, so two wrappers are stacked around
+# st.cache_data: track_cache (outside) counts every call, count_miss
+# (inside) only runs when the cached body actually executes.
+#
+#   @perf.track_cache
+#   @st.cache_data(ttl=300)
+#   @perf.count_miss
+#   def load_something(): ...
+def _bump(name, counter):
+    with _cache_lock:
+        stats = _cache_stats.setdefault(name, {"calls": 0, "misses": 0})
+        stats[counter] += 1
+
+
+def count_miss(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _bump(func.__name__, "misses")
+        _run.last_call_missed = True
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def track_cache(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _bump(name, "calls")
+        _run.last_call_missed = False
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_stage(name, time.perf_counter() - start,
+                         cache="miss" if _run.last_call_missed else "hit")
+
+    # Keep st.cache_data's .clear() reachable through the wrapper
+    if hasattr(func, "clear"):
+        wrapper.clear = func.clear
+    return wrapper
+
+
+def count_lookup(name, hit):
+    """
+    Counts one call of a cache that isn't an st.cache_* function (e.g. the
+    tkts_data render cache), so it shows up in cache_stats() as well.
+    """
+    _bump(name, "calls")
+    if not hit:
+        _bump(name, "misses")
+
+
+def cache_stats():
+    """Returns {function name: calls, hits, misses, hit_rate} for this process."""
+    with _cache_lock:
+        snapshot = {name: dict(stats) for name, stats in _cache_stats.items()}
+    for stats in snapshot.values():
+        stats["hits"] = stats["calls"] - stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / stats["calls"], 3) if stats["calls"] else None
+    return snapshot
+
+
+# --- 3. Upstream Call Volume ---
+def count_upstream(source, calls=1):
+    """Records `calls` HTTP requests to an upstream API ("jira", "gmail")."""
+    now = time.time()
+    with _upstream_lock:
+        _upstream_calls.extend([(now, source)] * calls)
+
+def upstream_calls_last_hour():
+    """Returns {"total": n, <source>: n, ...} over the last 60 minutes (this process)."""
+    cutoff = time.time() - 3600
+    with _upstream_lock:
+        while _upstream_calls and _upstream_calls[0][0] < cutoff:
+            _upstream_calls.popleft()
+        sources = [source for _, source in _upstream_calls]
+    counts = {"total": len(sources)}
+    for source in sources:
+        counts[source] = counts.get(source, 0) + 1
+    return counts
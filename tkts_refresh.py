@@ -0,0 +1,99 @@
+"""
+Adaptive auto-refresh for the TKTS Dashboard.
+
+Replaces the fixed 5-minute st_autorefresh. plan_refresh() picks the next
+interval from what the snapshot says (tickets close to breach, how much the
+last fetch changed) and the clock (quiet hours, weekends); refresh_timer()
+renders an invisible component (components/refresh) that reruns the script
+when the plan falls due and pauses while the browser tab is hidden.
+
+Every interval is counted from the moment the cached snapshot was fetched.
+tkts_data.CACHE_TTL_SECONDS is the base interval, so the slower tiers land
+on an expired cache entry; the faster ones expire it when the timer fires
+(expire_early), so the refresh refetches instead of re-reading the entry.
+"""
+import os
+from datetime import datetime, timezone
+
+import streamlit.components.v1 as components
+
+import tkts_data
+from tkts_data import CACHE_TTL_SECONDS
+
+MIN_INTERVAL_SECONDS = 120                # tickets about to breach / busy
+URGENT_INTERVAL_SECONDS = 180             # something breaches within 4h
+BASE_INTERVAL_SECONDS = 300               # the old fixed interval
+QUIET_INTERVAL_SECONDS = 900              # quiet hours / nothing changing
+WEEKEND_INTERVAL_SECONDS = 1800
+
+BUSY_DELTA = 10                 # tickets added/removed/changed by one fetch
+QUIET_HOURS_UTC = range(18, 22) # after UK close, before ANZ opens
+RETRY_FLOOR_SECONDS = 15        # never fire sooner than this after a rerun
+
+_refresh_component = components.declare_component(
+    "tkts_refresh",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "refresh")
+)
+
+
+def choose_interval(now_utc, breaching_1h, breaching_4h, delta):
+    """Returns (interval seconds, human-readable reason)."""
+    changed = delta["added"] + delta["removed"] + delta["changed"] if delta else 0
+    if breaching_1h:
+        return MIN_INTERVAL_SECONDS, f"{breaching_1h} ticket(s) breach within 1h"
+    if changed >= BUSY_DELTA:
+        return MIN_INTERVAL_SECONDS, f"{changed} tickets changed in the last fetch"
+    if breaching_4h:
+        return URGENT_INTERVAL_SECONDS, f"{breaching_4h} ticket(s) breach within 4h"
+    if now_utc.weekday() >= 5:
+        return WEEKEND_INTERVAL_SECONDS, "weekend"
+    if now_utc.hour in QUIET_HOURS_UTC:
+        return QUIET_INTERVAL_SECONDS, f"quiet hours ({QUIET_HOURS_UTC.start}:00-{QUIET_HOURS_UTC.stop}:00 UTC)"
+    quiet_streak = delta.get("quiet_streak", 0) if delta else 0
+    if quiet_streak:
+        # Back off while consecutive fetches change nothing
+        interval = min(BASE_INTERVAL_SECONDS * 2 ** quiet_streak, QUIET_INTERVAL_SECONDS)
+        return interval, f"no changes in the last {quiet_streak} fetch(es)"
+    return BASE_INTERVAL_SECONDS, "normal"
+
+
+def plan_refresh(fetched_at, breaching_1h, breaching_4h, delta, snapshot_version=0, now=None):
+    """
+    Plans the next refresh for a snapshot fetched at `fetched_at` (naive
+    local datetime, as stamped by the loaders). Returns a dict with
+    interval_s, delay_s, reason, the token the timer component keys on,
+    and whether it falls due before the loaders' entries expire (early).
+    """
+    now = now or datetime.now(timezone.utc)
+    interval, reason = choose_interval(now, breaching_1h, breaching_4h, delta)
+    fetched_ts = fetched_at.timestamp() if fetched_at else now.timestamp()
+    due_ts = fetched_ts + interval
+    return {
+        "interval_s": interval,
+        "delay_s": max(due_ts - now.timestamp(), RETRY_FLOOR_SECONDS),
+        "reason": reason,
+        "token": f"{snapshot_version}:{int(due_ts)}",
+        "snapshot_version": snapshot_version,
+        "early": interval < CACHE_TTL_SECONDS,
+    }
+
+
+def expire_early(plan, fired):
+    """
+    Call at the top of a run, before the loaders, with the previous run's
+    plan and the timer's value: when the timer has just fired for an early
+    plan, expires that snapshot so this run fetches a new one.
+    """
+    if plan and fired and plan["early"] and fired.get("token") == plan["token"]:
+        tkts_data.expire_refresh_loaders(plan["snapshot_version"])
+
+
+def refresh_timer(plan, enabled=True, key="adaptive_refresh"):
+    """Renders the (invisible) timer. Returns its last value, if it ever fired."""
+    return _refresh_component(
+        token=plan["token"],
+        delay_ms=int(plan["delay_s"] * 1000),
+        enabled=enabled,
+        key=key,
+        default=None
+    )
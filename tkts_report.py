@@ -0,0 +1,238 @@
+"""
+Per-region end-of-day report of the TKTS Dashboard, for the daily standups.
+
+Leads used to screenshot "Closed TKTS by Assignee" and "Priority TKTS
+Details" once per region. This builds every region's report from one
+snapshot in one batch pass: each section is computed once over all
+tickets, its HTML rows are rendered column-wise for all of them at once,
+and only then split by region. No Streamlit reruns are involved:
+
+    closed      tickets closed today, per assignee
+    created     tickets created today, per request type
+    breached    active tickets past their SLA breach time
+    priority    today's Gmail priority tickets
+
+A ticket's region is the prefix of its request type ("UK - Display
+Creatives" -> UK); request types without one go to "Other". Exclusions
+are the page's (EXCLUDED_ASSIGNEES, EXCLUDED_REQUEST_TYPES).
+
+    python -m tkts_report --out reports
+    python -m tkts_report --out reports --regions UK SEA --format html
+
+Writes <out>/<YYYY-MM-DD>/index.html, one <region>.html per region and
+one <section>.csv per section (all regions, with a region column). Reads
+the Jira/Gmail settings from the environment (see
+tkts_data.configure_from_env), so it can run from cron.
+"""
+import argparse
+import html
+import os
+import sys
+
+import pandas as pd
+
+import tkts_data
+import tkts_perf as perf
+from tkts_export import priority_keys
+
+OTHER_REGION = "Other"
+
+# section -> (title, columns of the CSV/HTML table, {column: HTML header})
+SECTIONS = {
+    "closed": ("Closed TKTS by Assignee",
+               {"assignee": "Assignee", "closed": "Closed", "key": "TKTS-No", "request_type": "Request Type",
+                "resolutiondate": "Resolved (UTC)"}),
+    "created": ("Created TKTS by Request Type",
+                {"request_type": "Request Type", "created": "Created"}),
+    "breached": ("Breached TKTS",
+                 {"key": "TKTS-No", "assignee": "Assignee", "status": "Status", "request_type": "Request Type",
+                  "breach_time": "Breach Time (UTC)", "SLA Timer": "SLA Timer"}),
+    "priority": ("Priority TKTS",
+                 {"key": "TKTS-No", "assignee": "Assignee", "request_type": "Request Type", "status": "Status"}),
+}
+
+PAGE_CSS = """
+body { font-family: 'Manrope', Arial, sans-serif; margin: 24px; }
+table { width: 100%; border-collapse: collapse; margin-bottom: 24px; }
+th, td { padding: 6px 10px; border-bottom: 1px solid #ddd; text-align: left; font-size: 0.9rem; }
+th { font-weight: 600; background-color: #0E1117; color: #FFFFFF; }
+a { color: #1A73B8; text-decoration: none; font-weight: 600; }
+.note { color: #666; }
+"""
+
+
+# --- 1. Sections (one pass over all regions) ---
+def ticket_regions(request_types):
+    """Region of each request type: its prefix before " - ", else OTHER_REGION."""
+    # A few dozen distinct request types, so map each once instead of splitting every row
+    regions = {request_type: request_type.split(" - ")[0] if " - " in request_type else OTHER_REGION
+               for request_type in request_types.dropna().unique()}
+    return request_types.map(regions).fillna(OTHER_REGION)
+
+
+def build_sections(df, df_all, priority_ticket_set, today):
+    """
+    {section: frame with a region column, all regions}, plus the priority
+    keys Jira doesn't know. `df` is the active frame after compute_sla.
+    """
+    with perf.stage("report.sections", active=len(df), daily=len(df_all)):
+        counted = df_all[~df_all['request_type'].isin(tkts_data.EXCLUDED_REQUEST_TYPES)]
+
+        closed = counted[(counted['resolutiondate'].dt.date == today)
+                         & ~counted['assignee'].isin(tkts_data.EXCLUDED_ASSIGNEES)]
+        closed = closed.assign(region=ticket_regions(closed['request_type']),
+                               link=tkts_data.ticket_links(closed['key'], closed['source']))
+        closed['closed'] = closed.groupby(['region', 'assignee'])['key'].transform('size')
+        closed = closed.sort_values(['region', 'closed', 'assignee', 'key'], ascending=[True, False, True, True])
+
+        created = counted[counted['created'].dt.date == today]
+        created = (created.assign(region=ticket_regions(created['request_type']))
+                   .groupby(['region', 'request_type']).size().rename('created').reset_index()
+                   .sort_values(['region', 'created', 'request_type'], ascending=[True, False, True]))
+
+        breached = df[df['SLA_Status'] == '🚨 Breached']
+        breached = (breached.assign(region=ticket_regions(breached['request_type']), link=breached['Ticket Link'])
+                    .sort_values(['region', 'breach_time']))
+
+        unresolved = []
+        priority = pd.DataFrame(columns=['key', 'source', 'assignee', 'request_type', 'status', 'Ticket Link'])
+        if priority_ticket_set:
+            priority = tkts_data.match_priority_tickets(df, df_all, priority_ticket_set)
+            priority, unresolved = tkts_data.enrich_priority_tickets(priority, priority_ticket_set)
+        priority = (priority.assign(region=ticket_regions(priority['request_type']), link=priority['Ticket Link'])
+                    .sort_values(['region', 'key']))
+
+    sections = {"closed": closed, "created": created, "breached": breached, "priority": priority}
+    return {name: frame[['region', *SECTIONS[name][1], *(['link'] if 'link' in frame else [])]]
+            .reset_index(drop=True) for name, frame in sections.items()}, unresolved
+
+
+# --- 2. Rendering ---
+def html_rows(frame, columns):
+    """
+    '<tr>...</tr>' of every row of `frame`, built a column at a time for all
+    regions together (the page's build_html_table goes row by row). The key
+    column links to the ticket.
+    """
+    row = pd.Series("<tr>", index=frame.index, dtype=str)
+    for column in columns:
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime('%d%b%Y %H:%M')
+        text = values.fillna("").astype(str).map(html.escape).astype(str)
+        if column == "key" and "link" in frame:
+            url = frame['link'].fillna("").astype(str).map(html.escape).astype(str)
+            text = '<a href="' + url + '" target="_blank">' + text + '</a>'
+        row = row + "<td>" + text + "</td>"
+    return row + "</tr>"
+
+
+def render_regions(sections, today, regions=None):
+    """{region: full HTML page} for every region with at least one row (or the given `regions`)."""
+    with perf.stage("report.render.html") as info:
+        # Every section's rows for all regions, grouped once
+        bodies = {name: html_rows(frame, SECTIONS[name][1]).groupby(frame['region']).agg("".join)
+                  for name, frame in sections.items()}
+        regions = regions or sorted(set().union(*(body.index for body in bodies.values())))
+        pages = {}
+        for region in regions:
+            parts = [f"<h1>{html.escape(region)} - TKTS Daily Report ({today.strftime('%d-%b-%Y')})</h1>"]
+            for name, (title, columns) in SECTIONS.items():
+                rows = bodies[name].get(region)
+                parts.append(f"<h2>{title}</h2>")
+                if rows is None:
+                    parts.append('<p class="note">None today.</p>')
+                else:
+                    header = "".join(f"<th>{label}</th>" for label in columns.values())
+                    parts.append(f"<table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>")
+            pages[region] = page("".join(parts), f"{region} TKTS {today.isoformat()}")
+        info["regions"] = len(pages)
+    return pages
+
+
+def render_index(sections, today, regions, notes):
+    """Overview page: per-region counts of every section, linking to the region pages."""
+    counts = pd.DataFrame({name: frame.groupby('region').size() for name, frame in sections.items()})
+    counts['created'] = sections['created'].groupby('region')['created'].sum() # one row per request type
+    counts = counts.reindex(regions).fillna(0).astype(int)
+    header = "<th>Region</th>" + "".join(f"<th>{SECTIONS[name][0]}</th>" for name in SECTIONS)
+    rows = "".join(
+        f'<tr><td><a href="{html.escape(region)}.html">{html.escape(region)}</a></td>'
+        + "".join(f"<td>{counts.at[region, name]}</td>" for name in SECTIONS) + "</tr>"
+        for region in regions
+    )
+    notes_html = "".join(f'<p class="note">{html.escape(note)}</p>' for note in notes)
+    return page(f"<h1>TKTS Daily Report ({today.strftime('%d-%b-%Y')})</h1>{notes_html}"
+                f"<table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>",
+                f"TKTS {today.isoformat()}")
+
+
+def page(body, title):
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f"<style>{PAGE_CSS}</style></head><body>{body}</body></html>")
+
+
+# --- 3. Report ---
+def write_report(out_dir, df, df_all, priority_ticket_set, now, formats=("html", "csv"), regions=None):
+    """
+    Builds and writes the report of `now`'s UTC day into <out_dir>/<date>/.
+    Returns the paths written.
+    """
+    today = now.date()
+    sections, unresolved = build_sections(df, df_all, priority_ticket_set, today)
+    if regions:
+        sections = {name: frame[frame['region'].isin(regions)] for name, frame in sections.items()}
+
+    directory = os.path.join(out_dir, today.isoformat())
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    if "csv" in formats:
+        for name, frame in sections.items():
+            files[f"{name}.csv"] = frame.to_csv(index=False)
+    if "html" in formats:
+        pages = render_regions(sections, today, regions)
+        notes = [f"Generated {now.strftime('%d-%b-%Y %H:%M')} UTC."]
+        source_errors = {**df_all.attrs.get('source_errors', {}), **df.attrs.get('source_errors', {})}
+        notes += [f"Jira source '{name}' could not be loaded ({error}); its tickets are missing."
+                  for name, error in source_errors.items()]
+        if unresolved:
+            notes.append(f"Priority tickets not found in JIRA: {', '.join(unresolved)}")
+        files["index.html"] = render_index(sections, today, list(pages), notes)
+        files.update({f"{region}.html": body for region, body in pages.items()})
+
+    with perf.stage("report.write", files=len(files)):
+        paths = []
+        for name, content in files.items():
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            paths.append(path)
+    return paths
+
+
+# --- 4. CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Write the per-region TKTS end-of-day report.")
+    parser.add_argument("--out", default="reports", help="output directory (one sub-directory per day)")
+    parser.add_argument("--format", nargs="+", choices=["html", "csv"], default=["html", "csv"])
+    parser.add_argument("--regions", nargs="+", help="only these regions (default: every region with tickets)")
+    args = parser.parse_args()
+
+    tkts_data.configure_from_env()
+    perf.start_run()
+    now = pd.Timestamp.now(tz='UTC')
+    try:
+        with perf.stage("report.load"):
+            df = tkts_data.compute_sla(tkts_data.load_jira_data(), now)
+            df_all = tkts_data.load_all_jira_data()
+    except Exception as e:
+        print(f"Could not load the snapshot: {tkts_data.describe_error(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    paths = write_report(args.out, df, df_all, priority_keys(now), now, args.format, args.regions)
+    perf.finish_run(view="report", files=len(paths))
+    print(f"Wrote {len(paths)} file(s) to {os.path.dirname(paths[0]) if paths else args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Full-text ticket search for the TKTS LOOKUP tab.
+
+An SQLite FTS5 index over the summary, request type, assignee and status of
+every ticket the dashboard has seen in this process: the active snapshot
+(load_jira_data) and today's created/resolved tickets (load_all_jira_data).
+sync() runs with each new snapshot and only rewrites the rows whose fields
+changed; a ticket that leaves the active set stays searchable as closed
+for CLOSED_RETENTION_DAYS after it was last seen, then drops out, so the
+index of a long-running server stays bounded. Searches never go to Jira:
+
+    search("lenovo black fri", statuses=["Open"])
+
+Every word is a prefix ("fri" finds "Friday"), all words must match, and
+results are ranked with bm25 (key and summary weigh most).
+"""
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import tkts_perf as perf
+from tkts_data import ticket_links
+
+INDEXED_COLUMNS = ["key", "summary", "request_type", "assignee", "status"]
+BM25_WEIGHTS = (10.0, 5.0, 2.0, 2.0, 1.0)  # same order as INDEXED_COLUMNS
+SEARCH_LIMIT = 50
+CLOSED_RETENTION_DAYS = 7
+RESULT_COLUMNS = ["key", "source", "summary", "status", "assignee", "request_type", "created", "active", "link"]
+
+_WORD = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE tickets (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    summary TEXT,
+    request_type TEXT,
+    assignee TEXT,
+    status TEXT,
+    created TEXT,
+    active INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE tickets_fts USING fts5(
+    key, summary, request_type, assignee, status,
+    prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text: every word as a quoted prefix, all required."""
+    return " ".join(f'"{word}"*' for word in _WORD.findall(text.lower()))
+
+
+class TicketIndex:
+    """In-memory FTS5 index of tickets, shared by every session of the process."""
+
+    def __init__(self, path=":memory:"):
+        # One connection, used under the lock: Streamlit runs each rerun in its own thread
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # "source:key" -> rowid in both tables, a hash of the indexed row and
+        # when a snapshot last had it (epoch seconds)
+        self._rows = pd.DataFrame({"rowid": pd.Series(dtype='int64'), "fingerprint": pd.Series(dtype='uint64'),
+                                   "seen": pd.Series(dtype='float64')})
+        self._active = pd.Index([])  # "source:key" of the active snapshot
+        self._synced = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def sync(self, df, df_all, now=None):
+        """
+        Brings the index up to the active snapshot `df` and today's tickets
+        `df_all`, and drops closed tickets not seen for CLOSED_RETENTION_DAYS.
+        Returns {"upserted": n, "closed": m, "evicted": k}; a no-op (zeros)
+        if both snapshots were already indexed.
+        """
+        versions = (df.attrs.get('snapshot_version'), df_all.attrs.get('snapshot_version'))
+        if versions == self._synced and None not in versions:
+            return {"upserted": 0, "closed": 0, "evicted": 0}
+        now = time.time() if now is None else now
+
+        columns = ["source", "key", "summary", "request_type", "assignee", "status", "created"]
+        rows = pd.concat([df_all[columns].assign(active=0), df[columns].assign(active=1)], ignore_index=True)
+        # Active snapshot wins over today's list for a ticket that is in both
+        rows = rows.drop_duplicates(subset=["source", "key"], keep="last")
+        ids = pd.Index(rows['source'].astype(str) + ":" + rows['key'].astype(str))
+        fingerprints = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+
+        with self._lock:
+            # fill_value keeps the dtypes (a NaN would turn the uint64 hashes into lossy floats)
+            rowids = self._rows['rowid'].reindex(ids, fill_value=0).to_numpy(copy=True)
+            new = rowids == 0
+            changed = new | (self._rows['fingerprint'].reindex(ids, fill_value=0).to_numpy() != fingerprints)
+            start = int(self._rows['rowid'].max()) + 1 if len(self._rows) else 1
+            rowids[new] = np.arange(start, start + int(new.sum()))
+
+            # Only the changed rows are formatted and written
+            updates = rows[changed].assign(summary=lambda d: d['summary'].fillna(""),
+                                           created=lambda d: d['created'].dt.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            records = list(zip(rowids[changed].tolist(), *(updates[c].tolist() for c in columns + ["active"])))
+            # Left the active set and isn't in today's list either: keep it, as closed
+            closed = self._active.difference(ids)
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO tickets (id, source, key, summary, request_type, assignee, "
+                                     "status, created, active) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+                self._db.executemany("DELETE FROM tickets_fts WHERE rowid = ?",
+                                     [(rowid,) for rowid in rowids[changed & ~new].tolist()])
+                self._db.executemany("INSERT INTO tickets_fts (rowid, key, summary, request_type, assignee, status) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(r[0], r[2], r[3], r[4], r[5], r[6]) for r in records])
+                self._db.executemany("UPDATE tickets SET active = 0 WHERE id = ?",
+                                     [(rowid,) for rowid in self._rows.loc[closed, 'rowid'].tolist()])
+
+            # Tickets not in either snapshot this time (get_indexer: isin is slow on string indexes)
+            positions = self._rows.index.get_indexer(ids)
+            not_seen = np.ones(len(self._rows), dtype=bool)
+            not_seen[positions[positions >= 0]] = False
+            kept = self._rows[not_seen].copy()
+            kept.loc[kept.index.isin(closed), 'fingerprint'] = 0  # active flag changed: rewrite if it comes back
+            expired = kept['seen'].to_numpy() < now - CLOSED_RETENTION_DAYS * 86400
+            if expired.any():
+                gone = [(rowid,) for rowid in kept.loc[expired, 'rowid'].tolist()]
+                with self._db:
+                    self._db.executemany("DELETE FROM tickets WHERE id = ?", gone)
+                    self._db.executemany("DELETE FROM tickets_fts WHERE rowid = ?", gone)
+                kept = kept[~expired]
+            seen = pd.DataFrame({"rowid": rowids, "fingerprint": fingerprints, "seen": now}, index=ids)
+            self._rows = pd.concat([kept, seen])
+            self._active = ids[rows['active'].to_numpy() == 1]
+            self._synced = versions
+        return {"upserted": int(changed.sum()), "closed": len(closed), "evicted": int(expired.sum())}
+
+    def search(self, text, statuses=None, request_types=None, assignees=None, include_closed=False,
+               limit=SEARCH_LIMIT):
+        """Matching tickets, best first (newest first for filters without text)."""
+        match = fts_query(text)
+        where, params = [], []
+        if match:
+            where.append("tickets_fts MATCH ?")
+            params.append(match)
+        if not include_closed:
+            where.append("t.active = 1")
+        for column, values in (("status", statuses), ("request_type", request_types), ("assignee", assignees)):
+            if values:
+                where.append(f"t.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+
+        if match:
+            sql = (f"SELECT t.key, t.source, t.summary, t.status, t.assignee, t.request_type, t.created, t.active "
+                   f"FROM tickets_fts JOIN tickets t ON t.id = tickets_fts.rowid "
+                   f"WHERE {' AND '.join(where)} ORDER BY bm25(tickets_fts, {', '.join(map(str, BM25_WEIGHTS))}) LIMIT ?")
+        else:
+            sql = (f"SELECT t.key, t.source, t.summary, t.status, t.assignee, t.request_type, t.created, t.active "
+                   f"FROM tickets t {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY t.created DESC LIMIT ?")
+        with self._lock:
+            found = self._db.execute(sql, params + [limit]).fetchall()
+
+        results = pd.DataFrame(found, columns=RESULT_COLUMNS[:-1])
+        results['created'] = pd.to_datetime(results['created'], utc=True)
+        results['active'] = results['active'].astype(bool)
+        results['link'] = ticket_links(results['key'], results['source']) if len(results) else ""
+        return results
+
+    def facets(self, include_closed=False):
+        """Distinct {status, request_type, assignee: sorted values} for the filter widgets."""
+        active = "" if include_closed else " WHERE active = 1"
+        with self._lock:
+            return {column: [value for (value,) in self._db.execute(
+                        f"SELECT DISTINCT {column} FROM tickets{active} ORDER BY {column}")]
+                    for column in ("status", "request_type", "assignee")}
+
+
+_index = TicketIndex()
+
+def sync(df, df_all):
+    """Feeds a snapshot to the process-wide index (cheap when nothing changed)."""
+    with perf.stage("search_index.sync") as info:
+        info.update(_index.sync(df, df_all))
+        info["indexed"] = len(_index)
+
+def search(text, **filters):
+    """Searches the process-wide index; see TicketIndex.search."""
+    with perf.stage("search_index.query") as info:
+        results = _index.search(text, **filters)
+        info["results"] = len(results)
+        return results
+
+def facets(include_closed=False):
+    return _index.facets(include_closed)
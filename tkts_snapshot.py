@@ -0,0 +1,188 @@
+"""
+Shared snapshot for running several dashboard replicas.
+
+Every replica used to fetch from Jira and Gmail on its own, so upstream
+load grew with the replica count. Instead, one writer process runs the
+loaders and writes each frame as an uncompressed Arrow IPC (Feather v2)
+file; app workers memory-map those files read-only and never call Jira or
+Gmail for them:
+
+    python -m tkts_snapshot write --dir /shared/tkts          # one process
+    TKTS_SNAPSHOT_DIR=/shared/tkts streamlit run app.py       # any number
+
+Files are written to a temp file in the same directory and renamed over the
+old one (os.replace), so a reader sees either the old or the new snapshot,
+never half of one; a worker that still has the old file mapped keeps a
+valid mapping until it lets go of it. Readers re-map a file only when its
+identity (inode, mtime, size) changes. String columns are written as
+large_string, the storage of pandas' str dtype, so they convert without a
+copy and stay in the mapped pages, shared by every worker; timestamp
+columns with missing values are still copied (8 bytes a row), since NaT
+has to be filled in.
+
+The writer keeps the last good file of a loader that fails, so workers
+keep serving it (its fetched_at shows how old it is).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+
+import tkts_perf as perf
+
+# One <name>.arrow file each; "assignments" holds the load_assignment_events()
+# records and "priority" the Gmail priority set, as a one-column frame
+FRAMES = ["active", "daily", "assignments", "priority"]
+ASSIGNMENT_COLUMNS = ["key", "source", "assignee", "previous", "at"]
+ATTRS_KEY = b"tkts_attrs"
+
+
+def frame_path(directory, name):
+    return os.path.join(directory, f"{name}.arrow")
+
+
+# --- 1. Writer ---
+def write_frame(directory, name, df):
+    """Writes df (and its attrs) as <name>.arrow, atomically replacing the previous file."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Object columns come out as (32-bit offset) string, which to_pandas
+    # would copy into a large_string per worker
+    table = table.cast(pa.schema([field.with_type(pa.large_string()) if pa.types.is_string(field.type) else field
+                                  for field in table.schema], metadata=table.schema.metadata))
+    attrs = {key: value for key, value in df.attrs.items() if key != "fetched_at"}
+    if df.attrs.get("fetched_at") is not None:
+        attrs["fetched_at"] = df.attrs["fetched_at"].isoformat()
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), ATTRS_KEY: json.dumps(attrs)})
+
+    path = frame_path(directory, name)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "wb") as f:
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+def write_snapshot(directory, today_str=None):
+    """
+    Runs every loader once (bypassing their caches) and writes the frames.
+    Returns ({name: bytes written}, {name: error text}) - a failed loader
+    leaves its previous file in place.
+    """
+    import tkts_data
+
+    if tkts_data.SHARED_SNAPSHOT is not None:
+        # The loaders would read the snapshot back instead of fetching it
+        raise RuntimeError("write_snapshot needs tkts_data configured without snapshot_dir")
+    today_str = today_str or datetime.now(timezone.utc).strftime('%Y/%m/%d')
+
+    def priority_frame():
+        keys = set()
+        if tkts_data.GMAIL_TOKEN:
+            with tkts_data.gmail_service() as service:
+                keys = tkts_data.get_priority_ticket_set(service, today_str) if service else set()
+        return pd.DataFrame({"key": pd.Series(sorted(keys), dtype=str)})
+
+    def assignments_frame():
+        return pd.DataFrame(tkts_data.load_assignment_events(), columns=ASSIGNMENT_COLUMNS)
+
+    loaders = {
+        "active": tkts_data.load_jira_data,
+        "daily": tkts_data.load_all_jira_data,
+        "assignments": assignments_frame,
+        "priority": priority_frame,
+    }
+    for loader in (tkts_data.load_jira_data, tkts_data.load_all_jira_data, tkts_data.load_assignment_events,
+                   tkts_data.get_priority_ticket_set):
+        loader.clear()
+
+    written, errors = {}, {}
+    for name, loader in loaders.items():
+        try:
+            with perf.stage(f"snapshot.write.{name}") as info:
+                info["bytes"] = written[name] = write_frame(directory, name, loader())
+        except Exception as e:
+            errors[name] = tkts_data.describe_error(e)
+    return written, errors
+
+
+# --- 2. Reader (app workers) ---
+class SharedSnapshot:
+    """Read-only view of a snapshot directory, re-mapped only when a file changes."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}  # name -> (file identity, DataFrame)
+        self._lock = threading.Lock()
+
+    def frame(self, name):
+        """
+        The latest <name> frame. Callers get a shallow copy, so adding
+        columns never touches the shared one. Raises FileNotFoundError until
+        the writer has produced the file.
+        """
+        path = frame_path(self.directory, name)
+        stat = os.stat(path)
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._frames.get(name)
+            if cached is None or cached[0] != identity:
+                with perf.stage(f"snapshot.map.{name}", bytes=stat.st_size):
+                    cached = self._frames[name] = (identity, self._map(path, stat))
+        return cached[1].copy(deep=False)
+
+    @staticmethod
+    def _map(path, stat):
+        source = pa.memory_map(path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+        attrs = json.loads((table.schema.metadata or {}).get(ATTRS_KEY, b"{}"))
+        if attrs.get("fetched_at"):
+            attrs["fetched_at"] = datetime.fromisoformat(attrs["fetched_at"])
+        # The writer's counter restarts with its process; the file's mtime
+        # never repeats, so per-version caches (breach index, ...) stay valid
+        attrs["snapshot_version"] = stat.st_mtime_ns
+        df.attrs.update(attrs)
+        return df
+
+
+# --- 3. CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Write the shared TKTS snapshot for app workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    write_parser = commands.add_parser("write", help="fetch from Jira/Gmail and write the snapshot files")
+    write_parser.add_argument("--dir", required=True, help="snapshot directory (TKTS_SNAPSHOT_DIR of the workers)")
+    write_parser.add_argument("--interval", type=float, default=None,
+                              help="seconds between fetches (default: the loaders' cache TTL)")
+    write_parser.add_argument("--once", action="store_true", help="write one snapshot and exit")
+    args = parser.parse_args()
+
+    import tkts_data
+
+    # The workers' environment may well set TKTS_SNAPSHOT_DIR; the writer
+    # always fetches upstream
+    tkts_data.configure_from_env(snapshot_dir=None)
+    os.makedirs(args.dir, exist_ok=True)
+    interval = args.interval or tkts_data.CACHE_TTL_SECONDS
+    while True:
+        started = time.monotonic()
+        perf.start_run()
+        written, errors = write_snapshot(args.dir)
+        perf.finish_run(view="snapshot_writer", frames=len(written), errors=len(errors))
+        print(f"{datetime.now():%H:%M:%S} wrote {', '.join(f'{name} ({size // 1024} KiB)' for name, size in written.items()) or 'nothing'}"
+              + "".join(f"; {name} failed: {error}" for name, error in errors.items()), file=sys.stderr)
+        if args.once:
+            sys.exit(1 if errors else 0)
+        time.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+if __name__ == "__main__":
+    main()